@@ -24,7 +24,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 target_metadata = Base.metadata
 #target_metadata = None
-config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL)
+config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL.replace('%', '%%'))  # configparser interpolates %
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
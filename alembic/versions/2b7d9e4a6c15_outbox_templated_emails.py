@@ -0,0 +1,28 @@
+"""Store outbox emails as a template and its values until the worker renders them
+
+Revision ID: 2b7d9e4a6c15
+Revises: 8f1c5b2e7a40
+Create Date: 2026-10-18 19:12:44.208317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7d9e4a6c15'
+down_revision: Union[str, None] = '8f1c5b2e7a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('template', sa.String(length=100), nullable=True))
+    op.add_column('notifications', sa.Column('template_values', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications', 'template_values')
+    op.drop_column('notifications', 'template')
@@ -0,0 +1,43 @@
+"""Add materialized property_estimates table
+
+Revision ID: 3c1f7a9d2b64
+Revises: e9839c4e82a8
+Create Date: 2026-10-18 09:12:40.512318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9d2b64'
+down_revision: Union[str, None] = 'e9839c4e82a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('property_estimates',
+    sa.Column('real_estate_id', sa.Integer(), nullable=False),
+    sa.Column('energy_usage', sa.Float(), nullable=True),
+    sa.Column('estimated_cost', sa.Float(), nullable=True),
+    sa.Column('input_fingerprint', sa.String(length=64), nullable=True),
+    sa.Column('tariff_version', sa.String(length=50), nullable=True),
+    sa.Column('is_dirty', sa.Boolean(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['real_estate_id'], ['real_estates.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('real_estate_id')
+    )
+    op.create_index(op.f('ix_property_estimates_is_dirty'), 'property_estimates', ['is_dirty'], unique=False)
+    # Every existing property starts dirty so the recompute job fills the table
+    op.execute(
+        sa.text("INSERT INTO property_estimates (real_estate_id, is_dirty) SELECT id, :dirty FROM real_estates")
+        .bindparams(dirty=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_property_estimates_is_dirty'), table_name='property_estimates')
+    op.drop_table('property_estimates')
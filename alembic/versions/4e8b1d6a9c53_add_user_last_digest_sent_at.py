@@ -0,0 +1,26 @@
+"""Add last_digest_sent_at to users
+
+Revision ID: 4e8b1d6a9c53
+Revises: 9d4a6e2c7f18
+Create Date: 2026-10-18 15:02:17.412906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b1d6a9c53'
+down_revision: Union[str, None] = '9d4a6e2c7f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('last_digest_sent_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'last_digest_sent_at')
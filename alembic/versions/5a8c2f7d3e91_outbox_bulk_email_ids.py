@@ -0,0 +1,28 @@
+"""Keep the bulk request of queued outbox emails so their status can be polled
+
+Revision ID: 5a8c2f7d3e91
+Revises: 2b7d9e4a6c15
+Create Date: 2026-10-18 21:40:12.517093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8c2f7d3e91'
+down_revision: Union[str, None] = '2b7d9e4a6c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('bulk_email_id', sa.String(length=64), nullable=True))
+    op.add_column('notifications', sa.Column('bulk_index', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications', 'bulk_index')
+    op.drop_column('notifications', 'bulk_email_id')
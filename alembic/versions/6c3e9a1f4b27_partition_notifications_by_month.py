@@ -0,0 +1,92 @@
+"""Partition notifications and weather_based_recommendations by month (PostgreSQL)
+
+Revision ID: 6c3e9a1f4b27
+Revises: 4e8b1d6a9c53
+Create Date: 2026-10-18 17:02:37.415208
+
+On PostgreSQL each table is recreated as a table partitioned by range on
+`timestamp`. The existing table is not copied: it is attached as the
+`<table>_legacy` partition holding everything before next month. Its
+primary key is rebuilt on (id, timestamp) and PostgreSQL reads it once to
+check the bound, so expect the migration to take minutes on large tables. Partitions for
+next month and PARTITION_MONTHS_AHEAD months after it are created here and
+then kept ahead by services/partitions.py. The primary key becomes
+(id, timestamp), as PostgreSQL requires the partition key in unique
+constraints; ids still come from the same sequence.
+
+SQLite keeps plain tables: the migration does nothing there.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+
+from services.partitions import PARTITION_MONTHS_AHEAD, add_months, create_partition_sql, month_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c3e9a1f4b27'
+down_revision: Union[str, None] = '4e8b1d6a9c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Secondary indexes of each table: (name, columns)
+INDEXES = {
+    'notifications': [
+        ('ix_notifications_status', 'status'),
+        ('ix_notifications_status_next_attempt_at', 'status, next_attempt_at'),
+    ],
+    'weather_based_recommendations': [],
+}
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    next_month = add_months(month_start(datetime.utcnow()), 1)
+    for table, indexes in INDEXES.items():
+        legacy = f'{table}_legacy'
+        op.execute(f"UPDATE {table} SET timestamp = now() AT TIME ZONE 'utc' WHERE timestamp IS NULL")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN timestamp SET DEFAULT (now() AT TIME ZONE 'utc'), "
+                   f"ALTER COLUMN timestamp SET NOT NULL")
+        op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        # A table has one primary key: give the legacy table the parent's (id, timestamp) key, which ATTACH reuses
+        op.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT {table}_pkey, '
+                   f'ADD CONSTRAINT {legacy}_pkey PRIMARY KEY (id, timestamp)')
+        for name, _ in indexes:
+            op.execute(f'ALTER INDEX {name} RENAME TO {name}_legacy')
+
+        op.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                   f'PARTITION BY RANGE (timestamp)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, timestamp)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_fkey '
+                   f'FOREIGN KEY (user_id) REFERENCES users (id)')
+        for name, columns in indexes:
+            op.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+        op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} "
+                   f"FOR VALUES FROM (MINVALUE) TO ('{next_month:%Y-%m-%d}')")
+        for offset in range(PARTITION_MONTHS_AHEAD + 1):
+            op.execute(create_partition_sql(table, add_months(next_month, offset)))
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    for table, indexes in INDEXES.items():
+        plain = f'{table}_plain'
+        # The sequence would be dropped with the partitioned table
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+        op.execute(f'CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)')
+        op.execute(f'INSERT INTO {plain} SELECT * FROM {table}')
+        op.execute(f'DROP TABLE {table}')
+        op.execute(f'ALTER TABLE {plain} RENAME TO {table}')
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN timestamp DROP NOT NULL, '
+                   f'ALTER COLUMN timestamp DROP DEFAULT')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_fkey '
+                   f'FOREIGN KEY (user_id) REFERENCES users (id)')
+        for name, columns in indexes:
+            op.execute(f'CREATE INDEX {name} ON {table} ({columns})')
@@ -0,0 +1,40 @@
+"""Add versioned tariffs table
+
+Revision ID: 7b2e4c8f1a35
+Revises: 3c1f7a9d2b64
+Create Date: 2026-10-18 11:03:17.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4c8f1a35'
+down_revision: Union[str, None] = '3c1f7a9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tariffs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('region', sa.String(length=10), nullable=False),
+    sa.Column('energy_source', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('flat_rate', sa.Float(), nullable=True),
+    sa.Column('hourly_rates', sa.JSON(), nullable=True),
+    sa.Column('weekend_hourly_rates', sa.JSON(), nullable=True),
+    sa.Column('tiers', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('region', 'energy_source', 'version')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('tariffs')
@@ -0,0 +1,79 @@
+"""Index the hot lookups and drop the index on recommendations.message
+
+Revision ID: 8f1c5b2e7a40
+Revises: 6c3e9a1f4b27
+Create Date: 2026-10-18 17:48:12.093561
+
+- real_estates.user_id: the optimize, portfolio and digest queries load a user's properties.
+- users.phone_number: registration looks users up by email OR phone number.
+- (user_id, timestamp) on recommendations, notifications and
+  weather_based_recommendations: a user's history, newest first.
+- recommendations.message: an index on an unbounded string nothing filters on,
+  paid for on every insert.
+
+On PostgreSQL the indexes are built CONCURRENTLY, so writes continue while
+they build. CONCURRENTLY is not available on partitioned tables
+(notifications and weather_based_recommendations, see 6c3e9a1f4b27), so
+their index is created ON ONLY the parent (invalid, no build), built
+CONCURRENTLY on each partition and attached partition by partition; the
+parent index becomes valid once every partition is attached. Partitions
+created later get the index from the parent.
+
+The downgrade drops the plain tables' indexes CONCURRENTLY. A partitioned
+index can only be dropped whole, from the parent, which takes its lock
+briefly but builds nothing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from services.partitions import list_partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f1c5b2e7a40'
+down_revision: Union[str, None] = '6c3e9a1f4b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns) of the new indexes
+PLAIN_TABLE_INDEXES = [
+    ('ix_real_estates_user_id', 'real_estates', ['user_id']),
+    ('ix_users_phone_number', 'users', ['phone_number']),
+    ('ix_recommendations_user_id_timestamp', 'recommendations', ['user_id', 'timestamp']),
+]
+PARTITIONED_TABLE_INDEXES = [
+    ('ix_notifications_user_id_timestamp', 'notifications', ['user_id', 'timestamp']),
+    ('ix_weather_based_recommendations_user_id_timestamp', 'weather_based_recommendations', ['user_id', 'timestamp']),
+]
+
+
+def upgrade() -> None:
+    context = op.get_context()
+    partitions = {table: list_partitions(op.get_bind(), table) for _, table, _ in PARTITIONED_TABLE_INDEXES}
+    for name, table, columns in PARTITIONED_TABLE_INDEXES:
+        if partitions[table]:
+            op.execute(f'CREATE INDEX {name} ON ONLY {table} ({", ".join(columns)})')
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with context.autocommit_block():
+        for name, table, columns in PLAIN_TABLE_INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        for name, table, columns in PARTITIONED_TABLE_INDEXES:
+            if not partitions[table]:  # SQLite keeps plain tables
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+            for partition in partitions[table]:
+                partition_index = f'{partition.name}_{"_".join(columns)}_idx'
+                op.create_index(partition_index, partition.name, columns, unique=False,
+                                postgresql_concurrently=True)
+                op.execute(f'ALTER INDEX {name} ATTACH PARTITION {partition_index}')
+    op.drop_index('ix_recommendations_message', table_name='recommendations')
+
+
+def downgrade() -> None:
+    op.create_index('ix_recommendations_message', 'recommendations', ['message'], unique=False)
+    for name, table, _ in PARTITIONED_TABLE_INDEXES:
+        # Drops the attached partition indexes with it
+        op.drop_index(name, table_name=table)
+    with op.get_context().autocommit_block():
+        for name, table, _ in PLAIN_TABLE_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""Turn notifications into an email outbox
+
+Revision ID: 9d4a6e2c7f18
+Revises: 7b2e4c8f1a35
+Create Date: 2026-10-18 14:26:51.870342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6e2c7f18'
+down_revision: Union[str, None] = '7b2e4c8f1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('recipient_name', sa.String(length=255), nullable=True))
+    op.add_column('notifications', sa.Column('subject', sa.String(length=255), nullable=True))
+    op.add_column('notifications', sa.Column('html_content', sa.Text(), nullable=True))
+    op.add_column('notifications', sa.Column('text_content', sa.Text(), nullable=True))
+    op.add_column('notifications', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('notifications', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    op.add_column('notifications', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('notifications', sa.Column('last_error', sa.String(length=500), nullable=True))
+    op.create_index('ix_notifications_status_next_attempt_at', 'notifications', ['status', 'next_attempt_at'],
+                    unique=False)
+    # Rows left "Pending" by the old background task have no stored email to send
+    op.execute("UPDATE notifications SET status = 'Failed', last_error = 'no outbox payload' "
+               "WHERE status = 'Pending' AND subject IS NULL")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_status_next_attempt_at', table_name='notifications')
+    op.drop_column('notifications', 'last_error')
+    op.drop_column('notifications', 'claimed_at')
+    op.drop_column('notifications', 'next_attempt_at')
+    op.drop_column('notifications', 'attempts')
+    op.drop_column('notifications', 'text_content')
+    op.drop_column('notifications', 'html_content')
+    op.drop_column('notifications', 'subject')
+    op.drop_column('notifications', 'recipient_name')
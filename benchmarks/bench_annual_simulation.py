@@ -0,0 +1,48 @@
+"""
+Benchmark the hourly degree-hour simulation.
+
+Run from the project root:
+    python -m benchmarks.bench_annual_simulation
+"""
+import time
+
+import numpy as np
+
+from models.annual_simulation import load_climate, project_annual, simulate_portfolio
+from models.energy_batch_engine import INSULATION_LEVELS
+from models.tariff_engine import TariffSnapshot
+from services.gazetteer import load_gazetteer
+
+REPEATS = 2_000
+PORTFOLIO_SIZES = (10_000, 1_000_000)
+
+
+def main():
+    gazetteer = load_gazetteer()
+    berlin = gazetteer.resolve("Berlin")
+    snapshot = TariffSnapshot([])
+
+    started = time.perf_counter()
+    load_climate(berlin)
+    print(f"climate of {berlin.name} (first load): {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        project_annual(120, "average", 1990, "electricity", berlin, snapshot)
+    per_property = (time.perf_counter() - started) / REPEATS
+    print(f"annual projection (8760 h profile, monthly kWh and cost): {per_property * 1e6:.1f} µs per property")
+
+    rng = np.random.default_rng(42)
+    cities = list(gazetteer.cities.values())
+    for size in PORTFOLIO_SIZES:
+        located = [cities[index] for index in rng.integers(0, len(cities), size)]
+        started = time.perf_counter()
+        simulate_portfolio(rng.integers(20, 600, size), rng.choice(INSULATION_LEVELS, size),
+                           rng.integers(1850, 2024, size), located)
+        seconds = time.perf_counter() - started
+        print(f"{size:>9,} properties in {len(cities)} cities: annual totals in {seconds * 1000:.1f} ms "
+              f"({size / seconds:,.0f} properties/s)")
+
+
+if __name__ == "__main__":
+    main()
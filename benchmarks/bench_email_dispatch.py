@@ -0,0 +1,58 @@
+"""
+Benchmark bulk email dispatch against the local MailerSend stand-in.
+
+Compares one request per message (the previous behaviour, with a new client
+per message) with the bulk dispatcher's batched requests on a reused client.
+
+Run from the project root:
+    python -m benchmarks.bench_email_dispatch
+"""
+import time
+
+import httpx
+
+from benchmarks.mailersend_standin import MailerSendStandIn
+from services.email_dispatcher import BulkEmailDispatcher, EmailMessage
+
+MESSAGES = 20_000
+SINGLE_LIMIT = 1_000
+SENDER = {"name": "Efficient Energy Advisory", "email": "advisor@example.com"}
+
+
+def make_messages(count: int):
+    return [
+        EmailMessage(SENDER, {"name": f"User {index}", "email": f"user{index}@example.com"},
+                     "Your Personalized Energy Optimization Update", "<h1>Hello</h1>" * 40, "Hello\n" * 40,
+                     notification_id=index)
+        for index in range(count)
+    ]
+
+
+def main():
+    server = MailerSendStandIn(max_batch=500).start()
+    try:
+        messages = make_messages(SINGLE_LIMIT)
+        started = time.perf_counter()
+        for message in messages:
+            with httpx.Client(base_url=server.url) as client:  # new client per message, as before
+                client.post("/bulk-email", json=[{"from": message.sender, "to": [message.recipient],
+                                                  "subject": message.subject, "html": message.html_content,
+                                                  "text": message.text_content}])
+        single = time.perf_counter() - started
+        print(f"{SINGLE_LIMIT:,} messages one request each: {SINGLE_LIMIT / single:,.0f} msgs/s")
+
+        dispatcher = BulkEmailDispatcher("test-key", base_url=server.url, poll_interval=0.01)
+        messages = make_messages(MESSAGES)
+        started = time.perf_counter()
+        results = dispatcher.send(messages)
+        bulk = time.perf_counter() - started
+        dispatcher.close()
+        assert all(result.status == "Sent" for result in results)
+        print(f"{MESSAGES:,} messages in batches of {dispatcher.max_batch}: {MESSAGES / bulk:,.0f} msgs/s "
+              f"({dispatcher.stats()['requests']} requests)")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark rendering optimization report emails for a digest-sized run.
+
+Compares the precompiled templates with the previous per-recipient f-strings
+plus the newline-to-<br> pass the single-email sender applied.
+
+Run from the project root:
+    python -m benchmarks.bench_email_templates
+"""
+import time
+
+import numpy as np
+
+from models.tip_rules import load_tip_rules
+from services.email_templates import load_email_templates
+
+EMAILS = 100_000
+
+
+def render_with_f_strings(values, tips):
+    formatted_weather_tips = "<ul>" + "\n".join(f"<li>{tip}</li>" for tip in tips) + "</ul>"
+    html_content = f"""
+    <h1>Hello {values['name']},</h1>
+    <p>Your personalized energy advisory report:</p>
+    <ul>
+        <li><b>Square area:</b> {values['square_area']} m²</li>
+        <li><b>Insulation quality:</b> {values['insulation_quality']}</li>
+        <li><b>Year built:</b> {values['year_built']}</li>
+        <li><b>Estimated energy usage:</b> {values['energy_usage']:.3f} kWh</li>
+        <li><b>Estimated daily cost:</b> {values['estimated_cost']:.3f} €</li>
+        <li><b>Temperature at location:</b> {values['temperature']} °C</li>
+    </ul>
+    <h2>Weather Tips:</h2>
+    {formatted_weather_tips}
+    <p>Thank you for using our service!</p>
+    """
+    text_content = f"""
+    Hello {values['name']},
+
+    Your personalized energy advisory report:
+    - Square area: {values['square_area']} m²
+    - Insulation quality: {values['insulation_quality']}
+    - Year built: {values['year_built']}
+    - Estimated energy usage: {values['energy_usage']:.3f} kWh
+    - Estimated daily cost: {values['estimated_cost']:.3f} €
+    - Temperature at location: {values['temperature']} °C
+
+    Weather Tips:
+    {', '.join(tips)}
+
+    Thank you for using our efficient energy advisory service !
+    """
+    return html_content.replace("\n", "<br>"), text_content
+
+
+def main():
+    templates, engine = load_email_templates(), load_tip_rules()
+    rng = np.random.default_rng(42)
+    temperatures = rng.uniform(-10, 38, EMAILS).round(1)
+    tips = engine.tips_batch(EMAILS, temperature=temperatures, hour=12.0)
+    recipients = [
+        {"name": f"User {index}", "square_area": 50 + index % 400, "insulation_quality": "average",
+         "year_built": 1950 + index % 70, "energy_usage": 100 + index % 900 / 7, "estimated_cost": index % 50 / 3,
+         "temperature": float(temperatures[index])}
+        for index in range(EMAILS)
+    ]
+
+    started = time.perf_counter()
+    for values, recipient_tips in zip(recipients, tips):
+        render_with_f_strings(values, recipient_tips)
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for values, recipient_tips in zip(recipients, tips):
+        templates.render("optimization_report", values, recipient_tips)
+    compiled = time.perf_counter() - started
+
+    print(f"{EMAILS:,} emails: f-strings + <br> pass {legacy:.2f} s ({EMAILS / legacy:,.0f}/s), "
+          f"compiled templates {compiled:.2f} s ({EMAILS / compiled:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark the vectorized energy estimation engine against a per-property loop.
+
+Run from the project root:
+    python -m benchmarks.bench_energy_batch
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from models.energy_batch_engine import ENERGY_SOURCES, INSULATION_LEVELS, encode_energy_source, encode_insulation, \
+    estimate_energy_batch
+from models.energy_cost_estimation_engine import calculate_energy_cost, calculate_energy_usage
+
+SIZES = (1_000, 100_000, 1_000_000)
+SCALAR_LIMIT = 100_000  # the per-property loop gets too slow beyond this
+
+
+def make_portfolio(size: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(20, 600, size),
+        rng.choice(INSULATION_LEVELS, size),
+        rng.integers(1850, 2024, size),
+        rng.choice(ENERGY_SOURCES, size),
+    )
+
+
+async def scalar_loop(square_area, insulation, year_built, source):
+    for index in range(len(square_area)):
+        usage = await calculate_energy_usage(int(square_area[index]), insulation[index], int(year_built[index]))
+        await calculate_energy_cost(usage, source[index])
+
+
+def main():
+    for size in SIZES:
+        square_area, insulation, year_built, source = make_portfolio(size)
+
+        started = time.perf_counter()
+        insulation_codes, source_codes = encode_insulation(insulation), encode_energy_source(source)
+        encoded = time.perf_counter()
+        estimate_energy_batch(square_area, insulation_codes, year_built, source_codes)
+        finished = time.perf_counter()
+
+        batch_seconds = finished - started
+        line = (f"{size:>9,} properties: batch {batch_seconds * 1000:8.2f} ms "
+                f"(encode {(encoded - started) * 1000:.2f} ms, estimate {(finished - encoded) * 1000:.2f} ms), "
+                f"{size / batch_seconds:,.0f} properties/s")
+        if size <= SCALAR_LIMIT:
+            started = time.perf_counter()
+            asyncio.run(scalar_loop(square_area, insulation, year_built, source))
+            scalar_seconds = time.perf_counter() - started
+            line += f" | scalar loop {scalar_seconds * 1000:,.0f} ms, {size / scalar_seconds:,.0f} properties/s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
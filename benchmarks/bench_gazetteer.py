@@ -0,0 +1,41 @@
+"""
+Benchmark the offline gazetteer: load time, memory footprint and lookup throughput.
+
+Run from the project root:
+    python -m benchmarks.bench_gazetteer
+"""
+import timeit
+import tracemalloc
+
+from services.gazetteer import Gazetteer, GAZETTEER_PATH
+
+QUERIES = ["Berlin", "berlin ", "Berlin, DE", "Paris, TX", "München", "Koeln", "Frankfurt a.M.", "Nowhere"]
+
+
+def main():
+    load_runs = 3
+    load_seconds = timeit.timeit(lambda: Gazetteer.from_csv(GAZETTEER_PATH), number=load_runs) / load_runs
+
+    tracemalloc.start()
+    gazetteer = Gazetteer.from_csv(GAZETTEER_PATH)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"cities: {len(gazetteer)}")
+    print(f"load time: {load_seconds * 1000:.2f} ms")
+    print(f"memory: {current / 1024:.1f} KiB retained, {peak / 1024:.1f} KiB peak")
+
+    # (label, call, runs, lookups per call); resolve.__wrapped__ bypasses the resolve cache
+    for label, fn, runs, lookups in [
+        ("exact lookup", lambda: gazetteer.lookup("Berlin"), 20000, 1),
+        ("resolve (mixed inputs)", lambda: [gazetteer.resolve.__wrapped__(query) for query in QUERIES], 50,
+         len(QUERIES)),
+        ("resolve (cached)", lambda: [gazetteer.resolve(query) for query in QUERIES], 2500, len(QUERIES)),
+        ("prefix search", lambda: gazetteer.search("ber"), 200, 1),
+        ("fuzzy match", lambda: gazetteer.fuzzy("Hamburgg"), 200, 1),
+    ]:
+        per_call = timeit.timeit(fn, number=runs) / runs / lookups
+        print(f"{label}: {per_call * 1e6:.2f} us/lookup")
+
+if __name__ == "__main__":
+    main()
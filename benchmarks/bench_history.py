@@ -0,0 +1,70 @@
+"""
+Benchmark history page latency by page depth: keyset cursors vs OFFSET.
+
+One user owns ROWS recommendations in a SQLite database. Pages are read
+at increasing depth with `read_history` (keyset on (timestamp, id)) and
+with the same query paged by OFFSET.
+
+Run from the project root:
+    python -m benchmarks.bench_history
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User
+from models.history import RECOMMENDATIONS, read_history
+from models.recomendation import Recommendation
+
+ROWS = 200_000
+PAGE_SIZE = 50
+DEPTHS = (0, 100, 1_000, 3_999)  # pages skipped
+REPEAT = 20
+START = datetime(2024, 1, 1)
+
+
+def seed(session) -> None:
+    session.add(User(id=1, name="Heavy user", email="heavy@example.com", hash_password="x", phone_number="+1"))
+    for first in range(0, ROWS, 50_000):
+        session.execute(insert(Recommendation), [
+            {"user_id": 1, "real_estate_id": 1, "category": "Energy Optimization", "message": f"tip {index}",
+             "estimated_savings": 1.5, "timestamp": START + timedelta(minutes=index)}
+            for index in range(first, min(first + 50_000, ROWS))
+        ])
+    session.commit()
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - started) / REPEAT * 1000
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    seed(session)
+
+    model = RECOMMENDATIONS.model
+    offset_query = (select(*(getattr(model, column) for column in RECOMMENDATIONS.columns))
+                    .where(model.user_id == 1).order_by(model.timestamp.desc(), model.id.desc()).limit(PAGE_SIZE))
+    # The keyset cursor of the page at each depth is the (timestamp, id) of the row just before it
+    boundary = session.execute(
+        select(model.timestamp, model.id).where(model.user_id == 1).order_by(model.timestamp.desc(), model.id.desc())
+    ).all()
+
+    print(f"{ROWS:,} rows, {PAGE_SIZE} per page")
+    for depth in DEPTHS:
+        after = tuple(boundary[depth * PAGE_SIZE - 1]) if depth else None
+        keyset = timed(lambda: read_history(session, RECOMMENDATIONS, 1, after, PAGE_SIZE))
+        offset = timed(lambda: session.execute(offset_query.offset(depth * PAGE_SIZE)).all())
+        print(f"page {depth + 1:>5}: keyset {keyset:7.3f} ms   offset {offset:7.3f} ms")
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark costing hourly consumption profiles against compiled tariffs.
+
+Run from the project root:
+    python -m benchmarks.bench_tariffs
+"""
+import time
+
+import numpy as np
+
+from models.tariff import DEFAULT_REGION, Tariff
+from models.tariff_engine import HOURS_PER_YEAR, CompiledTariff, TariffSnapshot
+
+SIZES = (1_000, 10_000, 50_000)
+CHUNK_SIZE = 2_000  # profiles per chunk, bounds memory at CHUNK_SIZE * 8760 floats
+LOOP_LIMIT = 1_000  # the per-hour Python loop gets too slow beyond this
+
+
+def make_snapshot() -> TariffSnapshot:
+    return TariffSnapshot([
+        CompiledTariff.from_row(Tariff(region=DEFAULT_REGION, energy_source="electricity", version=1,
+                                       kind="time_of_use", hourly_rates=[0.22] * 7 + [0.34] * 13 + [0.28] * 4,
+                                       weekend_hourly_rates=[0.22] * 24)),
+        CompiledTariff.from_row(Tariff(region=DEFAULT_REGION, energy_source="natural_gas", version=1,
+                                       kind="tiered", tiers=[[500, 0.09], [None, 0.12]])),
+    ])
+
+
+def python_loop(profiles, tariffs):
+    costs = []
+    for profile, tariff in zip(profiles, tariffs):
+        hourly = tariff.hourly.tolist()
+        costs.append(sum(kwh * rate for kwh, rate in zip(profile.tolist(), hourly)))
+    return costs
+
+
+def main():
+    snapshot = make_snapshot()
+    electricity, gas = snapshot.get(DEFAULT_REGION, "electricity"), snapshot.get(DEFAULT_REGION, "natural_gas")
+    rng = np.random.default_rng(42)
+    chunk = rng.gamma(2.0, 0.5, (CHUNK_SIZE, HOURS_PER_YEAR))  # reused so generation stays out of the timing
+    for size in SIZES:
+        tariffs = [electricity if index % 3 else gas for index in range(size)]
+        started = time.perf_counter()
+        for start in range(0, size, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, size - start)
+            snapshot.cost_profiles(chunk[:count], tariffs[start:start + count])
+        seconds = time.perf_counter() - started
+        line = (f"{size:>7,} profiles x {HOURS_PER_YEAR} h: {seconds * 1000:9.2f} ms, "
+                f"{size / seconds:,.0f} profiles/s")
+
+        if size <= LOOP_LIMIT:
+            profiles = chunk[:size]
+            electric = [electricity] * size
+            started = time.perf_counter()
+            snapshot.cost_profiles(profiles, electric)
+            vectorized = time.perf_counter() - started
+            started = time.perf_counter()
+            python_loop(profiles, electric)
+            looped = time.perf_counter() - started
+            line += f"; dot product {vectorized * 1000:.2f} ms vs Python loop {looped * 1000:.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
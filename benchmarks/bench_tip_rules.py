@@ -0,0 +1,50 @@
+"""
+Benchmark the compiled tip rule index on 100k (weather, property) pairs.
+
+Run from the project root:
+    python -m benchmarks.bench_tip_rules
+"""
+import time
+
+import numpy as np
+
+from models.energy_batch_engine import ENERGY_SOURCES, INSULATION_LEVELS
+from models.tip_rules import load_tip_rules
+
+PAIRS = 100_000
+
+
+def main():
+    started = time.perf_counter()
+    engine = load_tip_rules()
+    print(f"compiled {len(engine)} rules in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    rng = np.random.default_rng(42)
+    columns = {
+        "temperature": rng.uniform(-15, 40, PAIRS).round(1),
+        "humidity": rng.uniform(20, 100, PAIRS).round(),
+        "wind_speed": rng.uniform(0, 20, PAIRS).round(1),
+        "hour": rng.uniform(0, 24, PAIRS),
+        "year_built": rng.integers(1900, 2024, PAIRS),
+        "square_area": rng.integers(20, 600, PAIRS),
+        "insulation_quality": rng.choice(INSULATION_LEVELS, PAIRS).tolist(),
+        "energy_source": rng.choice(ENERGY_SOURCES, PAIRS).tolist(),
+    }
+
+    started = time.perf_counter()
+    batch = engine.tips_batch(PAIRS, **columns)
+    batch_seconds = time.perf_counter() - started
+
+    rows = [{name: values[index] for name, values in columns.items()} for index in range(PAIRS)]
+    started = time.perf_counter()
+    scalar = [engine.tips(**row) for row in rows]
+    scalar_seconds = time.perf_counter() - started
+    assert scalar == batch
+
+    print(f"{PAIRS:,} pairs: batch {batch_seconds * 1000:.1f} ms ({PAIRS / batch_seconds:,.0f} pairs/s), "
+          f"scalar {scalar_seconds * 1000:.1f} ms ({PAIRS / scalar_seconds:,.0f} pairs/s), "
+          f"{len(set(map(id, batch)))} distinct tip tuples")
+
+
+if __name__ == "__main__":
+    main()
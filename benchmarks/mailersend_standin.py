@@ -0,0 +1,105 @@
+"""
+Local stand-in for MailerSend's bulk-email API, for tests and benchmarks.
+
+Implements POST /bulk-email (202 with a bulk_email_id) and
+GET /bulk-email/<id> (state "completed" with per-message validation errors
+for recipients whose address contains "invalid"). Failures and a slow
+validation can be injected through the server's counters.
+
+Run from the project root, then point MAILERSEND_API_URL at it:
+    python -m benchmarks.mailersend_standin 8025
+"""
+import json
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+class MailerSendStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, max_batch: int = 500):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.batches: Dict[str, List[Dict]] = {}
+        self.posts = 0
+        self.fail_next = 0  # answer this many POSTs with HTTP 503
+        self.malformed_next = 0  # answer this many POSTs with a 202 lacking the bulk_email_id
+        self.validating = 0  # answer this many status GETs with state "validating"
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "MailerSendStandIn":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: Dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        messages = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server: MailerSendStandIn = self.server
+        with server.lock:
+            server.posts += 1
+            if server.fail_next:
+                server.fail_next -= 1
+                return self._reply(503, {"message": "Service unavailable"})
+            if server.malformed_next:
+                server.malformed_next -= 1
+                return self._reply(202, {"message": "The bulk email is being processed."})
+        if self.path != "/bulk-email" or len(messages) > server.max_batch:
+            return self._reply(422, {"message": "Invalid bulk request"})
+        bulk_email_id = uuid.uuid4().hex
+        with server.lock:
+            server.batches[bulk_email_id] = messages
+        self._reply(202, {"message": "The bulk email is being processed.", "bulk_email_id": bulk_email_id})
+
+    def do_GET(self):
+        server: MailerSendStandIn = self.server
+        bulk_email_id = self.path.rsplit("/", 1)[-1]
+        with server.lock:
+            messages = server.batches.get(bulk_email_id)
+            validating = server.validating > 0
+            server.validating -= validating
+        if messages is None:
+            return self._reply(404, {"message": "Not found"})
+        if validating:
+            return self._reply(200, {"data": {"id": bulk_email_id, "state": "validating"}})
+        errors = {
+            f"message.{index}.to.0.email": ["The email must be a valid email address."]
+            for index, message in enumerate(messages) if "invalid" in message["to"][0]["email"]
+        }
+        self._reply(200, {"data": {
+            "id": bulk_email_id,
+            "state": "completed",
+            "total_recipients_count": len(messages),
+            "validation_errors_count": len(errors),
+            "validation_errors": errors or None,
+        }})
+
+
+if __name__ == "__main__":
+    server = MailerSendStandIn(int(sys.argv[1]) if len(sys.argv) > 1 else 8025)
+    print(f"MailerSend stand-in listening on {server.url}")
+    server.serve_forever()
@@ -3,7 +3,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 import dotenv
 from models.base import Base  # Import Base from model.py
-from datetime import datetime, timedelta
+from config.db_session import DATABASE_ASYNC, async_database_url
+from config.pool_profiles import create_pooled_engine
 
 
 
@@ -16,22 +17,31 @@ SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("Database URL not set in environment variables.")
 
-# Create the SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Create the SQLAlchemy engine with the deployment's pooling profile (DB_POOL_PROFILE, see config/pool_profiles.py)
+engine = create_pooled_engine(create_engine, SQLALCHEMY_DATABASE_URL, "sync")
 
 # Initialize the sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def clean_up_old_records():
-    with SessionLocal() as session:
-        # Example: Delete notifications older than 30 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        session.query(Notification).filter(Notification.timestamp < thirty_days_ago).delete()
+# Async engine (asyncpg) for the routers, enabled with DATABASE_ASYNC; scheduler jobs and scripts stay sync
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_pooled_engine(create_async_engine, async_database_url(SQLALCHEMY_DATABASE_URL), "async",
+                                        is_async=True)
+    # Objects stay readable after commit: expired attributes cannot be lazily reloaded from async code
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-        # Example: Delete recommendations with expired conditions
-        session.query(Recommendation).filter(Recommendation.timestamp < thirty_days_ago).delete()
+def clean_up_old_records():
+    """
+    Delete notifications and recommendations past their retention window, in small batches.
+    Kept for existing callers; see services/retention.py.
+    """
+    from services.retention import run_retention  # imported late: the retention engine imports SessionLocal
 
-        session.commit()
+    return run_retention()
 
 # Dependency function for session management (useful for FastAPI)
 def get_db():
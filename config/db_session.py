@@ -0,0 +1,61 @@
+"""
+Helpers shared by the sync and async database paths.
+
+With DATABASE_ASYNC enabled the routers get an `AsyncSession` on an asyncpg
+engine, otherwise the synchronous `Session` (kept for SQLite and tests).
+ORM work is written once as plain functions of a session and run with
+`run_db`: on an `AsyncSession` it runs through `run_sync`, so its queries
+await the async driver instead of blocking the event loop; on a sync
+`Session` it runs in the threadpool, like FastAPI runs sync dependencies.
+"""
+import os
+from typing import Callable, TypeVar, Union
+
+from sqlalchemy.engine import make_url
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession
+except ImportError:  # greenlet missing (install sqlalchemy[asyncio]): only the sync path is available
+    AsyncSession = None
+
+T = TypeVar("T")
+
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+DbSession = Union[Session, AsyncSession] if AsyncSession is not None else Session
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """
+    The async driver URL of a database URL: postgresql[+psycopg2]:// -> postgresql+asyncpg://,
+    sqlite:// -> sqlite+aiosqlite://. asyncpg takes `ssl` instead of libpq's `sslmode`.
+    """
+    parsed = make_url(url.replace("postgres://", "postgresql://", 1) if url.startswith("postgres://") else url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases.")
+    parsed = parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+    if backend == "postgresql" and "sslmode" in parsed.query:
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed.render_as_string(hide_password=False)
+
+
+def is_async_session(db) -> bool:
+    return AsyncSession is not None and isinstance(db, AsyncSession)
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run `fn(session, *args, **kwargs)`, a function of a sync `Session`, on either kind of session.
+    On an `AsyncSession` the function gets its sync facade and every query awaits the async driver;
+    on a sync `Session` (the default) it runs in the threadpool, so its blocking queries stay off the event loop.
+    """
+    if is_async_session(db):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
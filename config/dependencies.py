@@ -1,6 +1,9 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy.orm import Session
-from config.database import SessionLocal
+from sqlalchemy.exc import SQLAlchemyError
+from config.database import SessionLocal, AsyncSessionLocal
+from config.db_session import DATABASE_ASYNC
 import logging
 
 
@@ -11,6 +14,9 @@ def db_dependency():
     db = SessionLocal()
     try:
         yield db  # Yield the session to the endpoint
+    except (HTTPException, RequestValidationError):  # the endpoint's own 4xx answers: pass them on unchanged
+        db.rollback()
+        raise
     except Exception as e:  # Catch only Exception or its subclasses
         db.rollback()  # Roll back any pending transaction in case of an error
         logger.error(f"Error connecting to the database_db: {str(e)}")
@@ -20,3 +26,23 @@ def db_dependency():
         )  # Re-raise as HTTPException to alert FastAPI
     finally:
         db.close()  # Ensure the config session is always closed
+
+
+async def async_db_dependency():
+    """
+    AsyncSession per request on the asyncpg engine (DATABASE_ASYNC enabled).
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Error connecting to the database_db: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Database connection error",
+            )
+
+
+# Session dependency of the routers: async when DATABASE_ASYNC is set, the sync session otherwise
+session_dependency = async_db_dependency if DATABASE_ASYNC else db_dependency
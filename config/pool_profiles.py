@@ -0,0 +1,195 @@
+"""
+Connection pooling profiles for the deployments we run, with pool metrics.
+
+- serverless: no pool (NullPool). Every request opens its own connection, so
+  nothing is kept across frozen or recycled lambdas (Vercel). Put an external
+  pooler (PgBouncer, a managed pooler) in front of PostgreSQL and set
+  DB_EXTERNAL_POOLER so asyncpg does not cache prepared statements on
+  pooled server connections.
+- server: a sized QueuePool for long-running uvicorn workers, with pre-ping
+  and recycle so idle connections dropped by the server or a proxy are
+  replaced instead of failing a request.
+- test: one shared connection (StaticPool) for in-memory SQLite.
+
+DB_POOL_PROFILE selects the profile. The default is serverless on Vercel,
+test for in-memory SQLite and server otherwise. Every engine gets a
+`PoolMetrics` (checked-out connections, wait time for a connection, overflow
+and timeout events) exposed at GET /metrics/db-pool.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool, StaticPool
+
+SERVERLESS = "serverless"
+SERVER = "server"
+TEST = "test"
+PROFILES = (SERVERLESS, SERVER, TEST)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "false").lower() in ("1", "true", "yes")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def select_profile(url: str, profile: Optional[str] = None) -> str:
+    """
+    The configured profile (DB_POOL_PROFILE), else serverless on Vercel, test for in-memory SQLite, else server.
+    """
+    profile = (profile or os.getenv("DB_POOL_PROFILE") or "").lower()
+    if not profile:
+        if os.getenv("VERCEL"):
+            profile = SERVERLESS
+        elif _is_memory_sqlite(url):
+            profile = TEST
+        else:
+            profile = SERVER
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE {profile!r}; expected one of {PROFILES}.")
+    if profile == TEST and make_url(url).get_backend_name() != "sqlite":
+        raise ValueError("The test pool profile shares one connection and is meant for SQLite only.")
+    if profile == SERVER and _is_memory_sqlite(url):
+        raise ValueError("In-memory SQLite lives in a single connection; use the test pool profile.")
+    return profile
+
+
+class PoolMetrics:
+    """
+    Counters of one engine's pool, updated from pool events and the instrumented checkout.
+    """
+
+    def __init__(self, name: str, profile: str):
+        self.name = name
+        self.profile = profile
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "checked_out": 0, "peak_checked_out": 0, "checkouts": 0, "connections_opened": 0,
+            "invalidations": 0, "overflow_checkouts": 0, "timeouts": 0,
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._waits = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self._waits += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+            if timed_out:
+                self._counters["timeouts"] += 1
+
+    def attach(self, engine: Engine) -> None:
+        self.engine = engine
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self._counters["connections_opened"] += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            pool = engine.pool
+            with self._lock:
+                counters = self._counters
+                counters["checkouts"] += 1
+                counters["checked_out"] += 1
+                counters["peak_checked_out"] = max(counters["peak_checked_out"], counters["checked_out"])
+                if isinstance(pool, QueuePool) and counters["checked_out"] > pool.size():
+                    counters["overflow_checkouts"] += 1
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self._counters["checked_out"] = max(0, self._counters["checked_out"] - 1)
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            waits, wait_total, wait_max = self._waits, self._wait_total, self._wait_max
+        pool = self.engine.pool if self.engine is not None else None
+        stats.update({
+            "profile": self.profile,
+            "pool": type(pool).__mro__[1].__name__ if pool is not None else None,
+            "pool_size": pool.size() if isinstance(pool, QueuePool) else None,
+            "max_overflow": pool._max_overflow if isinstance(pool, QueuePool) else None,
+            "idle": pool.checkedin() if isinstance(pool, QueuePool) else None,
+            "wait_ms_avg": round(wait_total / waits * 1000, 3) if waits else 0.0,
+            "wait_ms_max": round(wait_max * 1000, 3),
+        })
+        return stats
+
+
+def _instrumented(pool_class: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """
+    Subclass of `pool_class` timing how long each checkout waits for a connection. The metrics live on the
+    class, so pools recreated after a dispose or invalidation keep reporting to them.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = pool_class._do_get(self)
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - started)
+        return record
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"_do_get": _do_get})
+
+
+def engine_options(url: str, profile: str, metrics: PoolMetrics, is_async: bool = False) -> Dict:
+    """
+    Keyword arguments for `create_engine` / `create_async_engine` implementing a profile.
+    """
+    backend = make_url(url).get_backend_name()
+    if profile == SERVERLESS:
+        options: Dict = {"poolclass": _instrumented(NullPool, metrics)}
+        if DB_EXTERNAL_POOLER and is_async and backend == "postgresql":
+            # Transaction-mode poolers hand each transaction a different server connection
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+    if profile == TEST:
+        return {"poolclass": _instrumented(StaticPool, metrics), "connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": _instrumented(AsyncAdaptedQueuePool if is_async else QueuePool, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
+    }
+
+
+# Metrics per engine ("sync", "async"), filled in by config/database.py
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def create_pooled_engine(create, url: str, name: str, profile: Optional[str] = None, is_async: bool = False):
+    """
+    Create an engine with the selected profile and register its pool metrics under `name`.
+    Args:
+        create: `create_engine` or `create_async_engine`.
+    """
+    profile = select_profile(url, profile)
+    metrics = PoolMetrics(name, profile)
+    engine = create(url, **engine_options(url, profile, metrics, is_async))
+    metrics.attach(engine.sync_engine if is_async else engine)
+    pool_metrics[name] = metrics
+    return engine
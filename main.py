@@ -5,10 +5,20 @@ from fastapi import FastAPI, HTTPException, status
 from starlette.staticfiles import StaticFiles
 from models.real_estates import RealEstate
 from config import database
-from config.database import engine, clean_up_old_records
-from routers.energy_estimations import router
-from routers import auth
+from config.database import engine
+from datetime import datetime
+from routers.energy_estimations import router, weather_service
+from routers import auth, history, metrics
 from apscheduler.schedulers.background import BackgroundScheduler
+from services.weather_prefetch import run_weather_prefetch, WEATHER_PREFETCH_INTERVAL_MINUTES
+from models.tip_rules import load_tip_rules
+from services.email_templates import load_email_templates
+from services.estimate_recompute import run_estimate_recompute, run_tariff_reload, \
+    ESTIMATE_RECOMPUTE_INTERVAL_MINUTES, TARIFF_RELOAD_INTERVAL_SECONDS
+from services.digest import run_digest, DIGEST_INTERVAL_MINUTES
+from services.notification_outbox import run_notification_outbox, close_dispatcher, OUTBOX_POLL_INTERVAL_SECONDS
+from services.retention import run_retention
+from services.partitions import run_partition_maintenance
 
 
 # Load environment variables
@@ -42,6 +52,8 @@ except Exception as e:
 # Include routers - user registration endpoints first
 app.include_router(auth.router)  # Include the auth router first for user registration and login
 app.include_router(router)  # Include the main router with routes
+app.include_router(history.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -53,8 +65,26 @@ def start_cleanup_scheduler():
     """"
         Starts the scheduled cleanup task when the FastAPI app starts.
         The task is set to run montly on Sunday at midnight.
+        The weather prefetch runs right away and then every few minutes to keep the cache warm.
+        Dirty property estimates are recomputed every few minutes; published tariffs are reloaded every minute.
+        The tip rule index and the email templates are compiled before the first request.
+        The notification outbox is drained every few seconds; due digests are enqueued every hour.
+        Monthly partitions (PostgreSQL) are created ahead of time at startup and then daily.
     """
-    scheduler.add_job(clean_up_old_records, "cron", day_of_week="sun", hour=0, minute=0)
+    load_tip_rules()
+    load_email_templates()
+    scheduler.add_job(run_retention, "cron", day_of_week="sun", hour=0, minute=0, max_instances=1, coalesce=True)
+    scheduler.add_job(run_partition_maintenance, "cron", hour=0, minute=30, next_run_time=datetime.now(),
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(run_weather_prefetch, "interval", minutes=WEATHER_PREFETCH_INTERVAL_MINUTES,
+                      next_run_time=datetime.now(), max_instances=1, coalesce=True)
+    scheduler.add_job(run_estimate_recompute, "interval", minutes=ESTIMATE_RECOMPUTE_INTERVAL_MINUTES,
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(run_tariff_reload, "interval", seconds=TARIFF_RELOAD_INTERVAL_SECONDS,
+                      next_run_time=datetime.now(), max_instances=1, coalesce=True)
+    scheduler.add_job(run_notification_outbox, "interval", seconds=OUTBOX_POLL_INTERVAL_SECONDS,
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(run_digest, "interval", minutes=DIGEST_INTERVAL_MINUTES, max_instances=1, coalesce=True)
     scheduler.start()
 
 
@@ -64,6 +94,15 @@ def stop_cleanup_scheduler():
         Stops the scheduled cleanup task when the FastAPI app shuts down.
     """
     scheduler.shutdown()
+    close_dispatcher()
+
+
+@app.on_event("shutdown")
+async def close_weather_client():
+    """
+        Closes the pooled weather API client when the FastAPI app shuts down.
+    """
+    await weather_service.aclose()
 
 
 if __name__ == "__main__":
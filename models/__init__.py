@@ -4,6 +4,8 @@ from models.real_estates import RealEstate
 from models.recomendation import Recommendation
 from .notification import Notification
 from .weather_recommendation import WeatherBasedRecommendation
+from .tariff import Tariff
+from .property_estimate import PropertyEstimate
 
 # Add models to a list for easier use with tools like Alembic
 __all__ = [
@@ -13,4 +15,6 @@ __all__ = [
     "Recommendation",
     "Notification",
     "WeatherBasedRecommendation",
+    "Tariff",
+    "PropertyEstimate",
 ]
@@ -0,0 +1,170 @@
+"""
+Hourly degree-hour simulation of a property's annual energy use.
+
+Every location gets an 8760-hour temperature series (a measured series from
+CLIMATE_DATA_DIR when one exists, otherwise a synthetic one derived from the
+gazetteer latitude). Its heating and cooling degree-hours are computed once
+per city and cached, so properties in the same city share the arrays and a
+property's profile is a handful of vector operations.
+"""
+import os
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from models.energy_batch_engine import ENERGY_SOURCES, REFERENCE_YEAR, encode_energy_source, \
+    encode_insulation
+from models.tariff_engine import HOURS_PER_YEAR, HOUR_OF_DAY, MONTH_START_HOURS, TariffSnapshot
+from services.gazetteer import City
+
+CLIMATE_DATA_DIR = os.getenv("CLIMATE_DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "climate"))
+CLIMATE_CACHE_SIZE = int(os.getenv("CLIMATE_CACHE_SIZE", "256"))
+
+HEATING_BASE_TEMP = 18.0  # °C, below which the building is heated
+COOLING_BASE_TEMP = 24.0  # °C, above which it is cooled
+COOLING_COP = 3.0  # kWh of heat removed per kWh of electricity
+BASE_LOAD_W_PER_M2 = 3.0  # appliances, lighting and hot water
+# Base load share per hour of day (mean 1): low at night, peaks in the morning and evening
+BASE_LOAD_SHAPE = np.array([0.5, 0.4, 0.4, 0.4, 0.5, 0.7, 1.1, 1.4, 1.3, 1.0, 0.9, 0.9,
+                            1.0, 0.9, 0.9, 1.0, 1.2, 1.5, 1.7, 1.6, 1.4, 1.1, 0.8, 0.6])
+BASE_LOAD_SHAPE = BASE_LOAD_SHAPE / BASE_LOAD_SHAPE.mean()
+# Heat loss per m² of floor area and kelvin (W/(m²·K)), indexed like INSULATION_LEVELS
+HEAT_LOSS_W_PER_M2K = np.array([2.0, 1.5, 1.0])
+
+DIURNAL_AMPLITUDE = 4.0  # °C between the daily mean and the 15:00 peak
+_DAY_OF_YEAR = np.arange(HOURS_PER_YEAR) // 24
+
+
+class Climate(NamedTuple):
+    """
+    Hourly climate of one location; arrays are read-only and shared.
+    """
+    city_id: str
+    temperature: np.ndarray  # °C per hour
+    heating_degree_hours: np.ndarray  # K·h below HEATING_BASE_TEMP per hour
+    cooling_degree_hours: np.ndarray  # K·h above COOLING_BASE_TEMP per hour
+
+
+def synthetic_temperatures(lat: float) -> np.ndarray:
+    """
+    Plausible hourly temperatures (°C) for a latitude: an annual sinusoid whose
+    mean falls and amplitude grows away from the equator, plus a daily cycle.
+    """
+    distance = abs(lat)
+    annual_mean = 30.0 - 0.4 * distance
+    annual_amplitude = min(0.18 * distance, 20.0)
+    coldest_day = 15 if lat >= 0 else 197  # mid January in the north, mid July in the south
+    seasonal = -np.cos(2 * np.pi * (_DAY_OF_YEAR - coldest_day) / 365)
+    daily = np.cos(2 * np.pi * (HOUR_OF_DAY - 15) / 24)
+    return annual_mean + annual_amplitude * seasonal + DIURNAL_AMPLITUDE * daily
+
+
+def _load_temperatures(city: City) -> np.ndarray:
+    path = os.path.join(CLIMATE_DATA_DIR, f"{city.id}.csv")
+    if os.path.exists(path):
+        temperatures = np.loadtxt(path, delimiter=",", dtype=np.float64)
+        if temperatures.shape == (HOURS_PER_YEAR,):
+            return temperatures
+    return synthetic_temperatures(city.lat)
+
+
+@lru_cache(maxsize=CLIMATE_CACHE_SIZE)
+def load_climate(city: City) -> Climate:
+    """
+    Cached hourly climate and degree-hours of a gazetteer city.
+    """
+    temperature = _load_temperatures(city)
+    heating = np.maximum(HEATING_BASE_TEMP - temperature, 0.0)
+    cooling = np.maximum(temperature - COOLING_BASE_TEMP, 0.0)
+    for array in (temperature, heating, cooling):
+        array.flags.writeable = False
+    return Climate(city.id, temperature, heating, cooling)
+
+
+def simulate_profiles(square_area, insulation_codes, year_built, climate: Climate) -> np.ndarray:
+    """
+    Hourly consumption (kWh) of properties sharing one climate.
+    Args:
+        square_area: Square areas (m²).
+        insulation_codes: Codes from `encode_insulation`.
+        year_built: Construction years.
+        climate: Climate of their location.
+    Returns:
+        np.ndarray: (n, 8760) kWh per property and hour.
+    """
+    square_area = np.asarray(square_area, dtype=np.float64)
+    age_factor = 1 + (REFERENCE_YEAR - np.asarray(year_built, dtype=np.float64)) / 100  # Aging factor
+    heat_loss_kw = square_area * HEAT_LOSS_W_PER_M2K[insulation_codes] * age_factor / 1000  # kW per K
+    base_load_kw = square_area * BASE_LOAD_W_PER_M2 / 1000
+    return (
+        heat_loss_kw[:, None] * climate.heating_degree_hours
+        + (heat_loss_kw / COOLING_COP)[:, None] * climate.cooling_degree_hours
+        + base_load_kw[:, None] * BASE_LOAD_SHAPE[HOUR_OF_DAY]
+    )
+
+
+def monthly_rollup(profiles: np.ndarray) -> np.ndarray:
+    """
+    Sum hourly values into calendar months: (n, 8760) -> (n, 12).
+    """
+    return np.add.reduceat(np.atleast_2d(profiles), MONTH_START_HOURS, axis=1)
+
+
+def project_annual(
+        square_area: int, insulation_quality: Optional[str], year_built: int, energy_source: Optional[str],
+        city: City, snapshot: TariffSnapshot, include_hourly: bool = False,
+) -> Dict:
+    """
+    Annual projection of one property: monthly kWh and cost, totals and degree-days.
+    The tariff of the property's country applies when one is published.
+    """
+    climate = load_climate(city)
+    profile = simulate_profiles([square_area], encode_insulation([insulation_quality]), [year_built], climate)
+    source = ENERGY_SOURCES[encode_energy_source([energy_source])[0]]
+    tariff = snapshot.get(city.country, source)
+    monthly_kwh = monthly_rollup(profile)[0]
+    monthly_cost = snapshot.monthly_cost_profiles(profile, [tariff])[0]
+
+    projection = {
+        "city": city.name,
+        "country": city.country,
+        "energy source": source,
+        "tariff version": tariff.version,
+        "heating degree-days": round(float(climate.heating_degree_hours.sum()) / 24, 1),
+        "cooling degree-days": round(float(climate.cooling_degree_hours.sum()) / 24, 1),
+        "annual energy usage (kWh)": round(float(monthly_kwh.sum()), 3),
+        "annual cost (€)": round(float(monthly_cost.sum()), 3),
+        "months": [
+            {"month": month, "energy usage (kWh)": round(kwh, 3), "cost (€)": round(cost, 3)}
+            for month, (kwh, cost) in enumerate(zip(monthly_kwh.tolist(), monthly_cost.tolist()), start=1)
+        ],
+    }
+    if include_hourly:
+        projection["hourly energy usage (kWh)"] = np.round(profile[0], 4).tolist()
+    return projection
+
+
+def simulate_portfolio(
+        square_area: Sequence[int], insulation_quality: Sequence[Optional[str]], year_built: Sequence[int],
+        cities: Sequence[City],
+) -> np.ndarray:
+    """
+    Annual kWh of many properties without materializing their hourly profiles.
+    The profile is linear in the degree-hours, so its annual sum only needs the
+    per-city degree-hour totals.
+    Returns:
+        np.ndarray: (n,) kWh per property.
+    """
+    square_area = np.asarray(square_area, dtype=np.float64)
+    age_factor = 1 + (REFERENCE_YEAR - np.asarray(year_built, dtype=np.float64)) / 100
+    heat_loss_kw = square_area * HEAT_LOSS_W_PER_M2K[encode_insulation(insulation_quality)] * age_factor / 1000
+
+    totals: Dict[City, tuple] = {}
+    for city in cities:
+        if city not in totals:
+            climate = load_climate(city)
+            totals[city] = (climate.heating_degree_hours.sum(), climate.cooling_degree_hours.sum())
+    heating, cooling = np.array([totals[city] for city in cities]).reshape(-1, 2).T
+    base_load_kwh = square_area * BASE_LOAD_W_PER_M2 / 1000 * HOURS_PER_YEAR
+    return heat_loss_kw * (heating + cooling / COOLING_COP) + base_load_kwh
@@ -0,0 +1,134 @@
+"""
+Vectorized energy estimation over column arrays.
+
+Categorical attributes are encoded once into small integer codes and looked
+up in module-level factor tables, so estimating a whole portfolio is a few
+NumPy operations instead of one Python call per property.
+"""
+from typing import Iterable, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+BASELINE_CONSUMPTION = 4  # kWh per square area per month
+REFERENCE_YEAR = 2024
+DAYS_PER_MONTH = 30
+
+INSULATION_LEVELS = ("poor", "average", "good")
+INSULATION_FACTORS = np.array([1.2, 1.0, 0.8])
+DEFAULT_INSULATION_CODE = INSULATION_LEVELS.index("average")
+
+ENERGY_SOURCES = ("electricity", "natural_gas", "solar")
+# Built-in € per kWh, used until tariffs are published in the database (see models/tariff_engine.py)
+ENERGY_RATES = np.array([0.28, 0.09, 0.02])
+TARIFF_VERSION = "builtin-2024"  # bump when ENERGY_RATES change so materialized estimates are recomputed
+DEFAULT_ENERGY_SOURCE_CODE = ENERGY_SOURCES.index("electricity")
+
+_INSULATION_CODES = {name: code for code, name in enumerate(INSULATION_LEVELS)}
+_ENERGY_SOURCE_CODES = {name: code for code, name in enumerate(ENERGY_SOURCES)}
+
+
+def _encode(values: Iterable[Optional[str]], codes: dict, default: int) -> np.ndarray:
+    # Portfolios repeat a handful of distinct strings, so each one is folded and looked up once
+    memo = {}
+
+    def code(value):
+        try:
+            return memo[value]
+        except KeyError:
+            memo[value] = result = codes.get(value.lower(), default) if value else default
+            return result
+
+    if isinstance(values, np.ndarray) and values.dtype.kind in "US":
+        distinct, inverse = np.unique(values, return_inverse=True)
+        return np.fromiter(map(code, distinct.tolist()), dtype=np.int8, count=len(distinct))[inverse.ravel()]
+    return np.fromiter(map(code, values), dtype=np.int8)
+
+
+def encode_insulation(values: Iterable[Optional[str]]) -> np.ndarray:
+    """
+    Map insulation quality strings to codes; unknown values count as "average".
+    """
+    return _encode(values, _INSULATION_CODES, DEFAULT_INSULATION_CODE)
+
+
+def encode_energy_source(values: Iterable[Optional[str]]) -> np.ndarray:
+    """
+    Map energy source strings to codes; missing or unknown sources count as electricity.
+    """
+    return _encode(values, _ENERGY_SOURCE_CODES, DEFAULT_ENERGY_SOURCE_CODE)
+
+
+class BlockRates(NamedTuple):
+    """
+    Block (tiered) pricing of the monthly usage by energy source code, shape (sources, blocks) each.
+    A flat rate is a single open-ended block; shorter tier lists are padded with empty blocks.
+    """
+    lower: np.ndarray  # kWh per month where each block starts
+    width: np.ndarray  # kWh per month each block spans (inf for the open-ended one, 0 for padding)
+    rates: np.ndarray  # € per kWh inside each block
+
+    @classmethod
+    def from_tiers(cls, tiers_by_source: Iterable[Iterable[Tuple[float, float]]]) -> "BlockRates":
+        """
+        Args:
+            tiers_by_source: [(upper_kwh_per_month, rate), ...] per energy source code, inf for the last upper bound.
+        """
+        tiers_by_source = [list(tiers) for tiers in tiers_by_source]
+        blocks = max(len(tiers) for tiers in tiers_by_source)
+        lower = np.full((len(tiers_by_source), blocks), np.inf)
+        width = np.zeros((len(tiers_by_source), blocks))
+        rates = np.zeros((len(tiers_by_source), blocks))
+        for code, tiers in enumerate(tiers_by_source):
+            start = 0.0
+            for block, (upper, rate) in enumerate(tiers):
+                lower[code, block], width[code, block], rates[code, block] = start, upper - start, rate
+                start = upper
+        for array in (lower, width, rates):
+            array.flags.writeable = False
+        return cls(lower, width, rates)
+
+
+Rates = Union[np.ndarray, BlockRates]
+
+
+def calculate_energy_usage_batch(square_area, insulation_codes, year_built) -> np.ndarray:
+    """
+    Monthly energy usage (kWh) for every property.
+    Args:
+        square_area: Square areas (m²).
+        insulation_codes: Codes from `encode_insulation`.
+        year_built: Construction years.
+    Returns:
+        np.ndarray: float64 usage per property.
+    """
+    square_area = np.asarray(square_area, dtype=np.float64)
+    age_factor = 1 + (REFERENCE_YEAR - np.asarray(year_built, dtype=np.float64)) / 100  # Aging factor
+    return square_area * BASELINE_CONSUMPTION * INSULATION_FACTORS[insulation_codes] * age_factor
+
+
+def calculate_energy_cost_batch(energy_consumption, energy_source_codes, rates: Optional[Rates] = None) -> np.ndarray:
+    """
+    Daily energy cost (€) for every property.
+    Args:
+        energy_consumption: Monthly usage (kWh), e.g. from `calculate_energy_usage_batch`.
+        energy_source_codes: Codes from `encode_energy_source`.
+        rates: Optional €/kWh table indexed by energy source code, or `BlockRates` to price tiered tariffs on the
+            monthly usage.
+    """
+    rates = ENERGY_RATES if rates is None else rates
+    usage = np.asarray(energy_consumption, dtype=np.float64)
+    if isinstance(rates, BlockRates):
+        # kWh falling into each block: shape (n, blocks)
+        in_block = np.clip(usage[:, None] - rates.lower[energy_source_codes], 0.0, rates.width[energy_source_codes])
+        return (in_block * rates.rates[energy_source_codes]).sum(axis=1) / DAYS_PER_MONTH
+    return usage * rates[energy_source_codes] / DAYS_PER_MONTH
+
+
+def estimate_energy_batch(
+        square_area, insulation_codes, year_built, energy_source_codes, rates: Optional[Rates] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Usage and cost arrays for a batch of properties in one vectorized pass.
+    """
+    usage = calculate_energy_usage_batch(square_area, insulation_codes, year_built)
+    return usage, calculate_energy_cost_batch(usage, energy_source_codes, rates)
@@ -0,0 +1,120 @@
+"""
+Read-back of a user's stored recommendations, weather tips and notifications, newest first.
+
+Pages use keyset cursors on (timestamp, id): the next page starts strictly
+after the last row returned, so reading page 1000 costs the same index seek
+on (user_id, timestamp) as reading page 1, where OFFSET would walk and
+discard every earlier row. The cursor is opaque to clients (URL-safe base64
+of the last row's timestamp and id). Only the columns the dashboard shows are
+selected; the rendered email bodies stored with outbox notifications are
+never read.
+"""
+import base64
+import binascii
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from models.base import Base
+from models.notification import Notification
+from models.recomendation import Recommendation
+from models.weather_recommendation import WeatherBasedRecommendation
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = 500
+
+
+@dataclass(frozen=True)
+class HistorySource:
+    """
+    A history table, the columns returned for it and the columns it can be filtered on.
+    """
+    model: Type[Base]
+    columns: Sequence[str]
+    filters: Sequence[str] = ()
+
+
+RECOMMENDATIONS = HistorySource(
+    Recommendation, ("id", "timestamp", "category", "message", "estimated_savings", "real_estate_id"),
+    filters=("category", "real_estate_id"),
+)
+WEATHER_TIPS = HistorySource(
+    WeatherBasedRecommendation, ("id", "timestamp", "message", "temperature_condition", "weather_tips"),
+)
+NOTIFICATIONS = HistorySource(
+    Notification, ("id", "timestamp", "status", "subject", "message", "attempts"),
+    filters=("status",),
+)
+
+
+def naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """
+    A timestamp as naive UTC, the form the `timestamp` columns store; naive values are taken as UTC already.
+    """
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    The (timestamp, id) of a cursor from `encode_cursor`.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from error
+
+
+def read_history(db: Session, source: HistorySource, user_id: int, after: Optional[Tuple[datetime, int]] = None,
+                 limit: int = HISTORY_PAGE_SIZE, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 **filters) -> Dict:
+    """
+    One page of a user's rows of `source`, newest first.
+    Args:
+        db (Session): Active SQLAlchemy database session.
+        after: Decoded cursor, the (timestamp, id) of the last row of the previous page.
+        since, until: Only rows with since <= timestamp < until; aware values are converted to naive UTC.
+        **filters: Column values to match, for the columns in `source.filters`; None is ignored.
+    Returns:
+        dict: The rows and the cursor of the next page (None on the last page).
+    """
+    model = source.model
+    timestamp, row_id = model.timestamp, model.id
+    statement = select(*(getattr(model, column) for column in source.columns)).where(
+        model.user_id == user_id, timestamp.isnot(None)
+    )
+    for column, value in filters.items():
+        if column not in source.filters:
+            raise ValueError(f"{model.__tablename__} cannot be filtered on {column}.")
+        if value is not None:
+            statement = statement.where(getattr(model, column) == value)
+    since, until = naive_utc(since), naive_utc(until)
+    if since is not None:
+        statement = statement.where(timestamp >= since)
+    if until is not None:
+        statement = statement.where(timestamp < until)
+    if after is not None:
+        after_timestamp, after_id = after
+        # The first condition bounds the index range on (user_id, timestamp); the second breaks timestamp ties
+        statement = statement.where(
+            timestamp <= after_timestamp, or_(timestamp < after_timestamp, row_id < after_id)
+        )
+    rows = db.execute(statement.order_by(timestamp.desc(), row_id.desc()).limit(limit + 1)).all()
+
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1]["timestamp"], items[-1]["id"]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,8 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Integer, Column, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from typing import Dict, Iterable, Optional
+from sqlalchemy import Integer, Column, String, DateTime, ForeignKey, Index, JSON, Text, insert
+from sqlalchemy.orm import relationship, Session
 from models import Base
 
+# Outbox statuses: Pending -> Sending (claimed by a worker) -> Sent / Queued / Failed, or back to Pending to retry;
+# Queued (the provider was still validating) -> Sent / Failed once its bulk status is polled
+STATUS_PENDING = "Pending"
+STATUS_SENDING = "Sending"
+
 
 
 class Notification(Base):
@@ -11,8 +17,20 @@ class Notification(Base):
 
     This model stores notifications sent to users, including the notification's message,
     timestamp, status (e.g., SMS sent status), and the user it belongs to.
+
+    Email notifications double as a transactional outbox: the rendered email is
+    stored with the row in the request's transaction and workers claim pending
+    rows, send them and retry failures with backoff (see services/notification_outbox.py).
+    Emails needing slow inputs (weather) are stored as a template name and its
+    values instead and rendered by the worker (services/outbox_rendering.py).
+
+    On PostgreSQL the table is partitioned by month on `timestamp` (services/partitions.py).
     """
     __tablename__ = 'notifications'
+    __table_args__ = (
+        Index("ix_notifications_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_notifications_user_id_timestamp", "user_id", "timestamp"),
+    )
 
     # Primary key for unique notification identification
     id = Column(Integer, primary_key=True)
@@ -21,6 +39,22 @@ class Notification(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     status = Column(String(50), nullable=False, default="SMS sent successfully", index=True)
 
+    # Outbox payload and delivery state
+    recipient_name = Column(String(255), nullable=True)
+    subject = Column(String(255), nullable=True)
+    html_content = Column(Text, nullable=True)
+    text_content = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(String(500), nullable=True)
+    # Renderer and inputs of an email enqueued before it could be rendered (enqueue_templated_email)
+    template = Column(String(100), nullable=True)
+    template_values = Column(JSON, nullable=True)
+    # Provider bulk request of a "Queued" email and its position in it, to resolve it by polling the bulk status
+    bulk_email_id = Column(String(64), nullable=True)
+    bulk_index = Column(Integer, nullable=True)
+
     # Foreign key to associate notification with a user
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     user = relationship("User", back_populates="notifications")
@@ -43,3 +77,70 @@ def create_notification(db_session, user_email: str, message: str, user_id: int)
     db_session.commit()
     db_session.refresh(notification)
     return notification
+
+
+def enqueue_email(db_session: Session, user_id: int, user_email: str, recipient_name: Optional[str], subject: str,
+                  html_content: str, text_content: str, message: Optional[str] = None) -> Notification:
+    """
+    Add an email to the outbox without committing, so it is sent only if the caller's transaction commits.
+    Args:
+        db_session (Session): The caller's session; the row is flushed with its next commit.
+        html_content (str): Finished HTML (sent as is, no newline conversion).
+    Returns:
+        Notification: The pending outbox row.
+    """
+    notification = Notification(
+        email=user_email,
+        message=message or f"Email scheduled for {user_email}",
+        status=STATUS_PENDING,
+        user_id=user_id,
+        recipient_name=recipient_name,
+        subject=subject,
+        html_content=html_content,
+        text_content=text_content,
+        attempts=0,
+    )
+    db_session.add(notification)
+    return notification
+
+
+def enqueue_templated_email(db_session: Session, user_id: int, user_email: str, recipient_name: Optional[str],
+                            template: str, values: Dict, message: Optional[str] = None) -> Notification:
+    """
+    Add an email to the outbox as a template and its values, without committing; the outbox worker renders it.
+    Args:
+        template (str): Renderer name, e.g. "optimization_report" (services/outbox_rendering.py).
+        values (dict): JSON-serializable inputs of the renderer.
+    Returns:
+        Notification: The pending outbox row.
+    """
+    notification = Notification(
+        email=user_email,
+        message=message or f"Email scheduled for {user_email}",
+        status=STATUS_PENDING,
+        user_id=user_id,
+        recipient_name=recipient_name,
+        template=template,
+        template_values=values,
+        attempts=0,
+    )
+    db_session.add(notification)
+    return notification
+
+
+def enqueue_emails(db_session: Session, emails: Iterable[Dict]) -> int:
+    """
+    Bulk variant of `enqueue_email` for batch jobs: one INSERT for many emails, not committed.
+    Args:
+        emails: Dicts with user_id, email, recipient_name, subject, html_content and text_content.
+    Returns:
+        int: Number of emails enqueued.
+    """
+    rows = [
+        dict(email, message=email.get("message") or f"Email scheduled for {email['email']}",
+             status=STATUS_PENDING, attempts=0)
+        for email in emails
+    ]
+    if rows:
+        db_session.execute(insert(Notification), rows)
+    return len(rows)
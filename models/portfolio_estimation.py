@@ -0,0 +1,129 @@
+from typing import Dict, Optional
+import numpy as np
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from models.energy_batch_engine import encode_energy_source, encode_insulation, estimate_energy_batch
+from models.real_estates import RealEstate
+from models.recomendation import Recommendation
+from models.tariff_engine import tariff_registry
+
+PORTFOLIO_PAGE_SIZE = 500
+PORTFOLIO_MAX_PAGE_SIZE = 5000
+
+
+def estimate_portfolio(db: Session, user_id: int, after_id: int = 0, limit: int = PORTFOLIO_PAGE_SIZE) -> Dict:
+    """
+    Estimate one page of a user's properties in a single batch.
+
+    Properties are read with one column-projected query (keyset pagination on
+    the id), estimated in one vectorized pass and their `Recommendation` rows
+    are written with a single bulk insert. The totals cover the whole portfolio
+    (see `portfolio_totals`), the page totals only the properties returned.
+    Args:
+        db (Session): Active SQLAlchemy database session.
+        user_id (int): Owner of the properties.
+        after_id (int): Keyset cursor, the last property id of the previous page.
+        limit (int): Page size.
+    Returns:
+        dict: Per-property estimates, portfolio and page totals and the cursor of the next page (None on the last
+            page).
+    """
+    rows = (
+        db.query(
+            RealEstate.id,
+            RealEstate.square_area,
+            RealEstate.insulation_quality,
+            RealEstate.year_built,
+            RealEstate.energy_source,
+            RealEstate.location,
+        )
+        .filter(RealEstate.user_id == user_id, RealEstate.id > after_id)
+        .order_by(RealEstate.id)
+        .limit(limit)
+        .all()
+    )
+    if not rows:
+        return {"properties": [], "totals": portfolio_totals(db, user_id), "page_totals": _totals(0, 0.0, 0.0),
+                "next_after_id": None}
+
+    ids, square_areas, insulation, years_built, sources, locations = zip(*rows)
+    usage, cost = estimate_energy_batch(
+        square_areas, encode_insulation(insulation), years_built, encode_energy_source(sources),
+        tariff_registry.snapshot.block_rates,
+    )
+    usage_list, cost_list = usage.tolist(), cost.tolist()
+
+    db.execute(
+        insert(Recommendation),
+        [
+            {
+                "category": "Energy Optimization",
+                "message": f"Estimated daily cost: {estimated_cost:.2f} €.",
+                "estimated_savings": estimated_cost,
+                "user_id": user_id,
+                "real_estate_id": real_estate_id,
+            }
+            for real_estate_id, estimated_cost in zip(ids, cost_list)
+        ],
+    )
+    db.commit()
+
+    properties = [
+        {
+            "property_id": real_estate_id,
+            "location": location,
+            "energy source": source or "electricity",
+            "estimated energy usage (kWh)": round(energy_usage, 3),
+            "estimated daily cost (€)": round(estimated_cost, 3),
+        }
+        for real_estate_id, location, source, energy_usage, estimated_cost
+        in zip(ids, locations, sources, usage_list, cost_list)
+    ]
+    next_after_id: Optional[int] = ids[-1] if len(rows) == limit else None
+    return {
+        "properties": properties,
+        "totals": portfolio_totals(db, user_id),
+        "page_totals": _totals(len(rows), float(usage.sum()), float(cost.sum())),
+        "next_after_id": next_after_id,
+    }
+
+
+def portfolio_totals(db: Session, user_id: int) -> Dict:
+    """
+    Totals over all of a user's properties, without reading them one by one.
+
+    An estimate depends only on the area, insulation, age and energy source of a
+    property, so one GROUP BY query returns each distinct combination with its
+    count and the batch engine estimates those combinations, weighted by count.
+    The result is exact, also for tiered tariffs.
+    """
+    groups = (
+        db.query(
+            RealEstate.square_area,
+            RealEstate.insulation_quality,
+            RealEstate.year_built,
+            RealEstate.energy_source,
+            func.count(),
+        )
+        .filter(RealEstate.user_id == user_id)
+        .group_by(RealEstate.square_area, RealEstate.insulation_quality, RealEstate.year_built,
+                  RealEstate.energy_source)
+        .all()
+    )
+    if not groups:
+        return _totals(0, 0.0, 0.0)
+    square_areas, insulation, years_built, sources, counts = zip(*groups)
+    usage, cost = estimate_energy_batch(
+        square_areas, encode_insulation(insulation), years_built, encode_energy_source(sources),
+        tariff_registry.snapshot.block_rates,
+    )
+    counts = np.asarray(counts, dtype=np.float64)
+    return _totals(int(counts.sum()), float(usage @ counts), float(cost @ counts))
+
+
+def _totals(count: int, energy_usage: float, estimated_cost: float) -> Dict:
+    return {
+        "properties": count,
+        "total energy usage (kWh)": round(energy_usage, 3),
+        "total daily cost (€)": round(estimated_cost, 3),
+    }
@@ -0,0 +1,205 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, event, func, inspect, \
+    insert, or_, select, update
+from sqlalchemy.orm import Session, relationship
+from models.base import Base
+from models.energy_batch_engine import DEFAULT_ENERGY_SOURCE_CODE, ENERGY_SOURCES, encode_energy_source, \
+    encode_insulation, estimate_energy_batch
+from models.real_estates import RealEstate
+from models.tariff_engine import TariffSnapshot, tariff_registry
+
+# RealEstate columns that feed the estimate; changing any of them makes it dirty
+ESTIMATE_INPUTS = ("square_area", "insulation_quality", "year_built", "energy_source")
+
+
+class PropertyEstimate(Base):
+    """
+    Materialized energy estimate of one real estate property.
+
+    Rows are flagged dirty when their property's inputs or the tariffs change
+    and recomputed in batches, so reading an estimate is a primary-key lookup.
+    """
+    __tablename__ = 'property_estimates'
+
+    real_estate_id = Column(Integer, ForeignKey('real_estates.id', ondelete="CASCADE"), primary_key=True)
+    energy_usage = Column(Float, nullable=True)
+    estimated_cost = Column(Float, nullable=True)
+    input_fingerprint = Column(String(64), nullable=True)
+    tariff_version = Column(String(50), nullable=True)
+    is_dirty = Column(Boolean, nullable=False, default=True, index=True)
+    computed_at = Column(DateTime, nullable=True)
+
+    real_estate = relationship("RealEstate", back_populates="estimate")
+
+
+def input_fingerprint(square_area: int, insulation_quality: str, year_built: int, energy_source: Optional[str],
+                      tariff_version: str) -> str:
+    """
+    Stable hash of everything an estimate depends on.
+    """
+    raw = "|".join(str(value) for value in (
+        square_area, (insulation_quality or "").lower(), year_built, (energy_source or "").lower(), tariff_version
+    ))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _fingerprint_of(real_estate: RealEstate, snapshot: TariffSnapshot) -> str:
+    return input_fingerprint(real_estate.square_area, real_estate.insulation_quality, real_estate.year_built,
+                             real_estate.energy_source, snapshot.version_for(real_estate.energy_source))
+
+
+@event.listens_for(RealEstate, "after_insert")
+def _create_dirty_estimate(mapper, connection, target: RealEstate) -> None:
+    """
+    Queue the estimate of a new property for computation.
+    """
+    connection.execute(insert(PropertyEstimate.__table__).values(real_estate_id=target.id, is_dirty=True))
+
+
+@event.listens_for(RealEstate, "after_update")
+def _mark_estimate_dirty(mapper, connection, target: RealEstate) -> None:
+    """
+    Flag the estimate of a property whose estimate inputs changed.
+    """
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ESTIMATE_INPUTS):
+        return
+    estimates = PropertyEstimate.__table__
+    result = connection.execute(
+        update(estimates).where(estimates.c.real_estate_id == target.id).values(is_dirty=True)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(estimates).values(real_estate_id=target.id, is_dirty=True))
+
+
+def get_property_estimate(db: Session, real_estate: RealEstate) -> PropertyEstimate:
+    """
+    Current estimate of a property: a primary-key lookup, recomputed inline only
+    when the row is missing, dirty or was computed from different inputs.
+    """
+    snapshot = tariff_registry.snapshot
+    estimate = db.get(PropertyEstimate, real_estate.id)
+    fingerprint = _fingerprint_of(real_estate, snapshot)
+    if estimate is not None and not estimate.is_dirty and estimate.input_fingerprint == fingerprint:
+        return estimate
+
+    usage, cost = estimate_energy_batch(
+        [real_estate.square_area],
+        encode_insulation([real_estate.insulation_quality]),
+        [real_estate.year_built],
+        encode_energy_source([real_estate.energy_source]),
+        snapshot.block_rates,
+    )
+    if estimate is None:
+        estimate = PropertyEstimate(real_estate_id=real_estate.id)
+        db.add(estimate)
+    estimate.energy_usage = float(usage[0])
+    estimate.estimated_cost = float(cost[0])
+    estimate.input_fingerprint = fingerprint
+    estimate.tariff_version = snapshot.version_for(real_estate.energy_source)
+    estimate.is_dirty = False
+    estimate.computed_at = datetime.utcnow()
+    db.commit()
+    return estimate
+
+
+def mark_tariff_change(db: Session, energy_sources: Optional[Iterable[str]] = None, commit: bool = True) -> int:
+    """
+    Flag the estimates affected by a tariff change (all of them when no source is given).
+    Properties without an energy source are billed as electricity.
+    Returns:
+        int: Number of estimates flagged dirty.
+    """
+    statement = update(PropertyEstimate).where(PropertyEstimate.is_dirty.is_(False))
+    if energy_sources is not None:
+        sources = [source.lower() for source in energy_sources]
+        condition = func.lower(RealEstate.energy_source).in_(sources)
+        if ENERGY_SOURCES[DEFAULT_ENERGY_SOURCE_CODE] in sources:
+            condition = or_(condition, RealEstate.energy_source.is_(None),
+                            func.lower(RealEstate.energy_source).not_in(ENERGY_SOURCES))
+        properties = select(RealEstate.id).where(condition)
+        statement = statement.where(PropertyEstimate.real_estate_id.in_(properties))
+    result = db.execute(statement.values(is_dirty=True).execution_options(synchronize_session=False))
+    if commit:
+        db.commit()
+    return result.rowcount
+
+
+def ensure_estimate_rows(db: Session) -> int:
+    """
+    Create dirty placeholder rows for properties that have no estimate yet
+    (e.g. rows written with bulk inserts, which bypass the ORM events).
+    """
+    missing = (
+        select(RealEstate.id, True)
+        .outerjoin(PropertyEstimate, PropertyEstimate.real_estate_id == RealEstate.id)
+        .where(PropertyEstimate.real_estate_id.is_(None))
+    )
+    result = db.execute(
+        insert(PropertyEstimate).from_select([PropertyEstimate.real_estate_id, PropertyEstimate.is_dirty], missing)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def recompute_dirty_estimates(db: Session, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Recompute dirty estimates only, one keyset-paginated batch at a time.
+
+    Rows whose fingerprint did not change (e.g. a tariff change that did not
+    touch their version) are just marked clean.
+    Returns:
+        dict: Numbers of recomputed and unchanged estimates.
+    """
+    recomputed = unchanged = 0
+    last_id = 0
+    snapshot = tariff_registry.snapshot
+    while True:
+        rows = db.execute(
+            select(
+                PropertyEstimate.real_estate_id,
+                PropertyEstimate.input_fingerprint,
+                RealEstate.square_area,
+                RealEstate.insulation_quality,
+                RealEstate.year_built,
+                RealEstate.energy_source,
+            )
+            .join(RealEstate, RealEstate.id == PropertyEstimate.real_estate_id)
+            .where(PropertyEstimate.is_dirty.is_(True), PropertyEstimate.real_estate_id > last_id)
+            .order_by(PropertyEstimate.real_estate_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ids, old_fingerprints, square_areas, insulation, years_built, sources = zip(*rows)
+        usage, cost = estimate_energy_batch(
+            square_areas, encode_insulation(insulation), years_built, encode_energy_source(sources),
+            snapshot.block_rates,
+        )
+        now = datetime.utcnow()
+        changes = []
+        for index, real_estate_id in enumerate(ids):
+            tariff_version = snapshot.version_for(sources[index])
+            fingerprint = input_fingerprint(square_areas[index], insulation[index], years_built[index], sources[index],
+                                            tariff_version)
+            if fingerprint == old_fingerprints[index]:
+                changes.append({"real_estate_id": real_estate_id, "is_dirty": False})
+                unchanged += 1
+                continue
+            changes.append({
+                "real_estate_id": real_estate_id,
+                "energy_usage": float(usage[index]),
+                "estimated_cost": float(cost[index]),
+                "input_fingerprint": fingerprint,
+                "tariff_version": tariff_version,
+                "is_dirty": False,
+                "computed_at": now,
+            })
+            recomputed += 1
+        db.execute(update(PropertyEstimate), changes)  # bulk UPDATE by primary key
+        db.commit()
+        last_id = ids[-1]
+    return {"recomputed": recomputed, "unchanged": unchanged}
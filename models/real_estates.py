@@ -2,6 +2,7 @@ from fastapi import HTTPException
 from sqlalchemy.orm import relationship, Session
 from starlette import status
 from models import Base
+from config.db_session import DbSession, run_db
 from schemas.create_real_estate_request import CreateRealEstateRequest
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
@@ -28,30 +29,37 @@ class RealEstate(Base):
     energy_source = Column(String(50), nullable=True)
     location = Column(String(100), nullable=False)
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     user = relationship("User", back_populates="real_estates")
 
     recommendations = relationship("Recommendation", back_populates="real_estate", cascade="all, delete-orphan")
+    estimate = relationship("PropertyEstimate", back_populates="real_estate", uselist=False,
+                            cascade="all, delete-orphan", passive_deletes=True)
 
 
-async def register_property(create_real_estate_request: CreateRealEstateRequest, db: Session, user_id: int):
+async def register_property(create_real_estate_request: CreateRealEstateRequest, db: DbSession, user_id: int):
     """
     Registers a new real estate property for the user.
+    Works on a sync Session or, without blocking the event loop, on an AsyncSession.
     """
+    new_real_estate = RealEstate(
+        square_area=create_real_estate_request.square_area,
+        real_estate_type=create_real_estate_request.real_estate_type,
+        year_built=create_real_estate_request.year_built,
+        insulation_quality=create_real_estate_request.insulation_quality,
+        energy_source=create_real_estate_request.energy_source,
+        location=create_real_estate_request.location,
+        user_id=user_id
+    )
     try:
-        new_real_estate = RealEstate(
-            square_area=create_real_estate_request.square_area,
-            real_estate_type=create_real_estate_request.real_estate_type,
-            year_built=create_real_estate_request.year_built,
-            insulation_quality=create_real_estate_request.insulation_quality,
-            energy_source=create_real_estate_request.energy_source,
-            location=create_real_estate_request.location,
-            user_id=user_id
-        )
-        db.add(new_real_estate)
-        db.commit()
-        db.refresh(new_real_estate)
-        return new_real_estate
+        return await run_db(db, _insert_real_estate, new_real_estate)
     except Exception as e:
-        db.rollback()
+        await run_db(db, Session.rollback)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error creating property.")
+
+
+def _insert_real_estate(db: Session, new_real_estate: RealEstate) -> RealEstate:
+    db.add(new_real_estate)
+    db.commit()
+    db.refresh(new_real_estate)
+    return new_real_estate
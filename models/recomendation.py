@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base  # Import shared Base
@@ -8,10 +8,11 @@ class Recommendation(Base):
      Represents the Recommendation table in the database.
     """
     __tablename__ = 'recommendations'
+    __table_args__ = (Index("ix_recommendations_user_id_timestamp", "user_id", "timestamp"),)
 
     id = Column(Integer, primary_key=True)
     category = Column(String(50), nullable=False, default="General")
-    message = Column(String, index=True)
+    message = Column(String)
     estimated_savings = Column(Float, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,100 @@
+"""
+What-if evaluation of retrofit combinations.
+
+Only attributes a retrofit can change are candidates: the insulation and
+the energy source (heating). Square area and construction year are facts of
+the property and stay at its values. Candidates are folded to the engine's
+codes, so the grid is at most every insulation level times every energy
+source; all combinations are estimated in one call of the batch engine and
+ranked by savings.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from models.energy_batch_engine import ENERGY_SOURCES, INSULATION_LEVELS, Rates, encode_energy_source, \
+    encode_insulation, estimate_energy_batch
+
+SCENARIO_ATTRIBUTES = ("insulation_quality", "energy_source")  # what a retrofit changes
+PROPERTY_ATTRIBUTES = ("square_area", "year_built")  # fixed inputs of every scenario
+DAYS_PER_YEAR = 365
+
+_LEVELS = (INSULATION_LEVELS, ENERGY_SOURCES)
+_ENCODERS = (encode_insulation, encode_energy_source)
+
+
+def rank_scenarios(current: Dict, candidates: Dict[str, Optional[Sequence]], top_k: int = 10,
+                   rates: Optional[Rates] = None) -> Dict:
+    """
+    Estimate every combination of candidate values and rank them by savings.
+    Args:
+        current: The property's current value of each attribute in SCENARIO_ATTRIBUTES and PROPERTY_ATTRIBUTES.
+        candidates: Candidate values per attribute; missing or None keeps the current value.
+        top_k: Number of scenarios returned.
+        rates: €/kWh by energy source code or `BlockRates` (defaults to the built-in rates).
+    Returns:
+        dict: The baseline estimate, the number of combinations and the best scenarios.
+    Raises:
+        ValueError: On unknown categorical values.
+    """
+    _check_known(candidates.get("insulation_quality"), INSULATION_LEVELS, "insulation_quality")
+    _check_known(candidates.get("energy_source"), ENERGY_SOURCES, "energy_source")
+    current_codes = [int(encode([current[attribute]])[0])
+                     for attribute, encode in zip(SCENARIO_ATTRIBUTES, _ENCODERS)]
+    codes: List[np.ndarray] = []
+    for attribute, encode, current_code in zip(SCENARIO_ATTRIBUTES, _ENCODERS, current_codes):
+        options = candidates.get(attribute)
+        if not options:
+            codes.append(np.array([current_code], dtype=np.int8))
+            continue
+        # Fold spellings ("Good", "good ") onto one code, keeping the order of first appearance
+        folded = dict.fromkeys(encode([option.strip() for option in options]).tolist())
+        codes.append(np.array(list(folded), dtype=np.int8))
+
+    shape = tuple(len(options) for options in codes)
+    combinations = int(np.prod(shape))
+    insulation_index, source_index = (
+        grid.ravel() for grid in np.meshgrid(*(np.arange(size) for size in shape), indexing="ij")
+    )
+    usage, cost = estimate_energy_batch(
+        np.full(combinations, current["square_area"]),
+        codes[0][insulation_index],
+        np.full(combinations, current["year_built"]),
+        codes[1][source_index],
+        rates,
+    )
+    base_usage, base_cost = estimate_energy_batch(
+        [current["square_area"]], np.array(current_codes[:1], dtype=np.int8), [current["year_built"]],
+        np.array(current_codes[1:], dtype=np.int8), rates,
+    )
+    savings = base_cost[0] - cost
+
+    scenarios = []
+    for index in np.argsort(-savings, kind="stable")[:top_k].tolist():
+        scenario_codes = [int(options[position])
+                          for options, position in zip(codes, np.unravel_index(index, shape))]
+        scenarios.append({
+            **{attribute: levels[code]
+               for attribute, levels, code in zip(SCENARIO_ATTRIBUTES, _LEVELS, scenario_codes)},
+            "changes": [attribute for attribute, code, current_code
+                        in zip(SCENARIO_ATTRIBUTES, scenario_codes, current_codes) if code != current_code],
+            "estimated energy usage (kWh)": round(float(usage[index]), 3),
+            "estimated daily cost (€)": round(float(cost[index]), 3),
+            "daily savings (€)": round(float(savings[index]), 3),
+            "annual savings (€)": round(float(savings[index]) * DAYS_PER_YEAR, 2),
+        })
+    return {
+        "baseline": {
+            **{attribute: current[attribute] for attribute in SCENARIO_ATTRIBUTES + PROPERTY_ATTRIBUTES},
+            "estimated energy usage (kWh)": round(float(base_usage[0]), 3),
+            "estimated daily cost (€)": round(float(base_cost[0]), 3),
+        },
+        "combinations evaluated": combinations,
+        "scenarios": scenarios,
+    }
+
+
+def _check_known(options: Optional[Sequence[str]], known: Sequence[str], attribute: str) -> None:
+    unknown = [option for option in options or () if option.strip().lower() not in known]
+    if unknown:
+        raise ValueError(f"Unknown {attribute} {unknown}; expected one of {list(known)}.")
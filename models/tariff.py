@@ -0,0 +1,116 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, JSON, String, UniqueConstraint, func
+from sqlalchemy.orm import Session
+from models.base import Base
+
+DEFAULT_REGION = "*"
+TARIFF_KINDS = ("flat", "time_of_use", "tiered")
+
+
+class Tariff(Base):
+    """
+    One version of the energy tariff of a region and energy source.
+
+    Tariffs are never edited in place: publishing a change inserts the next
+    version, deactivating one withdraws it, and the highest active version of
+    each (region, energy_source) is the one in force.
+    flat: `flat_rate` €/kWh.
+    time_of_use: 24 `hourly_rates` (and optional `weekend_hourly_rates`) in €/kWh.
+    tiered: `tiers` as [[upper_kwh_per_month or null, rate], ...] in ascending order.
+    """
+    __tablename__ = 'tariffs'
+    __table_args__ = (UniqueConstraint("region", "energy_source", "version"),)
+
+    id = Column(Integer, primary_key=True)
+    region = Column(String(10), nullable=False, default=DEFAULT_REGION)
+    energy_source = Column(String(50), nullable=False)
+    version = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False, default="flat")
+    flat_rate = Column(Float, nullable=True)
+    hourly_rates = Column(JSON, nullable=True)
+    weekend_hourly_rates = Column(JSON, nullable=True)
+    tiers = Column(JSON, nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def validate_tariff(kind: str, flat_rate: Optional[float], hourly_rates: Optional[Sequence[float]],
+                    weekend_hourly_rates: Optional[Sequence[float]],
+                    tiers: Optional[Sequence[Tuple[Optional[float], float]]]) -> None:
+    """
+    Raise ValueError when the rate fields do not match the tariff kind.
+    """
+    if kind not in TARIFF_KINDS:
+        raise ValueError(f"Unknown tariff kind {kind!r}.")
+    if kind == "flat" and flat_rate is None:
+        raise ValueError("Flat tariffs need a flat_rate.")
+    if kind == "time_of_use":
+        for rates in (hourly_rates, weekend_hourly_rates):
+            if rates is not None and len(rates) != 24:
+                raise ValueError("Time-of-use tariffs need 24 hourly rates.")
+        if hourly_rates is None:
+            raise ValueError("Time-of-use tariffs need hourly_rates.")
+    if kind == "tiered":
+        if not tiers:
+            raise ValueError("Tiered tariffs need at least one tier.")
+        if tiers[-1][0] is not None:
+            raise ValueError("The last tier must be open-ended (upper bound None).")
+        bounds = [upper for upper, _ in tiers[:-1]]
+        if None in bounds or any(lower >= upper for lower, upper in zip(bounds, bounds[1:])):
+            raise ValueError("Tier bounds must strictly ascend and only the last tier may be open-ended.")
+
+
+def publish_tariff(db: Session, energy_source: str, kind: str, region: str = DEFAULT_REGION,
+                   flat_rate: Optional[float] = None, hourly_rates: Optional[List[float]] = None,
+                   weekend_hourly_rates: Optional[List[float]] = None,
+                   tiers: Optional[List[Tuple[Optional[float], float]]] = None) -> Tariff:
+    """
+    Insert the next version of a tariff and flag the estimates it affects, in one transaction.
+    """
+    # Imported here: the estimate module depends on the tariff engine, which depends on this module
+    from models.property_estimate import mark_tariff_change
+
+    validate_tariff(kind, flat_rate, hourly_rates, weekend_hourly_rates, tiers)
+    energy_source = energy_source.lower()
+    latest = db.query(func.max(Tariff.version)).filter(
+        Tariff.region == region, Tariff.energy_source == energy_source
+    ).scalar()
+    tariff = Tariff(
+        region=region,
+        energy_source=energy_source,
+        version=(latest or 0) + 1,
+        kind=kind,
+        flat_rate=flat_rate,
+        hourly_rates=hourly_rates,
+        weekend_hourly_rates=weekend_hourly_rates,
+        tiers=[list(tier) for tier in tiers] if tiers else None,
+    )
+    db.add(tariff)
+    db.flush()
+    if region == DEFAULT_REGION:
+        mark_tariff_change(db, [energy_source], commit=False)
+    db.commit()
+    db.refresh(tariff)
+    return tariff
+
+
+def deactivate_tariff(db: Session, tariff_id: int) -> Optional[Tariff]:
+    """
+    Withdraw a tariff version (the previous active version, or the built-in rate, is in force again) and flag the
+    estimates it affects, in one transaction. Tariffs leave force only this way, never by editing `is_active`.
+    Returns:
+        Tariff: The deactivated tariff, or None when there is no such tariff.
+    """
+    from models.property_estimate import mark_tariff_change
+
+    tariff = db.get(Tariff, tariff_id)
+    if tariff is None:
+        return None
+    if tariff.is_active:
+        tariff.is_active = False
+        db.flush()
+        if tariff.region == DEFAULT_REGION:
+            mark_tariff_change(db, [tariff.energy_source], commit=False)
+        db.commit()
+    return tariff
@@ -0,0 +1,225 @@
+"""
+Compiles the active tariffs into per-hour rate arrays.
+
+A `TariffSnapshot` is immutable: every (region, energy source) tariff is
+expanded once into an 8760-hour €/kWh vector, so costing an hourly
+consumption profile is a single dot product. `TariffRegistry.reload()`
+builds a new snapshot and swaps the reference, which is atomic for readers
+that grab `registry.snapshot` once per operation.
+"""
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.energy_batch_engine import (
+    DEFAULT_ENERGY_SOURCE_CODE,
+    ENERGY_RATES,
+    ENERGY_SOURCES,
+    TARIFF_VERSION,
+    BlockRates,
+)
+from models.tariff import DEFAULT_REGION, Tariff
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_YEAR = 8760
+DAYS_PER_MONTH_OF_YEAR = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_START_HOURS = np.cumsum((0,) + DAYS_PER_MONTH_OF_YEAR[:-1]) * 24
+REFERENCE_YEAR_START_WEEKDAY = 2  # profiles follow a non-leap year starting on a Wednesday (e.g. 2025)
+
+HOUR_OF_DAY = np.arange(HOURS_PER_YEAR) % 24
+IS_WEEKEND = ((np.arange(HOURS_PER_YEAR) // 24 + REFERENCE_YEAR_START_WEEKDAY) % 7) >= 5
+
+
+class CompiledTariff:
+    """
+    One tariff expanded for fast costing.
+    `hourly` is the 8760-hour rate vector for flat and time-of-use tariffs,
+    `tier_bounds`/`tier_rates` describe monthly block pricing for tiered ones.
+    """
+    __slots__ = ("region", "energy_source", "version", "kind", "hourly", "tier_bounds", "tier_rates",
+                 "effective_rate")
+
+    def __init__(self, region: str, energy_source: str, version: str, kind: str, effective_rate: Optional[float],
+                 hourly: Optional[np.ndarray] = None, tier_bounds: Optional[np.ndarray] = None,
+                 tier_rates: Optional[np.ndarray] = None):
+        self.region = region
+        self.energy_source = energy_source
+        self.version = version
+        self.kind = kind
+        self.hourly = hourly
+        self.tier_bounds = tier_bounds
+        self.tier_rates = tier_rates
+        # €/kWh used by the monthly/daily estimate, which has no hourly profile (None for tiered tariffs, which it
+        # prices on their blocks, see `blocks`)
+        self.effective_rate = effective_rate
+
+    @classmethod
+    def from_row(cls, tariff: Tariff) -> "CompiledTariff":
+        version = f"{tariff.energy_source}:v{tariff.version}"
+        if tariff.kind == "tiered":
+            bounds = [np.inf if upper is None else float(upper) for upper, _ in tariff.tiers]
+            rates = [float(rate) for _, rate in tariff.tiers]
+            return cls(tariff.region, tariff.energy_source, version, "tiered", None,
+                       tier_bounds=np.array(bounds), tier_rates=np.array(rates))
+        if tariff.kind == "time_of_use":
+            weekday = np.asarray(tariff.hourly_rates, dtype=np.float64)
+            weekend = np.asarray(tariff.weekend_hourly_rates or tariff.hourly_rates, dtype=np.float64)
+            hourly = np.where(IS_WEEKEND, weekend[HOUR_OF_DAY], weekday[HOUR_OF_DAY])
+            effective_rate = float(hourly.mean())
+        else:
+            effective_rate = float(tariff.flat_rate)
+            hourly = np.full(HOURS_PER_YEAR, effective_rate)
+        hourly.flags.writeable = False
+        return cls(tariff.region, tariff.energy_source, version, tariff.kind, effective_rate, hourly=hourly)
+
+    @property
+    def blocks(self) -> List[Tuple[float, float]]:
+        """
+        Monthly block pricing as [(upper_kwh_per_month, rate), ...]; one open-ended block unless tiered.
+        """
+        if self.kind == "tiered":
+            return list(zip(self.tier_bounds.tolist(), self.tier_rates.tolist()))
+        return [(np.inf, self.effective_rate)]
+
+
+def _builtin_tariffs() -> List[CompiledTariff]:
+    tariffs = []
+    for source, rate in zip(ENERGY_SOURCES, ENERGY_RATES.tolist()):
+        hourly = np.full(HOURS_PER_YEAR, rate)
+        hourly.flags.writeable = False
+        tariffs.append(CompiledTariff(DEFAULT_REGION, source, TARIFF_VERSION, "flat", rate, hourly=hourly))
+    return tariffs
+
+
+class TariffSnapshot:
+    """
+    Immutable lookup structure over a set of compiled tariffs.
+    """
+
+    def __init__(self, tariffs: Iterable[CompiledTariff], fingerprint: str = TARIFF_VERSION):
+        self.fingerprint = fingerprint
+        self.tariffs: Dict[Tuple[str, str], CompiledTariff] = {}
+        for tariff in _builtin_tariffs():
+            self.tariffs[(tariff.region, tariff.energy_source)] = tariff
+        for tariff in tariffs:
+            self.tariffs[(tariff.region, tariff.energy_source)] = tariff
+
+        # Monthly block pricing by energy source code, consumed by the batch estimation engine: tiered tariffs
+        # are billed on the projected monthly usage, flat and time-of-use ones at their (average) rate
+        self.block_rates = BlockRates.from_tiers(self.get(DEFAULT_REGION, source).blocks for source in ENERGY_SOURCES)
+
+    def get(self, region: Optional[str], energy_source: Optional[str]) -> CompiledTariff:
+        """
+        Tariff of a region and source, falling back to the default region and to electricity.
+        """
+        source = (energy_source or ENERGY_SOURCES[DEFAULT_ENERGY_SOURCE_CODE]).lower()
+        if source not in ENERGY_SOURCES:
+            source = ENERGY_SOURCES[DEFAULT_ENERGY_SOURCE_CODE]
+        return self.tariffs.get((region or DEFAULT_REGION, source)) or self.tariffs[(DEFAULT_REGION, source)]
+
+    def version_for(self, energy_source: Optional[str]) -> str:
+        """
+        Version string of the default-region tariff of a source (part of estimate fingerprints).
+        """
+        return self.get(DEFAULT_REGION, energy_source).version
+
+    def cost_profiles(self, profiles: np.ndarray, tariffs: Sequence[CompiledTariff]) -> np.ndarray:
+        """
+        Annual cost (€) of hourly consumption profiles.
+        Args:
+            profiles: (n, 8760) kWh per hour.
+            tariffs: The tariff of each profile, e.g. from `get`.
+        Returns:
+            np.ndarray: (n,) cost per profile.
+        """
+        profiles = np.atleast_2d(profiles)
+        costs = np.empty(len(profiles))
+        for tariff, indices in _group_by_tariff(tariffs):
+            rows = profiles[indices]
+            if tariff.hourly is not None:
+                costs[indices] = rows @ tariff.hourly
+            else:
+                costs[indices] = _tiered_cost(np.add.reduceat(rows, MONTH_START_HOURS, axis=1), tariff).sum(axis=1)
+        return costs
+
+    def monthly_cost_profiles(self, profiles: np.ndarray, tariffs: Sequence[CompiledTariff]) -> np.ndarray:
+        """
+        Cost (€) of hourly consumption profiles per calendar month.
+        Returns:
+            np.ndarray: (n, 12) cost per profile and month.
+        """
+        profiles = np.atleast_2d(profiles)
+        costs = np.empty((len(profiles), len(MONTH_START_HOURS)))
+        for tariff, indices in _group_by_tariff(tariffs):
+            rows = profiles[indices]
+            if tariff.hourly is not None:
+                costs[indices] = np.add.reduceat(rows * tariff.hourly, MONTH_START_HOURS, axis=1)
+            else:
+                costs[indices] = _tiered_cost(np.add.reduceat(rows, MONTH_START_HOURS, axis=1), tariff)
+        return costs
+
+
+def _group_by_tariff(tariffs: Sequence[CompiledTariff]) -> List[Tuple[CompiledTariff, List[int]]]:
+    groups: Dict[int, List[int]] = {}
+    for index, tariff in enumerate(tariffs):
+        groups.setdefault(id(tariff), []).append(index)
+    return [(tariffs[indices[0]], indices) for indices in groups.values()]
+
+
+def _tiered_cost(monthly_kwh: np.ndarray, tariff: CompiledTariff) -> np.ndarray:
+    lower = np.concatenate(([0.0], tariff.tier_bounds[:-1]))
+    width = tariff.tier_bounds - lower
+    # kWh falling into each tier, per month: shape (n, 12, tiers)
+    in_tier = np.clip(monthly_kwh[..., None] - lower, 0.0, width)
+    return in_tier @ tariff.tier_rates
+
+
+def load_active_tariffs(db: Session) -> List[Tariff]:
+    """
+    Highest active version of every (region, energy source) tariff.
+    """
+    latest: Dict[Tuple[str, str], Tariff] = {}
+    for tariff in db.query(Tariff).filter(Tariff.is_active.is_(True)).order_by(Tariff.version):
+        latest[(tariff.region, tariff.energy_source)] = tariff
+    return list(latest.values())
+
+
+def compile_tariffs(tariffs: Iterable[Tariff]) -> TariffSnapshot:
+    tariffs = list(tariffs)
+    fingerprint = hashlib.sha256(
+        ",".join(sorted(f"{tariff.id}:{tariff.version}" for tariff in tariffs)).encode()
+    ).hexdigest()[:16] if tariffs else TARIFF_VERSION
+    return TariffSnapshot([CompiledTariff.from_row(tariff) for tariff in tariffs], fingerprint)
+
+
+class TariffRegistry:
+    """
+    Holds the snapshot in force for this worker process.
+    """
+
+    def __init__(self):
+        self._snapshot = TariffSnapshot([])
+
+    @property
+    def snapshot(self) -> TariffSnapshot:
+        return self._snapshot
+
+    def reload(self, db: Session) -> bool:
+        """
+        Recompile from the database and swap the snapshot if the tariffs changed.
+        Returns:
+            bool: True when a new snapshot was installed.
+        """
+        snapshot = compile_tariffs(load_active_tariffs(db))
+        if snapshot.fingerprint == self._snapshot.fingerprint:
+            return False
+        self._snapshot = snapshot  # single reference assignment: readers see the old or the new snapshot
+        logger.info(f"Tariffs reloaded (snapshot {snapshot.fingerprint})")
+        return True
+
+
+tariff_registry = TariffRegistry()
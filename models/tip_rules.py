@@ -0,0 +1,220 @@
+"""
+Data-driven energy tip rules compiled into an interval/bitset index.
+
+Rules are loaded from a JSON file (see data/tip_rules.json). Each rule has
+conditions on weather, time of day and property attributes and a list of
+tips. At load time every attribute's rule bounds are turned into sorted
+breakpoints with a rule bitmask per interval. Evaluating a context is then
+one bisect (or dict lookup) per attribute, an AND of the masks and a lookup
+of the precomputed, immutable tip tuple of the resulting bucket.
+"""
+import json
+import os
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+TIP_RULES_PATH = os.getenv(
+    "TIP_RULES_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "tip_rules.json")
+)
+
+NUMERIC_ATTRIBUTES = ("temperature", "humidity", "wind_speed", "hour", "year_built", "square_area")
+CATEGORICAL_ATTRIBUTES = ("insulation_quality", "energy_source")
+NUMERIC_OPERATORS = ("gt", "gte", "lt", "lte")
+MAX_PRECOMPUTED_BUCKETS = 65536
+
+Tips = Tuple[str, ...]
+
+
+def _satisfies(value: float, condition: Mapping[str, float]) -> bool:
+    return (
+        ("gt" not in condition or value > condition["gt"])
+        and ("gte" not in condition or value >= condition["gte"])
+        and ("lt" not in condition or value < condition["lt"])
+        and ("lte" not in condition or value <= condition["lte"])
+    )
+
+
+class _NumericIndex:
+    """
+    Breakpoints of one numeric attribute and the rule mask of every elementary interval.
+
+    With breakpoints b0 < ... < bm-1 the intervals are (-inf, b0), [b0], (b0, b1),
+    [b1], ..., (bm-1, inf): interval 2i+1 is the point bi, so strict and inclusive
+    bounds need no special casing. The last mask is for a missing value.
+    """
+
+    def __init__(self, conditions: Sequence[Optional[Mapping[str, float]]]):
+        self.bounds = sorted({float(bound) for condition in conditions if condition for bound in condition.values()})
+        samples = []
+        for index, bound in enumerate(self.bounds):
+            below = bound - 1 if index == 0 else (self.bounds[index - 1] + bound) / 2
+            samples += [below, bound]
+        samples.append(self.bounds[-1] + 1 if self.bounds else 0.0)
+        self.masks = [
+            sum(1 << rule for rule, condition in enumerate(conditions) if not condition or _satisfies(sample, condition))
+            for sample in samples
+        ]
+        self.masks.append(sum(1 << rule for rule, condition in enumerate(conditions) if not condition))
+        self._bounds_array = np.array(self.bounds, dtype=np.float64)
+
+    def mask(self, value: Optional[float]) -> int:
+        if value is None:
+            return self.masks[-1]
+        index = bisect_left(self.bounds, value)
+        return self.masks[2 * index + 1 if index < len(self.bounds) and self.bounds[index] == value else 2 * index]
+
+    def rows(self, values: np.ndarray) -> np.ndarray:
+        index = np.searchsorted(self._bounds_array, values, side="left")
+        exact = self._bounds_array[np.minimum(index, len(self.bounds) - 1)] == values if self.bounds else False
+        rows = 2 * index + exact
+        return np.where(np.isnan(values), len(self.masks) - 1, rows)
+
+
+class _CategoricalIndex:
+    """
+    Rule mask per known value of a categorical attribute; other and missing values share one mask.
+    """
+
+    def __init__(self, conditions: Sequence[Optional[Mapping[str, Sequence[str]]]]):
+        values = sorted({value.lower() for condition in conditions if condition for value in condition["in"]})
+        self.codes = {value: code for code, value in enumerate(values)}
+        self.masks = [
+            sum(1 << rule for rule, condition in enumerate(conditions)
+                if not condition or value in {option.lower() for option in condition["in"]})
+            for value in values
+        ]
+        self.masks.append(sum(1 << rule for rule, condition in enumerate(conditions) if not condition))
+
+    def mask(self, value: Optional[str]) -> int:
+        return self.masks[self.codes.get(value.lower(), -1)] if value else self.masks[-1]
+
+    def rows(self, values: Iterable[Optional[str]]) -> np.ndarray:
+        other = len(self.masks) - 1
+        return np.fromiter((self.codes.get(value.lower(), other) if value else other for value in values),
+                           dtype=np.intp)
+
+
+class TipRuleEngine:
+    """
+    Compiled tip rules. Instances are immutable and safe to share between threads.
+    """
+
+    def __init__(self, rules: Sequence[Mapping]):
+        for rule in rules:
+            _validate_rule(rule)
+        self.rule_ids = tuple(rule["id"] for rule in rules)
+        self._rule_tips: Tuple[Tips, ...] = tuple(tuple(rule["tips"]) for rule in rules)
+        self._indexes: Dict[str, object] = {}
+        for attribute in NUMERIC_ATTRIBUTES:
+            self._indexes[attribute] = _NumericIndex([rule["when"].get(attribute) for rule in rules])
+        for attribute in CATEGORICAL_ATTRIBUTES:
+            self._indexes[attribute] = _CategoricalIndex([rule["when"].get(attribute) for rule in rules])
+
+        # Precompute the tip tuple of every reachable bucket (AND of one mask per attribute)
+        self._buckets: Dict[int, Tips] = {}
+        distinct = [set(index.masks) for index in self._indexes.values()]
+        if int(np.prod([len(masks) for masks in distinct])) <= MAX_PRECOMPUTED_BUCKETS:
+            everything = (1 << len(rules)) - 1
+            for masks in product(*distinct):
+                combined = everything
+                for mask in masks:
+                    combined &= mask
+                self._bucket(combined)
+
+    @classmethod
+    def from_file(cls, path: str = TIP_RULES_PATH) -> "TipRuleEngine":
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.load(handle)["rules"])
+
+    def __len__(self) -> int:
+        return len(self.rule_ids)
+
+    def _bucket(self, mask: int) -> Tips:
+        try:
+            return self._buckets[mask]
+        except KeyError:
+            tips = tuple(tip for rule, tips in enumerate(self._rule_tips) if mask >> rule & 1 for tip in tips)
+            self._buckets[mask] = tips
+            return tips
+
+    def match(self, **context) -> int:
+        """
+        Bitmask of the rules matching a context (bit i is rule i); missing attributes match no condition.
+        """
+        unknown = set(context) - set(self._indexes)
+        if unknown:
+            raise ValueError(f"Unknown tip rule attributes {sorted(unknown)}.")
+        mask = (1 << len(self.rule_ids)) - 1
+        for attribute, index in self._indexes.items():
+            mask &= index.mask(context.get(attribute))
+        return mask
+
+    def tips(self, **context) -> Tips:
+        """
+        Tips of every rule matching a context, in rule order.
+        """
+        return self._bucket(self.match(**context))
+
+    def tips_batch(self, size: int, **columns) -> List[Tips]:
+        """
+        Tips for `size` contexts given as columns (arrays or scalars shared by all rows).
+        Numeric columns may use NaN and categorical columns None for missing values.
+        """
+        unknown = set(columns) - set(self._indexes)
+        if unknown:
+            raise ValueError(f"Unknown tip rule attributes {sorted(unknown)}.")
+        words = (len(self.rule_ids) + 63) // 64
+        combined = np.full((size, words), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for attribute, index in self._indexes.items():
+            values = columns.get(attribute)
+            if values is None:
+                combined &= _mask_words([index.masks[-1]], words)
+                continue
+            if attribute in CATEGORICAL_ATTRIBUTES:
+                values = [values] * size if isinstance(values, str) else values
+                rows = index.rows(values)
+            else:
+                rows = index.rows(np.broadcast_to(np.asarray(values, dtype=np.float64), (size,)))
+            combined &= _mask_words(index.masks, words)[rows]
+
+        if words == 1:
+            distinct, inverse = np.unique(combined[:, 0], return_inverse=True)
+            buckets = [self._bucket(mask) for mask in distinct.tolist()]
+        else:
+            distinct, inverse = np.unique(combined, axis=0, return_inverse=True)
+            buckets = [self._bucket(int.from_bytes(row.astype("<u8").tobytes(), "little")) for row in distinct]
+        return [buckets[position] for position in inverse.ravel().tolist()]
+
+
+def _mask_words(masks: Sequence[int], words: int) -> np.ndarray:
+    """
+    Python int bitmasks as rows of little-endian uint64 words.
+    """
+    return np.array([[mask >> (64 * word) & 0xFFFFFFFFFFFFFFFF for word in range(words)] for mask in masks],
+                    dtype=np.uint64)
+
+
+def _validate_rule(rule: Mapping) -> None:
+    for attribute, condition in rule["when"].items():
+        if attribute in NUMERIC_ATTRIBUTES:
+            if not condition or set(condition) - set(NUMERIC_OPERATORS):
+                raise ValueError(f"Rule {rule['id']!r}: {attribute} needs operators from {NUMERIC_OPERATORS}.")
+        elif attribute in CATEGORICAL_ATTRIBUTES:
+            if set(condition) != {"in"} or not condition["in"]:
+                raise ValueError(f"Rule {rule['id']!r}: {attribute} needs a non-empty 'in' list.")
+        else:
+            raise ValueError(f"Rule {rule['id']!r}: unknown attribute {attribute!r}.")
+    if not rule["tips"]:
+        raise ValueError(f"Rule {rule['id']!r} has no tips.")
+
+
+@lru_cache(maxsize=None)
+def load_tip_rules(path: str = TIP_RULES_PATH) -> TipRuleEngine:
+    """
+    Shared engine compiled from the rules file; loaded once per process.
+    """
+    return TipRuleEngine.from_file(path)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from .base import Base  # Import shared Base
 from enum import Enum as PyEnum
@@ -21,7 +21,8 @@ class User(Base):
     hash_password = Column(String, nullable=False)
     notification_frequency = Column(Enum(NotificationFrequency), default=NotificationFrequency.DAILY)
     preferred_weather_tips = Column(Boolean, default=True)
-    phone_number = Column(String(50), nullable=False)
+    phone_number = Column(String(50), nullable=False, index=True)  # registration looks users up by email or phone
+    last_digest_sent_at = Column(DateTime, nullable=True)  # when the last scheduled digest was enqueued
 
     # Relationships
     real_estates = relationship("RealEstate", back_populates="user", cascade="all, delete-orphan")
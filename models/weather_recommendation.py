@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base  # Import shared Base
@@ -6,8 +6,10 @@ from .base import Base  # Import shared Base
 class WeatherBasedRecommendation(Base):
     """
     Represents weather-based recommendations for a user in the database.
+    On PostgreSQL the table is partitioned by month on `timestamp` (services/partitions.py).
     """
     __tablename__ = 'weather_based_recommendations'
+    __table_args__ = (Index("ix_weather_based_recommendations_user_id_timestamp", "user_id", "timestamp"),)
 
     id = Column(Integer, primary_key=True)
     message = Column(String(500), nullable=False)
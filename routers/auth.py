@@ -16,12 +16,14 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, validator
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 import jwt
 
 # Local Imports
 from models.user import User  # Assuming this is your ORM model for the User entity
-from config.dependencies import db_dependency  # Dependency for database session
+from config.dependencies import session_dependency  # Dependency for database session (sync or async)
+from config.db_session import DbSession, run_db
 
 # Setting up logging
 logger = logging.getLogger(__name__)
@@ -79,38 +81,49 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def _find_user(db: Session, email: str, phone_number: Optional[str] = None) -> Optional[User]:
+    condition = User.email == email if phone_number is None else (User.email == email) | (User.phone_number == phone_number)
+    return db.query(User).filter(condition).first()
+
+
+def _add_user(db: Session, user: User) -> int:
+    db.add(user)
+    db.commit()
+    return user.id
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreateRequest, db: Session = Depends(db_dependency)):
+async def register_user(user: UserCreateRequest, db: DbSession = Depends(session_dependency)):
     """Register a new user."""
-    existing_user = db.query(User).filter((User.email == user.email) | (User.phone_number == user.phone_number)).first()
+    existing_user = await run_db(db, _find_user, user.email, user.phone_number)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email or phone number already registered.")
-    hashed_password = bcrypt_context.hash(user.password)
+    # bcrypt is deliberately slow: hash off the event loop
+    hashed_password = await run_in_threadpool(bcrypt_context.hash, user.password)
     new_user = User(name=user.full_name, email=user.email, phone_number=user.phone_number, hash_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    return {"message": "User successfully registered", "id": new_user.id}
+    user_id = await run_db(db, _add_user, new_user)
+    return {"message": "User successfully registered", "id": user_id}
 
 
 @router.post("/token", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(db_dependency)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: DbSession = Depends(session_dependency)):
     """Authenticate a user and issue a JWT token."""
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not bcrypt_context.verify(form_data.password, user.hash_password):
+    user = await run_db(db, _find_user, form_data.username)
+    if not user or not await run_in_threadpool(bcrypt_context.verify, form_data.password, user.hash_password):
         raise HTTPException(status_code=401, detail="Invalid email or password.")
     access_token = create_access_token({"sub": user.email})
     return Token(access_token=access_token)
 
 
-def get_current_user(token: str = Depends(oauth2_bearer), db: Session = Depends(db_dependency)):
+async def get_current_user(token: str = Depends(oauth2_bearer), db: DbSession = Depends(session_dependency)):
     """Retrieve the currently logged-in user."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user = db.query(User).filter(User.email == payload.get("sub")).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid token.")
-        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired.")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token.")
+    user = await run_db(db, _find_user, payload.get("sub"))
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token.")
+    return user
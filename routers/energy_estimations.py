@@ -1,7 +1,6 @@
 import os
-from asyncio import to_thread
 from asyncio.log import logger
-from fastapi import APIRouter, Depends, Query, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException
 from typing import Dict, Optional
 
 from models.real_estates import RealEstate
@@ -10,28 +9,44 @@ from models.recomendation import Recommendation
 
 from sqlalchemy.orm import Session
 from starlette.responses import FileResponse
-from config.dependencies import db_dependency
+from config.dependencies import session_dependency
+from config.db_session import DbSession, run_db
 #from env import model
-from models.notification import create_notification
-from models.recomendation_tips import get_recommendation_tips
+from models.notification import enqueue_templated_email
 from models.user import User
 from models.recomendation import Recommendation
 from models.real_estates import register_property
-from models.energy_cost_estimation_engine import calculate_energy_usage, calculate_energy_cost, weather_recommendations
+from models.energy_cost_estimation_engine import weather_recommendations
+from models.property_estimate import get_property_estimate
+from models.portfolio_estimation import estimate_portfolio, PORTFOLIO_PAGE_SIZE, PORTFOLIO_MAX_PAGE_SIZE
+from models.annual_simulation import project_annual
+from models.retrofit_scenarios import rank_scenarios
+from models.tariff_engine import tariff_registry
 from routers.auth import get_current_user
-from services.email_sender import send_email_dynamic
-from services.weather_api import WeatherService
+from services.deadline import Deadline
+from services.gazetteer import load_gazetteer
+from services.outbox_rendering import OPTIMIZATION_REPORT
+from services.rate_limiter import weather_rate_limiter
+from services.weather_api import AsyncWeatherService
+from services.weather_cache import weather_cache
 from schemas.create_real_estate_request import CreateRealEstateRequest
+from schemas.retrofit_scenario_request import RetrofitScenarioRequest
 from models.real_estates import RealEstate
 router = APIRouter()
 
-# Initialize WeatherService
-weather_service = WeatherService(api_key=os.getenv("WEATHER_API_KEY"))
+# Time budget of the weather lookup on the request path
+WEATHER_TIPS_DEADLINE_SECONDS = float(os.getenv("WEATHER_TIPS_DEADLINE_SECONDS", "2"))
+
+# Initialize AsyncWeatherService
+weather_service = AsyncWeatherService(
+    api_key=os.getenv("WEATHER_API_KEY"), cache=weather_cache, gazetteer=load_gazetteer(),
+    rate_limiter=weather_rate_limiter,
+)
 
 @router.post("/real-estates")
 async def register_property_route(
         create_real_estate_request: CreateRealEstateRequest,
-        db: Session = Depends(db_dependency),
+        db: DbSession = Depends(session_dependency),
         current_user: User = Depends(get_current_user)
 ):
     new_real_estate = await register_property(create_real_estate_request, db, current_user.id)
@@ -41,64 +56,51 @@ async def register_property_route(
 async def weather_recommendations_route(
     city: str,
     date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format"),
-    db: Session = Depends(db_dependency),
+    db: DbSession = Depends(session_dependency),
     current_user: User = Depends(get_current_user)
 ):
-    return await weather_recommendations(weather_service, city, date, db, current_user.id)
+    deadline = Deadline(WEATHER_TIPS_DEADLINE_SECONDS)
+    return await weather_recommendations(weather_service, city, date, db, current_user.id, deadline)
 
 @router.post("/optimize_energy_usage_send_email")
 async def optimize_energy_usage_send_email_route(
-        background_tasks: BackgroundTasks,
-        db: Session = Depends(db_dependency),
+        db: DbSession = Depends(session_dependency),
         current_user: User = Depends(get_current_user)
 ) -> Dict:
-    # Fetch user real estate
-    real_estate = db.query(RealEstate).filter(RealEstate.user_id == current_user.id).first()
-    if not real_estate:
+    # Fetch user real estate and its materialized estimate (a primary-key lookup unless the property or tariffs changed)
+    loaded = await run_db(db, _first_property_with_estimate, current_user.id)
+    if loaded is None:
         raise HTTPException(status_code=404, detail="No real estate found.")
+    real_estate, estimate = loaded
 
     # Calculate energy optimization
     square_area = real_estate.square_area
     insulation_quality = real_estate.insulation_quality
     year_built = real_estate.year_built
     energy_source = real_estate.energy_source or "electricity"
+    energy_usage = estimate.energy_usage
+    estimated_cost = estimate.estimated_cost
 
-    energy_usage = await calculate_energy_usage(square_area, insulation_quality, year_built)
-    estimated_cost = await calculate_energy_cost(energy_usage, energy_source)
-
-    # Save recommendation to the config
-    recommendation = Recommendation(
-        category="Energy Optimization",
-        message=f"Estimated daily cost: {estimated_cost:.2f} €.",
-        estimated_savings=estimated_cost,
-        user_id=current_user.id,
-        real_estate_id=real_estate.id
-    )
-    db.add(recommendation)
-    db.commit()
-
-    # Extract necessary data for background task
-    user_data = {
-        "name": current_user.name,
-        "email": current_user.email,
-        "user_id": current_user.id,
-    }
     real_estate_data = {
         "location": real_estate.location,
         "square_area": square_area,
         "insulation_quality": insulation_quality,
         "year_built": year_built,
+        "energy_source": energy_source,
     }
 
-    # Add email-sending task to background tasks
-    background_tasks.add_task(
-        send_optimization_email,
-        user_data=user_data,
-        real_estate_data=real_estate_data,
-        energy_usage=energy_usage,
-        estimated_cost=estimated_cost,
-        db_session=db
+    # Save the email's inputs to the outbox in the same transaction as the recommendation; the outbox worker
+    # fetches the weather, renders and sends it (services/notification_outbox.py)
+    recommendation = Recommendation(
+        category="Energy Optimization",
+        message=f"Estimated daily cost: {estimated_cost:.2f} €.",
+        estimated_savings=estimated_cost,
+        user_id=current_user.id,
+        real_estate_id=real_estate.id
     )
+    email_values = {"name": current_user.name, **real_estate_data, "energy_usage": energy_usage,
+                    "estimated_cost": estimated_cost}
+    await run_db(db, _save_optimization, recommendation, current_user, email_values)
 
     return {
         "square area": square_area,
@@ -110,89 +112,76 @@ async def optimize_energy_usage_send_email_route(
         "message": "Email with energy optimization details will be sent shortly."
     }
 
-# Background task function
-
+@router.post("/portfolio-estimates")
+async def portfolio_estimates_route(
+        after_id: int = Query(0, ge=0, description="Last property id of the previous page"),
+        limit: int = Query(PORTFOLIO_PAGE_SIZE, gt=0, le=PORTFOLIO_MAX_PAGE_SIZE),
+        db: DbSession = Depends(session_dependency),
+        current_user: User = Depends(get_current_user)
+) -> Dict:
+    """
+    Estimate all of the user's properties in one batch, a page at a time.
+    Follow `next_after_id` until it is null to walk a large portfolio; `totals` cover all of its properties.
+    """
+    return await run_db(db, estimate_portfolio, current_user.id, after_id, limit)
 
-async def send_optimization_email(
-        user_data: Dict,
-        real_estate_data: Dict,
-        energy_usage: float,
-        estimated_cost: float,
-        db_session: Session
-):
-    city = real_estate_data["location"] or "Unknown"
-    weather_data = weather_service.get_weather(city)
-    if not weather_data:
-        raise HTTPException(status_code=404, detail="City not found or API error.")
-
-    temp = weather_data["main"]["temp"]
-    weather_tips = get_recommendation_tips(temp).split('\n')
-
-    # Prepare email content
-    subject = "Your Personalized Energy Optimization Update"
-    formatted_weather_tips = "<ul>" + "\n".join(f"<li>{tip}</li>" for tip in weather_tips) + "</ul>"
-    html_content = f"""
-    <h1>Hello {user_data['name']},</h1>
-    <p>Your personalized energy advisory report:</p>
-    <ul>
-        <li><b>Square area:</b> {real_estate_data['square_area']} m²</li>
-        <li><b>Insulation quality:</b> {real_estate_data['insulation_quality']}</li>
-        <li><b>Year built:</b> {real_estate_data['year_built']}</li>
-        <li><b>Estimated energy usage:</b> {energy_usage:.3f} kWh</li>
-        <li><b>Estimated daily cost:</b> {estimated_cost:.3f} €</li>
-        <li><b>Temperature at location:</b> {temp} °C</li>
-    </ul>
-    <h2>Weather Tips:</h2>
-    {formatted_weather_tips}
-    <p>Thank you for using our service!</p>
+@router.get("/real-estates/{real_estate_id}/annual-projection")
+async def annual_projection_route(
+        real_estate_id: int,
+        include_hourly: bool = Query(False, description="Include the 8760-hour consumption profile"),
+        db: DbSession = Depends(session_dependency),
+        current_user: User = Depends(get_current_user)
+) -> Dict:
+    """
+    Simulate a year of hourly consumption from the location's climate and return monthly kWh and cost.
+    """
+    real_estate = await run_db(db, _owned_property, real_estate_id, current_user.id)
+    if not real_estate:
+        raise HTTPException(status_code=404, detail="No real estate found.")
+    city = weather_service.resolve_city(real_estate.location)
+    if city is None:
+        raise HTTPException(status_code=404, detail="City not found.")
+    return project_annual(real_estate.square_area, real_estate.insulation_quality, real_estate.year_built,
+                          real_estate.energy_source, city, tariff_registry.snapshot, include_hourly)
+
+@router.post("/real-estates/{real_estate_id}/scenarios")
+async def retrofit_scenarios_route(
+        real_estate_id: int,
+        scenario_request: RetrofitScenarioRequest,
+        db: DbSession = Depends(session_dependency),
+        current_user: User = Depends(get_current_user)
+) -> Dict:
+    """
+    Evaluate every combination of the candidate upgrades in one batch and return the top-K by savings.
     """
-    text_content = f"""
-    Hello {user_data['name']},
+    real_estate = await run_db(db, _owned_property, real_estate_id, current_user.id)
+    if not real_estate:
+        raise HTTPException(status_code=404, detail="No real estate found.")
+    current = {
+        "insulation_quality": real_estate.insulation_quality,
+        "energy_source": real_estate.energy_source or "electricity",
+        "square_area": real_estate.square_area,
+        "year_built": real_estate.year_built,
+    }
+    try:
+        return rank_scenarios(current, scenario_request.model_dump(exclude={"top_k"}), scenario_request.top_k,
+                              tariff_registry.snapshot.block_rates)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-    Your personalized energy advisory report:
-    - Square area: {real_estate_data['square_area']} m²
-    - Insulation quality: {real_estate_data['insulation_quality']}
-    - Year built: {real_estate_data['year_built']}
-    - Estimated energy usage: {energy_usage:.3f} kWh
-    - Estimated daily cost: {estimated_cost:.3f} €
-    - Temperature at location: {temp} °C
+def _first_property_with_estimate(db: Session, user_id: int):
+    real_estate = db.query(RealEstate).filter(RealEstate.user_id == user_id).first()
+    return (real_estate, get_property_estimate(db, real_estate)) if real_estate else None
 
-    Weather Tips:
-    {', '.join(weather_tips)}
 
-    Thank you for using our efficient energy advisory service !
-    """
+def _owned_property(db: Session, real_estate_id: int, user_id: int) -> Optional[RealEstate]:
+    return db.query(RealEstate).filter(RealEstate.id == real_estate_id, RealEstate.user_id == user_id).first()
 
-    # Define sender and recipient
-    sender = {"name": "Efficient Energy Advisory", "email": "MS_vDTC8L@trial-pq3enl6wpk842vwr.mlsender.net"}
-    recipient = {"name": user_data['name'], "email": user_data['email']}
 
-    # Create a notification for the email
-    notification = create_notification(
-        db_session,
-        user_email=user_data['email'],
-        message=f"Email scheduled for {recipient['email']}",
-        user_id=user_data['user_id']
-    )
-    # Send email
-    try:
-        logger.info(f"Sending optimization email to {recipient['email']}")
-        await to_thread(
-            send_email_dynamic,
-            sender=sender,
-            recipient=recipient,
-            subject=subject,
-            html_content=html_content,
-            text_content=text_content
-        )
-        notification.status = "Sent"
-        logger.info(f"Email sent to {recipient['email']}")
-    except Exception as e:
-        notification.status = "Failed"
-        logger.error(f"Error sending email to {recipient['email']}: {e}")
-    finally:
-        db_session.add(notification)
-        db_session.commit()
+def _save_optimization(db: Session, recommendation: Recommendation, user: User, email_values: Dict) -> None:
+    db.add(recommendation)
+    enqueue_templated_email(db, user.id, user.email, user.name, OPTIMIZATION_REPORT, email_values)
+    db.commit()
 
 @router.get("/favicon.ico")
 def favicon():
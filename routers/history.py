@@ -0,0 +1,75 @@
+"""
+History endpoints: a user's recommendations, weather tips and notifications, newest first.
+
+Each page returns `next_cursor`; pass it as `cursor` to read the next page
+(see models/history.py for why these are keyset cursors rather than offsets).
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from config.db_session import DbSession, run_db
+from config.dependencies import session_dependency
+from models.history import (HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, NOTIFICATIONS, RECOMMENDATIONS, WEATHER_TIPS,
+                            HistorySource, decode_cursor, naive_utc, read_history)
+from models.user import User
+from routers.auth import get_current_user
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+CURSOR_DESCRIPTION = "next_cursor of the previous page"
+SINCE_DESCRIPTION = "Only entries at or after this time (ISO 8601, UTC unless it has an offset)"
+UNTIL_DESCRIPTION = "Only entries before this time (ISO 8601, UTC unless it has an offset)"
+
+
+async def _history(db: DbSession, source: HistorySource, user_id: int, cursor: Optional[str], limit: int,
+                   since: Optional[datetime], until: Optional[datetime], **filters) -> Dict:
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    since, until = naive_utc(since), naive_utc(until)  # comparable whether or not the client sent an offset
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until.")
+    return await run_db(db, read_history, source, user_id, after, limit, since, until, **filters)
+
+
+@router.get("/recommendations")
+async def recommendation_history_route(
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        limit: int = Query(HISTORY_PAGE_SIZE, gt=0, le=HISTORY_MAX_PAGE_SIZE),
+        category: Optional[str] = Query(None, description="e.g. Energy Optimization"),
+        real_estate_id: Optional[int] = Query(None, description="Only recommendations for this property"),
+        since: Optional[datetime] = Query(None, description=SINCE_DESCRIPTION),
+        until: Optional[datetime] = Query(None, description=UNTIL_DESCRIPTION),
+        db: DbSession = Depends(session_dependency),
+        current_user: User = Depends(get_current_user)
+) -> Dict:
+    return await _history(db, RECOMMENDATIONS, current_user.id, cursor, limit, since, until,
+                          category=category, real_estate_id=real_estate_id)
+
+
+@router.get("/weather-tips")
+async def weather_tip_history_route(
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        limit: int = Query(HISTORY_PAGE_SIZE, gt=0, le=HISTORY_MAX_PAGE_SIZE),
+        since: Optional[datetime] = Query(None, description=SINCE_DESCRIPTION),
+        until: Optional[datetime] = Query(None, description=UNTIL_DESCRIPTION),
+        db: DbSession = Depends(session_dependency),
+        current_user: User = Depends(get_current_user)
+) -> Dict:
+    return await _history(db, WEATHER_TIPS, current_user.id, cursor, limit, since, until)
+
+
+@router.get("/notifications")
+async def notification_history_route(
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        limit: int = Query(HISTORY_PAGE_SIZE, gt=0, le=HISTORY_MAX_PAGE_SIZE),
+        status: Optional[str] = Query(None, description="e.g. Sent, Pending, Failed"),
+        since: Optional[datetime] = Query(None, description=SINCE_DESCRIPTION),
+        until: Optional[datetime] = Query(None, description=UNTIL_DESCRIPTION),
+        db: DbSession = Depends(session_dependency),
+        current_user: User = Depends(get_current_user)
+) -> Dict:
+    return await _history(db, NOTIFICATIONS, current_user.id, cursor, limit, since, until, status=status)
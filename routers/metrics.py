@@ -0,0 +1,43 @@
+"""
+Operational metrics for the running worker (cache counters and similar).
+"""
+from typing import Dict
+
+from fastapi import APIRouter
+
+from config.pool_profiles import pool_metrics
+from routers.energy_estimations import weather_service
+from services.rate_limiter import rate_limiters
+from services.weather_cache import weather_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/weather-cache")
+def weather_cache_metrics() -> Dict:
+    """Hit/miss/eviction counters of the in-process weather cache."""
+    return weather_cache.stats()
+
+
+@router.get("/weather-coalescing")
+def weather_coalescing_metrics() -> Dict:
+    """Totals of weather lookups and of those that shared an in-flight upstream request (no per-city data)."""
+    return weather_service.single_flight.stats()
+
+
+@router.get("/weather-breaker")
+def weather_breaker_metrics() -> Dict:
+    """State of the circuit breaker around the weather provider."""
+    return weather_service.breaker.stats()
+
+
+@router.get("/rate-limits")
+def rate_limit_metrics() -> Dict:
+    """Remaining request budget (bucket tokens, daily quota) and refusals per outbound provider."""
+    return {name: limiter.stats() for name, limiter in rate_limiters.items()}
+
+
+@router.get("/db-pool")
+def db_pool_metrics() -> Dict:
+    """Checked-out connections, connection wait time and overflow/timeout events per database engine."""
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+class RetrofitScenarioRequest(BaseModel):
+    """
+    Candidate upgrades per attribute; attributes left out keep the property's current value.
+    Square area and construction year are not upgrades and are rejected.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    insulation_quality: Optional[List[str]] = Field(None, min_length=1, max_length=10)
+    energy_source: Optional[List[str]] = Field(None, min_length=1, max_length=10)
+    top_k: int = Field(10, gt=0, le=100)
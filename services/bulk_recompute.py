@@ -0,0 +1,217 @@
+"""
+Resumable bulk recompute of every property estimate.
+
+The main process streams properties with keyset pagination (`id > last_id`),
+fans the chunks out to a process pool and writes the results back in
+submission order with bulk UPDATEs by primary key. After each chunk is
+written the last id is checkpointed, so an interrupted run resumes after it.
+
+Run from the project root:
+    python -m services.bulk_recompute --workers 8 --chunk-size 5000
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models.energy_batch_engine import (
+    ENERGY_SOURCES,
+    BlockRates,
+    encode_energy_source,
+    encode_insulation,
+    estimate_energy_batch,
+)
+from models.property_estimate import PropertyEstimate, ensure_estimate_rows, input_fingerprint
+from models.real_estates import RealEstate
+from models.tariff_engine import tariff_registry
+
+logger = logging.getLogger(__name__)
+
+BULK_RECOMPUTE_CHUNK_SIZE = int(os.getenv("BULK_RECOMPUTE_CHUNK_SIZE", "5000"))
+BULK_RECOMPUTE_CHECKPOINT = os.getenv("BULK_RECOMPUTE_CHECKPOINT", ".bulk_recompute_checkpoint.json")
+REPORT_INTERVAL_SECONDS = 5.0
+
+Chunk = Tuple[tuple, tuple, tuple, tuple, tuple]  # ids, square areas, insulation, years built, energy sources
+
+
+class _InlineExecutor(Executor):
+    """
+    Runs chunks in the calling process (--workers 0), e.g. for small databases and tests.
+    """
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def estimate_chunk(chunk: Chunk, rates: BlockRates,
+                   tariff_versions: Sequence[str]) -> Tuple[list, list, list, list, list]:
+    """
+    Worker: usage, cost and fingerprint of one chunk of properties.
+    Args:
+        chunk: Column tuples of the properties.
+        rates: Monthly block pricing by energy source code.
+        tariff_versions: Tariff version by energy source code.
+    Returns:
+        tuple: Ids, usages, costs, fingerprints and tariff versions as plain lists (cheap to pickle).
+    """
+    ids, square_areas, insulation, years_built, sources = chunk
+    source_codes = encode_energy_source(sources)
+    usage, cost = estimate_energy_batch(square_areas, encode_insulation(insulation), years_built, source_codes, rates)
+    versions = [tariff_versions[code] for code in source_codes.tolist()]
+    fingerprints = [
+        input_fingerprint(square_area, quality, year, source, version)
+        for square_area, quality, year, source, version in zip(square_areas, insulation, years_built, sources, versions)
+    ]
+    return list(ids), usage.tolist(), cost.tolist(), fingerprints, versions
+
+
+def read_checkpoint(path: Optional[str]) -> Dict:
+    if not path or not os.path.exists(path):
+        return {"last_id": 0, "rows": 0}
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def write_checkpoint(path: Optional[str], state: Dict) -> None:
+    if not path:
+        return
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(state, handle)
+    os.replace(temporary, path)  # atomic: a crash never leaves a half-written checkpoint
+
+
+def _read_chunk(db: Session, last_id: int, chunk_size: int) -> Optional[Chunk]:
+    rows = db.execute(
+        select(RealEstate.id, RealEstate.square_area, RealEstate.insulation_quality, RealEstate.year_built,
+               RealEstate.energy_source)
+        .where(RealEstate.id > last_id)
+        .order_by(RealEstate.id)
+        .limit(chunk_size)
+    ).all()
+    return tuple(zip(*rows)) if rows else None
+
+
+def _write_results(db: Session, result: Tuple[list, list, list, list, list]) -> None:
+    ids, usage, cost, fingerprints, versions = result
+    now = datetime.utcnow()
+    db.execute(update(PropertyEstimate), [
+        {
+            "real_estate_id": real_estate_id,
+            "energy_usage": energy_usage,
+            "estimated_cost": estimated_cost,
+            "input_fingerprint": fingerprint,
+            "tariff_version": tariff_version,
+            "is_dirty": False,
+            "computed_at": now,
+        }
+        for real_estate_id, energy_usage, estimated_cost, fingerprint, tariff_version
+        in zip(ids, usage, cost, fingerprints, versions)
+    ])  # bulk UPDATE by primary key
+    db.commit()
+
+
+def bulk_recompute(
+        session_factory: Callable[[], Session],
+        chunk_size: int = BULK_RECOMPUTE_CHUNK_SIZE,
+        workers: Optional[int] = None,
+        checkpoint_path: Optional[str] = BULK_RECOMPUTE_CHECKPOINT,
+        restart: bool = False,
+        report_interval: float = REPORT_INTERVAL_SECONDS,
+) -> Dict:
+    """
+    Recompute the estimate of every property, resuming from the checkpoint.
+    Args:
+        session_factory: Creates the database session of the main process.
+        chunk_size: Properties per chunk handed to a worker.
+        workers: Worker processes (default: CPU count); 0 computes in this process.
+        checkpoint_path: JSON file holding the last written id, None to disable.
+        restart: Ignore an existing checkpoint.
+        report_interval: Seconds between progress log lines.
+    Returns:
+        dict: Rows written, resume point, wall time and throughput.
+    """
+    state = {"last_id": 0, "rows": 0} if restart else read_checkpoint(checkpoint_path)
+    resumed_from = state["last_id"]
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    started = last_report = time.perf_counter()
+    written = 0
+
+    with session_factory() as db:
+        tariff_registry.reload(db)
+        snapshot = tariff_registry.snapshot
+        rates = snapshot.block_rates
+        tariff_versions = [snapshot.version_for(source) for source in ENERGY_SOURCES]
+        ensure_estimate_rows(db)  # one INSERT ... SELECT so every property has a row to update
+        total = db.execute(select(func.count(RealEstate.id)).where(RealEstate.id > resumed_from)).scalar()
+        logger.info(f"Bulk recompute of {total} properties after id {resumed_from} with {workers} worker(s)")
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else _InlineExecutor()
+        in_flight: Deque[Future] = deque()
+        read_id = resumed_from
+        with executor:
+            while True:
+                # Keep every worker busy plus one queued chunk each, reading ahead of the writes
+                while len(in_flight) < max(workers, 1) * 2:
+                    chunk = _read_chunk(db, read_id, chunk_size)
+                    if chunk is None:
+                        break
+                    read_id = chunk[0][-1]
+                    future = executor.submit(estimate_chunk, chunk, rates, tariff_versions)
+                    in_flight.append(future)
+                if not in_flight:
+                    break
+
+                result = in_flight.popleft().result()  # write in id order so the checkpoint is a prefix
+                _write_results(db, result)
+                written += len(result[0])
+                state = {"last_id": result[0][-1], "rows": state["rows"] + len(result[0])}
+                write_checkpoint(checkpoint_path, state)
+
+                now = time.perf_counter()
+                if now - last_report >= report_interval:
+                    last_report = now
+                    rate = written / (now - started)
+                    eta = (total - written) / rate if rate else float("inf")
+                    logger.info(f"{written}/{total} rows, {rate:,.0f} rows/s, ETA {eta:,.0f}s "
+                                f"(last id {state['last_id']})")
+
+    elapsed = time.perf_counter() - started
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)  # finished: the next run starts from the beginning
+    summary = {
+        "rows": written,
+        "resumed_after_id": resumed_from,
+        "wall_time_seconds": round(elapsed, 3),
+        "rows_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+    }
+    logger.info(f"Bulk recompute finished: {summary}")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Recompute the estimates of all properties.")
+    parser.add_argument("--chunk-size", type=int, default=BULK_RECOMPUTE_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 to compute inline")
+    parser.add_argument("--checkpoint", default=BULK_RECOMPUTE_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    from config.database import SessionLocal  # imported late so `--help` works without a database
+
+    bulk_recompute(SessionLocal, args.chunk_size, args.workers, args.checkpoint, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import time
+from typing import Callable, Optional
+
+
+class Deadline:
+    """
+    Absolute time budget for one request, passed down to the calls it makes.
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """
+        Seconds left before the deadline (never negative).
+        """
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+
+def remaining_seconds(deadline: Optional[Deadline]) -> Optional[float]:
+    """
+    Timeout to pass to `asyncio.wait_for`; None means no deadline.
+    """
+    return deadline.remaining() if deadline is not None else None
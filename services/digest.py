@@ -0,0 +1,324 @@
+"""
+Scheduled energy digests, driven by each user's notification frequency.
+
+The pipeline walks the due users with keyset pagination (`id > last_id`), so
+only one page of users and their properties is in memory at a time. Per page
+it resolves property locations to canonical cities and fetches each city's
+weather once per run, estimates every property in one vectorized pass,
+evaluates the tips of all primary properties in one rule-engine batch,
+renders the emails and hands them to the notification outbox in chunks.
+
+Each chunk claims its users with a conditional UPDATE that stamps
+`last_digest_sent_at` only where the user is still due, and enqueues the
+emails of the users it actually claimed in the same transaction. An
+interrupted run resumes without sending twice, and when several processes
+run the job at once (one scheduler per API worker) each digest is enqueued
+by exactly one of them: a concurrent claim of the same user blocks on its row
+lock and then finds the user no longer due.
+
+Tips use the server's local time of day (`local_hour`), like the tips of
+the request path; `now` and the stamps are UTC.
+"""
+import asyncio
+import html
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.orm import Session
+
+from models.energy_batch_engine import encode_energy_source, encode_insulation, estimate_energy_batch
+from models.notification import enqueue_emails
+from models.recomendation_tips import local_hour
+from models.real_estates import RealEstate
+from models.tariff_engine import tariff_registry
+from models.tip_rules import load_tip_rules
+from models.user import NotificationFrequency, User
+from services.email_templates import EmailTemplates, load_email_templates
+from services.rate_limiter import weather_rate_limiter
+from services.weather_api import (
+    AsyncWeatherService, WEATHER_BACKGROUND_RESERVED_TOKENS, WEATHER_BACKGROUND_WAIT_SECONDS,
+)
+from services.weather_cache import normalize_city, weather_cache
+
+logger = logging.getLogger(__name__)
+
+DIGEST_INTERVAL_MINUTES = int(os.getenv("DIGEST_INTERVAL_MINUTES", "60"))
+DIGEST_PAGE_SIZE = int(os.getenv("DIGEST_PAGE_SIZE", "500"))
+DIGEST_ENQUEUE_CHUNK_SIZE = int(os.getenv("DIGEST_ENQUEUE_CHUNK_SIZE", "200"))
+DIGEST_WEATHER_CONCURRENCY = int(os.getenv("DIGEST_WEATHER_CONCURRENCY", "20"))
+
+DIGEST_PERIODS = {
+    NotificationFrequency.DAILY: timedelta(days=1),
+    NotificationFrequency.WEEKLY: timedelta(days=7),
+    NotificationFrequency.MONTHLY: timedelta(days=30),
+    NotificationFrequency.SEASONALLY: timedelta(days=91),
+}
+STAGES = ("users", "properties", "weather", "estimate", "tips", "render", "enqueue")
+
+
+class _StageTimer:
+    """
+    Wall time accumulated per pipeline stage over all pages.
+    """
+
+    def __init__(self):
+        self.seconds = {stage: 0.0 for stage in STAGES}
+
+    @contextmanager
+    def __call__(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - started
+
+
+def due_users(now: datetime, grace: timedelta = timedelta(minutes=DIGEST_INTERVAL_MINUTES)):
+    """
+    Users whose period has elapsed since their last digest. `grace` (one scheduler interval) keeps a
+    digest sent a few seconds into a run from slipping a whole interval in the next period.
+    """
+    return or_(
+        User.last_digest_sent_at.is_(None),
+        *(
+            and_(User.notification_frequency == frequency, User.last_digest_sent_at <= now - period + grace)
+            for frequency, period in DIGEST_PERIODS.items()
+        ),
+    )
+
+
+def select_due_users(db: Session, after_id: int, limit: int, now: datetime) -> List[Tuple]:
+    """
+    One keyset page of due users that own at least one property: (id, name, email, notification_frequency).
+    """
+    return db.execute(
+        select(User.id, User.name, User.email, User.notification_frequency)
+        .where(User.id > after_id, due_users(now), exists().where(RealEstate.user_id == User.id))
+        .order_by(User.id)
+        .limit(limit)
+    ).all()
+
+
+def claim_users(db: Session, user_ids: Sequence[int], now: datetime) -> Set[int]:
+    """
+    Stamp the users that are still due with `now`, in the caller's transaction.
+    Returns:
+        set: The ids stamped; the others were claimed by a concurrent run since they were selected.
+    """
+    return set(db.execute(
+        update(User)
+        .where(User.id.in_(user_ids), due_users(now))
+        .values(last_digest_sent_at=now)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+
+def load_properties(db: Session, user_ids: Sequence[int]) -> List[Tuple]:
+    """
+    Properties of a page of users, grouped by user: (user_id, location, square_area, insulation, year, source).
+    """
+    return db.execute(
+        select(RealEstate.user_id, RealEstate.location, RealEstate.square_area, RealEstate.insulation_quality,
+               RealEstate.year_built, RealEstate.energy_source)
+        .where(RealEstate.user_id.in_(user_ids))
+        .order_by(RealEstate.user_id, RealEstate.id)
+    ).all()
+
+
+def city_key(weather_service: AsyncWeatherService, location: Optional[str]) -> Optional[str]:
+    """
+    Canonical city id of a location, its normalized name when the gazetteer does not know it; None when blank.
+    """
+    if not location or not location.strip():
+        return None
+    city = weather_service.resolve_city(location)
+    return city.id if city else normalize_city(location)
+
+
+async def fetch_city_weather(weather_service: AsyncWeatherService, locations: Dict[str, str],
+                             concurrency: int = DIGEST_WEATHER_CONCURRENCY) -> Dict[str, Optional[Dict]]:
+    """
+    Weather of each canonical city (keyed like `locations`), at most `concurrency` lookups in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(location: str) -> Optional[Dict]:
+        async with semaphore:
+            return await weather_service.get_weather(location)
+
+    results = await asyncio.gather(*(fetch(location) for location in locations.values()))
+    return dict(zip(locations, results))
+
+
+def _property_rows(locations: Iterable[str], usage: Iterable[float], cost: Iterable[float],
+                   temperatures: Iterable[Optional[float]]) -> Tuple[str, str]:
+    """
+    HTML table rows and plain-text lines of a user's properties.
+    """
+    html_rows, text_rows = [], []
+    for location, energy_usage, estimated_cost, temperature in zip(locations, usage, cost, temperatures):
+        location = location or "–"
+        shown = "–" if temperature is None else f"{temperature:g}"
+        html_rows.append(f"    <tr><td>{html.escape(location, quote=False)}</td><td>{energy_usage:.3f}</td>"
+                         f"<td>{estimated_cost:.3f}</td><td>{shown}</td></tr>")
+        text_rows.append(f"- {location}: {energy_usage:.3f} kWh, {estimated_cost:.3f} € per day, {shown} °C")
+    return "\n".join(html_rows), "\n".join(text_rows)
+
+
+async def run_digest_pipeline(
+        db: Session,
+        weather_service: AsyncWeatherService,
+        now: Optional[datetime] = None,
+        page_size: int = DIGEST_PAGE_SIZE,
+        chunk_size: int = DIGEST_ENQUEUE_CHUNK_SIZE,
+        concurrency: int = DIGEST_WEATHER_CONCURRENCY,
+        templates: Optional[EmailTemplates] = None,
+) -> Dict:
+    """
+    Enqueue the digest of every due user.
+    Args:
+        db (Session): Database session of the job.
+        weather_service: Weather client of the job's event loop.
+        now (datetime): Reference time of the run (UTC), now by default.
+        page_size (int): Users per keyset page.
+        chunk_size (int): Emails per outbox transaction.
+        concurrency (int): Weather lookups in flight.
+    Returns:
+        dict: Users, emails, cities and wall time per stage.
+    """
+    now = now or datetime.utcnow()
+    templates = templates or load_email_templates()
+    rules = load_tip_rules()
+    rates = tariff_registry.snapshot.block_rates
+    hour = local_hour(now)
+    timer = _StageTimer()
+    city_weather: Dict[str, Optional[Dict]] = {}  # one entry per canonical city
+    summary = {"pages": 0, "users": 0, "properties": 0, "emails": 0, "claimed_elsewhere": 0, "cities": 0,
+               "cities_without_weather": 0}
+    started = time.perf_counter()
+    after_id = 0
+
+    while True:
+        with timer("users"):
+            users = select_due_users(db, after_id, page_size, now)
+        if not users:
+            break
+        after_id = users[-1][0]
+        summary["pages"] += 1
+        summary["users"] += len(users)
+
+        with timer("properties"):
+            properties = load_properties(db, [user[0] for user in users])
+        owners, locations, square_areas, insulation, years_built, sources = zip(*properties)
+        summary["properties"] += len(properties)
+
+        with timer("weather"):
+            keys = [city_key(weather_service, location) for location in locations]
+            new_cities = {}
+            for key, location in zip(keys, locations):
+                if key is not None and key not in city_weather:
+                    new_cities.setdefault(key, location)
+            city_weather.update(await fetch_city_weather(weather_service, new_cities, concurrency))
+            weather = [city_weather.get(key) if key else None for key in keys]
+            temperatures = [data["main"]["temp"] if data else None for data in weather]
+
+        with timer("estimate"):
+            usage, cost = estimate_energy_batch(square_areas, encode_insulation(insulation), years_built,
+                                                encode_energy_source(sources), rates)
+            usage_list, cost_list = usage.tolist(), cost.tolist()
+            # Rows are grouped by user: [start, end) of each user's properties
+            bounds = np.flatnonzero(np.diff(np.array(owners))) + 1
+            starts = [0, *bounds.tolist()]
+            ends = [*bounds.tolist(), len(owners)]
+            # Tips follow the costliest property with weather data (the costliest one when none has any)
+            primary = [
+                max(range(start, end), key=lambda row: (weather[row] is not None, cost_list[row]))
+                for start, end in zip(starts, ends)
+            ]
+
+        with timer("tips"):
+            with_weather = [row for row in primary if weather[row] is not None]
+            tips_by_row = dict(zip(with_weather, rules.tips_batch(
+                len(with_weather),
+                temperature=[weather[row]["main"]["temp"] for row in with_weather],
+                humidity=[weather[row]["main"].get("humidity", np.nan) for row in with_weather],
+                wind_speed=[(weather[row].get("wind") or {}).get("speed", np.nan) for row in with_weather],
+                hour=hour,
+                insulation_quality=[insulation[row] for row in with_weather],
+                energy_source=[sources[row] for row in with_weather],
+                year_built=[years_built[row] for row in with_weather],
+                square_area=[square_areas[row] for row in with_weather],
+            ))) if with_weather else {}
+
+        with timer("render"):
+            emails = []
+            users_by_id = {user[0]: user for user in users}
+            for start, end, row in zip(starts, ends, primary):
+                user_id, name, email, frequency = users_by_id[owners[start]]
+                html_rows, text_rows = _property_rows(locations[start:end], usage_list[start:end],
+                                                      cost_list[start:end], temperatures[start:end])
+                rendered = templates.render("digest", {
+                    "name": name,
+                    "period": (frequency or NotificationFrequency.DAILY).value.lower(),
+                    "properties": html_rows,
+                    "property_lines": text_rows,
+                    "total_cost": sum(cost_list[start:end]),
+                    "tips_location": locations[row] or "–",
+                }, tips_by_row.get(row, ()))
+                emails.append({
+                    "user_id": user_id,
+                    "email": email,
+                    "recipient_name": name,
+                    "subject": rendered.subject,
+                    "html_content": rendered.html,
+                    "text_content": rendered.text,
+                    "message": f"Digest scheduled for {email}",
+                })
+
+        with timer("enqueue"):
+            for chunk_start in range(0, len(emails), chunk_size):
+                chunk = emails[chunk_start:chunk_start + chunk_size]
+                claimed = claim_users(db, [email["user_id"] for email in chunk], now)
+                chunk = [email for email in chunk if email["user_id"] in claimed]
+                enqueue_emails(db, chunk)
+                db.commit()  # the emails and the users' stamps of a chunk land together
+                summary["emails"] += len(chunk)
+                summary["claimed_elsewhere"] += len(emails[chunk_start:chunk_start + chunk_size]) - len(chunk)
+
+    summary["cities"] = len(city_weather)
+    summary["cities_without_weather"] = sum(1 for data in city_weather.values() if data is None)
+    summary["stage_seconds"] = {stage: round(seconds, 3) for stage, seconds in timer.seconds.items()}
+    summary["wall_time_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Digest run: {summary}")
+    return summary
+
+
+async def _run_with_own_client(concurrency: int) -> Dict:
+    # Like the weather prefetch, the job runs on its own event loop and therefore uses its own client pool
+    from config.database import SessionLocal
+    from services.gazetteer import load_gazetteer
+
+    weather_service = AsyncWeatherService(
+        api_key=os.getenv("WEATHER_API_KEY"), cache=weather_cache, max_connections=concurrency,
+        gazetteer=load_gazetteer(), rate_limiter=weather_rate_limiter,
+        rate_limit_budget=WEATHER_BACKGROUND_WAIT_SECONDS, rate_limit_keep=WEATHER_BACKGROUND_RESERVED_TOKENS,
+    )
+    try:
+        with SessionLocal() as session:
+            return await run_digest_pipeline(session, weather_service, concurrency=concurrency)
+    finally:
+        await weather_service.aclose()
+
+
+def run_digest(concurrency: int = DIGEST_WEATHER_CONCURRENCY) -> Dict:
+    """
+    Scheduler entry point: enqueue the digests that are due.
+    """
+    return asyncio.run(_run_with_own_client(concurrency))
@@ -0,0 +1,247 @@
+"""
+Bulk email dispatch through MailerSend's bulk-email API.
+
+Messages are grouped into batches of up to MAILERSEND_BULK_MAX_BATCH and
+each batch is one POST /bulk-email on a single pooled HTTP client. The
+provider validates bulk messages asynchronously, so the dispatcher polls the
+bulk status and maps its per-message validation errors ("message.<index>.…")
+back to the messages, and from there to their `Notification` rows. Batches
+still validating after the poll timeout come back "Queued" with their bulk id
+and each message's index, and `check_bulk` resolves them later.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import httpx
+
+from services.rate_limiter import RateLimiter, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+MAILERSEND_API_URL = os.getenv("MAILERSEND_API_URL", "https://api.mailersend.com/v1")
+MAILERSEND_BULK_MAX_BATCH = int(os.getenv("MAILERSEND_BULK_MAX_BATCH", "500"))
+MAILERSEND_TIMEOUT_SECONDS = float(os.getenv("MAILERSEND_TIMEOUT_SECONDS", "30"))
+MAILERSEND_BULK_POLL_INTERVAL_SECONDS = float(os.getenv("MAILERSEND_BULK_POLL_INTERVAL_SECONDS", "1"))
+MAILERSEND_BULK_POLL_TIMEOUT_SECONDS = float(os.getenv("MAILERSEND_BULK_POLL_TIMEOUT_SECONDS", "60"))
+
+STATUS_SENT = "Sent"
+STATUS_FAILED = "Failed"
+STATUS_QUEUED = "Queued"  # accepted by the provider, validation not finished within the poll timeout
+
+_MESSAGE_ERROR_KEY = re.compile(r"^message\.(\d+)\.")
+
+
+class EmailMessage(NamedTuple):
+    sender: Dict
+    recipient: Dict
+    subject: str
+    html_content: str
+    text_content: str
+    reply_to: Optional[Dict] = None
+    notification_id: Optional[int] = None
+
+
+class DispatchResult(NamedTuple):
+    notification_id: Optional[int]
+    status: str
+    error: Optional[str] = None
+    bulk_email_id: Optional[str] = None
+    bulk_index: Optional[int] = None  # position of the message in its bulk request
+
+
+class BulkEmailDispatcher:
+    """
+    Sends many messages with few requests over one reused HTTP client.
+    Thread-safe: the client is shared and the counters are locked. With a rate
+    limiter every API call (submits and status polls) takes a token first.
+    """
+
+    def __init__(
+            self,
+            api_key: Optional[str] = None,
+            base_url: str = MAILERSEND_API_URL,
+            max_batch: int = MAILERSEND_BULK_MAX_BATCH,
+            timeout: float = MAILERSEND_TIMEOUT_SECONDS,
+            poll_interval: float = MAILERSEND_BULK_POLL_INTERVAL_SECONDS,
+            poll_timeout: float = MAILERSEND_BULK_POLL_TIMEOUT_SECONDS,
+            client: Optional[httpx.Client] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.api_key = api_key or os.getenv("MAILERSEND_API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self._client = client
+        self.rate_limiter = rate_limiter
+        self._client_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"messages": 0, "requests": 0, "sent": 0, "failed": 0, "queued": 0}
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.base_url,
+                        headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+                    )
+        return self._client
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def send(self, messages: Sequence[EmailMessage]) -> List[DispatchResult]:
+        """
+        Send messages in provider batches.
+        Returns:
+            list: One DispatchResult per message, in input order.
+        """
+        batches = [messages[start:start + self.max_batch] for start in range(0, len(messages), self.max_batch)]
+        submitted = [(batch, self._submit(batch)) for batch in batches]
+
+        results: List[DispatchResult] = []
+        for batch, (bulk_email_id, error) in submitted:
+            if bulk_email_id is None:
+                results += [DispatchResult(message.notification_id, STATUS_FAILED, error) for message in batch]
+                continue
+            status = self._wait_for(bulk_email_id)
+            if status is None:
+                results += [DispatchResult(message.notification_id, STATUS_QUEUED, None, bulk_email_id, index)
+                            for index, message in enumerate(batch)]
+                continue
+            results += _outcomes(status, bulk_email_id, [(message.notification_id, index)
+                                                         for index, message in enumerate(batch)])
+
+        with self._stats_lock:
+            self._stats["messages"] += len(messages)
+            for result in results:
+                self._stats[result.status.lower()] += 1
+        return results
+
+    def _submit(self, batch: Sequence[EmailMessage]):
+        """
+        POST one batch; returns (bulk_email_id, None) or (None, error).
+        """
+        if self.rate_limiter is not None and not self.rate_limiter.acquire():
+            logger.warning(f"Bulk email request of {len(batch)} messages refused by the rate limiter")
+            return None, "rate limited: request budget exhausted"
+        with self._stats_lock:
+            self._stats["requests"] += 1
+        try:
+            response = self.client.post("/bulk-email", json=[_payload(message) for message in batch])
+        except httpx.HTTPError as e:
+            logger.error(f"Bulk email request failed: {e}")
+            return None, f"request failed: {e}"
+        if response.status_code == 429 and self.rate_limiter is not None:
+            self.rate_limiter.back_off(retry_after_seconds(response.headers))
+        if response.status_code != 202:
+            logger.error(f"Bulk email rejected with HTTP {response.status_code}: {response.text[:200]}")
+            return None, f"HTTP {response.status_code}: {response.text[:200]}"
+        try:
+            return str(response.json()["bulk_email_id"]), None
+        except (ValueError, KeyError, TypeError) as e:
+            # Accepted or not, the batch has no id to poll: fail it so the outbox retries it with backoff
+            logger.error(f"Bulk email response without a bulk_email_id: {response.text[:200]}")
+            return None, f"malformed response ({type(e).__name__}): {response.text[:200]}"
+
+    def _wait_for(self, bulk_email_id: str) -> Optional[Dict]:
+        """
+        Poll a bulk request until the provider finished validating it (None on timeout).
+        """
+        deadline = time.monotonic() + self.poll_timeout
+        while True:
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=deadline - time.monotonic()):
+                return None
+            data = self._bulk_status(bulk_email_id)
+            if data is not None:
+                return data
+            if time.monotonic() + self.poll_interval > deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def _bulk_status(self, bulk_email_id: str) -> Optional[Dict]:
+        """
+        One status request: the bulk status once validation completed, None while it is pending or unreadable.
+        """
+        with self._stats_lock:
+            self._stats["requests"] += 1
+        try:
+            response = self.client.get(f"/bulk-email/{bulk_email_id}")
+            if response.status_code == 200:
+                data = response.json()["data"]
+                if data.get("state") == "completed":
+                    return data
+        except httpx.HTTPError as e:
+            logger.warning(f"Polling bulk email {bulk_email_id} failed: {e}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Malformed status of bulk email {bulk_email_id}: {type(e).__name__} {e}")
+        return None
+
+    def check_bulk(self, bulk_email_id: str,
+                   messages: Sequence[Tuple[Optional[int], int]]) -> Optional[List[DispatchResult]]:
+        """
+        Resolve the messages of a "Queued" bulk request with a single status request, without waiting.
+        Args:
+            messages: (notification_id, bulk_index) of each message of the request to resolve.
+        Returns:
+            list: One DispatchResult per message, or None while the provider is still validating
+                (or the rate limiter has no token to spare).
+        """
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=0):
+            return None
+        status = self._bulk_status(bulk_email_id)
+        if status is None:
+            return None
+        results = _outcomes(status, bulk_email_id, messages)
+        with self._stats_lock:
+            for result in results:
+                self._stats[result.status.lower()] += 1
+        return results
+
+
+def _payload(message: EmailMessage) -> Dict:
+    payload = {
+        "from": message.sender,
+        "to": [message.recipient],
+        "subject": message.subject,
+        "html": message.html_content,
+        "text": message.text_content,
+    }
+    if message.reply_to:
+        payload["reply_to"] = message.reply_to
+    return payload
+
+
+def _outcomes(status: Dict, bulk_email_id: str,
+              messages: Iterable[Tuple[Optional[int], int]]) -> List[DispatchResult]:
+    errors = _errors_by_index(status.get("validation_errors") or {})
+    return [
+        DispatchResult(notification_id, STATUS_FAILED, errors[index], bulk_email_id, index)
+        if index in errors else DispatchResult(notification_id, STATUS_SENT, None, bulk_email_id, index)
+        for notification_id, index in messages
+    ]
+
+
+def _errors_by_index(validation_errors: Dict[str, Iterable[str]]) -> Dict[int, str]:
+    errors: Dict[int, List[str]] = {}
+    for key, messages in validation_errors.items():
+        match = _MESSAGE_ERROR_KEY.match(key)
+        if match:
+            errors.setdefault(int(match.group(1)), []).extend(messages)
+    return {index: "; ".join(messages) for index, messages in errors.items()}
+
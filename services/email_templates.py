@@ -0,0 +1,166 @@
+"""
+Precompiled email templates with per-locale variants.
+
+Templates live under templates/emails/<locale>/<name>.{subject,html,txt} and
+use `{{ field }}`, `{{ field:format_spec }}` and `{{ field|safe }}` (HTML
+fields are escaped unless marked safe). Every file is split once into its
+literal chunks and field slots, so rendering fills the slots and joins. The
+tip list fragment is rendered once per tip tuple and cached: tuples come
+from the tip rule engine, one per rule bucket.
+"""
+import html
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMAIL_TEMPLATES_DIR = os.getenv(
+    "EMAIL_TEMPLATES_DIR", os.path.join(os.path.dirname(__file__), "..", "templates", "emails")
+)
+EMAIL_DEFAULT_LOCALE = os.getenv("EMAIL_DEFAULT_LOCALE", "en")
+TIP_FRAGMENT_CACHE_SIZE = 4096
+
+_FIELD = re.compile(r"\{\{\s*(\w+)(?::([^}|]*?))?\s*(\|safe)?\s*\}\}")
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    html: str
+    text: str
+
+
+class CompiledTemplate:
+    """
+    A template split once into literal chunks and field slots. Rendering copies
+    the chunk list, fills the slots and joins: one allocation for the result.
+    """
+    __slots__ = ("_parts", "_slots", "fields")
+
+    def __init__(self, source: str, escape: bool = False):
+        self._parts: List[str] = []
+        self._slots: List[Tuple[int, str, str, bool]] = []
+        position = 0
+        for match in _FIELD.finditer(source):
+            self._parts.append(source[position:match.start()])
+            self._slots.append((len(self._parts), match.group(1), match.group(2) or "", escape and not match.group(3)))
+            self._parts.append("")
+            position = match.end()
+        self._parts.append(source[position:])
+        self.fields: Tuple[str, ...] = tuple(field for _, field, _, _ in self._slots)
+
+    def render(self, values: Mapping) -> str:
+        parts = self._parts[:]
+        for position, field, spec, escape in self._slots:
+            value = values[field]
+            if spec:
+                parts[position] = format(value, spec)
+            elif type(value) is str:
+                parts[position] = _escape(value) if escape else value
+            else:
+                parts[position] = str(value)  # numbers never need escaping
+        return "".join(parts)
+
+
+def _escape(text: str) -> str:
+    if "&" in text or "<" in text or ">" in text:
+        return html.escape(text, quote=False)
+    return text
+
+
+@lru_cache(maxsize=TIP_FRAGMENT_CACHE_SIZE)
+def html_tip_list(tips: Tuple[str, ...]) -> str:
+    """
+    `<ul>` fragment of a tip tuple, rendered once per distinct tuple.
+    """
+    return "<ul>" + "".join(f"<li>{html.escape(tip, quote=False)}</li>" for tip in tips) + "</ul>"
+
+
+@lru_cache(maxsize=TIP_FRAGMENT_CACHE_SIZE)
+def text_tip_list(tips: Tuple[str, ...]) -> str:
+    """
+    Plain-text bullet list of a tip tuple, rendered once per distinct tuple.
+    """
+    return "\n".join(f"- {tip}" for tip in tips)
+
+
+class EmailTemplates:
+    """
+    All email templates of all locales, compiled when constructed.
+    """
+
+    def __init__(self, root: str = EMAIL_TEMPLATES_DIR, default_locale: str = EMAIL_DEFAULT_LOCALE):
+        self.default_locale = default_locale
+        self._resolved: Dict[Tuple[str, Optional[str]], str] = {}
+        self._templates: Dict[Tuple[str, str], Tuple[CompiledTemplate, CompiledTemplate, CompiledTemplate]] = {}
+        for locale in sorted(os.listdir(root)):
+            directory = os.path.join(root, locale)
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted({os.path.splitext(file)[0] for file in os.listdir(directory)}):
+                self._templates[(locale, name)] = (
+                    CompiledTemplate(_read(directory, f"{name}.subject").strip()),
+                    CompiledTemplate(_read(directory, f"{name}.html"), escape=True),
+                    CompiledTemplate(_read(directory, f"{name}.txt")),
+                )
+        if not any(locale == default_locale for locale, _ in self._templates):
+            raise ValueError(f"No email templates for the default locale {default_locale!r} in {root}.")
+        logger.info(f"Compiled {len(self._templates)} email templates from {root}")
+
+    @property
+    def locales(self) -> Tuple[str, ...]:
+        return tuple(sorted({locale for locale, _ in self._templates}))
+
+    def resolve_locale(self, name: str, locale: Optional[str]) -> str:
+        """
+        Best available locale for a template: exact, then language ("de-AT" -> "de"), then the default.
+        """
+        try:
+            return self._resolved[(name, locale)]
+        except KeyError:
+            pass
+        resolved = self.default_locale
+        for candidate in (locale, (locale or "").split("-")[0].split("_")[0]):
+            if candidate and (candidate.lower(), name) in self._templates:
+                resolved = candidate.lower()
+                break
+        self._resolved[(name, locale)] = resolved
+        return resolved
+
+    def render(self, name: str, values: Mapping, tips: Sequence[str] = (), locale: Optional[str] = None) -> RenderedEmail:
+        """
+        Render a template's subject, HTML and text bodies.
+        Args:
+            name: Template name, e.g. "optimization_report".
+            values: Per-recipient fields.
+            tips: Tip tuple (from the tip rule engine) rendered into the `tips` field.
+            locale: Preferred locale of the recipient.
+        Returns:
+            RenderedEmail: Subject, finished HTML (no newline conversion needed) and text.
+        """
+        try:
+            subject, html_body, text_body = self._templates[(self.resolve_locale(name, locale), name)]
+        except KeyError:
+            raise ValueError(f"Unknown email template {name!r}.")
+        tips = tips if isinstance(tips, tuple) else tuple(tips)
+        html_values = dict(values, tips=html_tip_list(tips))
+        return RenderedEmail(
+            subject.render(values),
+            html_body.render(html_values),
+            text_body.render(dict(values, tips=text_tip_list(tips))),
+        )
+
+
+def _read(directory: str, file: str) -> str:
+    with open(os.path.join(directory, file), encoding="utf-8") as handle:
+        return handle.read()
+
+
+@lru_cache(maxsize=None)
+def load_email_templates(root: str = EMAIL_TEMPLATES_DIR) -> EmailTemplates:
+    """
+    Shared template set, compiled once per process.
+    """
+    return EmailTemplates(root)
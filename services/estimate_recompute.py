@@ -0,0 +1,43 @@
+"""
+Periodic jobs that keep tariffs and materialized property estimates current.
+"""
+import logging
+import os
+import time
+from typing import Dict
+
+from config.database import SessionLocal
+from models.property_estimate import ensure_estimate_rows, recompute_dirty_estimates
+from models.tariff_engine import tariff_registry
+
+logger = logging.getLogger(__name__)
+
+ESTIMATE_RECOMPUTE_INTERVAL_MINUTES = int(os.getenv("ESTIMATE_RECOMPUTE_INTERVAL_MINUTES", "5"))
+ESTIMATE_RECOMPUTE_BATCH_SIZE = int(os.getenv("ESTIMATE_RECOMPUTE_BATCH_SIZE", "1000"))
+TARIFF_RELOAD_INTERVAL_SECONDS = int(os.getenv("TARIFF_RELOAD_INTERVAL_SECONDS", "60"))
+
+
+def run_tariff_reload() -> bool:
+    """
+    Scheduler entry point: pick up newly published tariffs without restarting the worker.
+    """
+    with SessionLocal() as session:
+        return tariff_registry.reload(session)
+
+
+def run_estimate_recompute(batch_size: int = ESTIMATE_RECOMPUTE_BATCH_SIZE) -> Dict:
+    """
+    Scheduler entry point: recompute the estimates flagged dirty since the last run.
+    """
+    started = time.perf_counter()
+    with SessionLocal() as session:
+        tariff_registry.reload(session)  # recompute against the tariffs currently published
+        created = ensure_estimate_rows(session)
+        summary = recompute_dirty_estimates(session, batch_size)
+    summary["created"] = created
+    summary["wall_time_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Estimate recompute: {summary['recomputed']} recomputed, {summary['unchanged']} unchanged, "
+        f"{created} new in {summary['wall_time_seconds']}s"
+    )
+    return summary
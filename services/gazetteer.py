@@ -0,0 +1,288 @@
+"""
+Offline city gazetteer used to canonicalize free-text locations
+("Berlin", "berlin ", "Berlin, DE", "Berlin-Mitte", "Paris, TX") before weather lookups.
+
+data/cities.csv is built from the GeoNames cities15000 dump (every place with
+more than 15,000 inhabitants and every capital, about 34,000 entries) and
+data/regions.csv from its country and first-level region names; GeoNames data
+is licensed under CC BY 4.0 (https://www.geonames.org). Rebuild both with:
+    python -m services.gazetteer cities15000.txt --countries countryInfo.txt --admin1 admin1CodesASCII.txt
+"""
+import argparse
+import csv
+import difflib
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(DATA_DIR, "cities.csv"))
+REGIONS_PATH = os.getenv("GAZETTEER_REGIONS_PATH", os.path.join(DATA_DIR, "regions.csv"))
+FUZZY_CUTOFF = 0.85
+FUZZY_LENGTH_WINDOW = 2
+RESOLVE_CACHE_SIZE = int(os.getenv("GAZETTEER_RESOLVE_CACHE_SIZE", "10000"))
+# Country names in common use that GeoNames does not list
+COUNTRY_ALIASES = {"GB": ["UK", "Great Britain", "Britain"], "US": ["United States of America", "America"]}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+class City(NamedTuple):
+    id: str
+    name: str
+    country: str
+    lat: float
+    lon: float
+    admin1: str = ""  # first-level region code (US state, UK nation, ...)
+    population: int = 0
+
+
+def normalize_place(name: str) -> str:
+    """
+    Fold case and accents and collapse punctuation: "  Düsseldorf " -> "dusseldorf".
+    """
+    folded = unicodedata.normalize("NFKD", name.casefold())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return " ".join(_NON_ALNUM.sub(" ", folded).split())
+
+
+class Gazetteer:
+    """
+    In-memory index of normalized city names and aliases.
+
+    Exact lookups are a dict access, prefix search is a bisect over the
+    sorted keys and fuzzy matching only compares keys sharing the first two
+    letters and of about the same length. Cities sharing a name are ranked by
+    population, and a city's own name ranks before another city's alias.
+    Regions map normalized country and region names ("germany", "texas") to
+    (country, admin1) pairs, admin1 None standing for the whole country.
+    """
+
+    def __init__(self, cities: List[City], aliases: Dict[str, List[str]],
+                 regions: Optional[Dict[str, Set[Tuple[str, Optional[str]]]]] = None):
+        self.cities: Dict[str, City] = {city.id: city for city in cities}
+        self.regions = regions or {}
+        self._by_name: Dict[str, List[City]] = {}
+        by_population = sorted(cities, key=lambda city: -city.population)
+        for city in by_population:
+            self._add(normalize_place(city.name), city)
+        names = sorted(self._by_name)
+        for city in by_population:
+            for alias in aliases.get(city.id, []):
+                key = normalize_place(alias)
+                if key in self._by_name or not self._shadows(names, key, city):
+                    self._add(key, city)
+        self._keys = sorted(self._by_name)
+        # Fuzzy matching takes milliseconds: remember recent answers, unknown locations included
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self.resolve)
+        self._keys_by_shape: Dict[Tuple[str, int], List[str]] = {}
+        for key in self._keys:
+            self._keys_by_shape.setdefault((key[:2], len(key)), []).append(key)
+
+    def _add(self, key: str, city: City) -> None:
+        if key and city not in self._by_name.setdefault(key, []):
+            self._by_name[key].append(city)
+
+    def _shadows(self, names: List[str], key: str, city: City) -> bool:
+        """
+        Whether an alias would hide places abroad whose names start with it ("Neustadt", an old
+        name of Baia Mare, Romania, against the German "Neustadt an der ..." towns).
+        """
+        index = bisect_left(names, key + " ")
+        while index < len(names) and names[index].startswith(key + " "):
+            if all(other.country != city.country for other in self._by_name[names[index]]):
+                return True
+            index += 1
+        return False
+
+    @classmethod
+    def from_csv(cls, path: str = GAZETTEER_PATH, regions_path: Optional[str] = REGIONS_PATH) -> "Gazetteer":
+        cities, aliases = [], {}
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                cities.append(City(row["id"], row["name"], row["country"], float(row["lat"]), float(row["lon"]),
+                                   row["admin1"], int(row["population"] or 0)))
+                if row["aliases"]:
+                    aliases[row["id"]] = row["aliases"].split("|")
+        regions: Dict[str, Set[Tuple[str, Optional[str]]]] = {}
+        if regions_path is not None and os.path.exists(regions_path):
+            with open(regions_path, newline="", encoding="utf-8") as handle:
+                for row in csv.DictReader(handle):
+                    regions.setdefault(normalize_place(row["name"]), set()).add((row["country"], row["admin1"] or None))
+        return cls(cities, aliases, regions)
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def get(self, city_id: str) -> Optional[City]:
+        return self.cities.get(city_id)
+
+    def lookup(self, name: str, country: Optional[str] = None) -> Optional[City]:
+        """
+        Exact match on a normalized name or alias, optionally restricted to a country code.
+        """
+        candidates = self._by_name.get(normalize_place(name), [])
+        if country:
+            candidates = [city for city in candidates if city.country == country.upper()]
+        return candidates[0] if candidates else None
+
+    def search(self, prefix: str, limit: int = 10) -> List[City]:
+        """
+        Cities whose name or alias starts with `prefix` (autocomplete), most populous first.
+        """
+        prefix = normalize_place(prefix)
+        if not prefix:
+            return []
+        results: Dict[str, City] = {}
+        index = bisect_left(self._keys, prefix)
+        while index < len(self._keys) and self._keys[index].startswith(prefix):
+            for city in self._by_name[self._keys[index]]:
+                results.setdefault(city.id, city)
+            index += 1
+        return sorted(results.values(), key=lambda city: -city.population)[:limit]
+
+    def fuzzy(self, name: str, cutoff: float = FUZZY_CUTOFF) -> Optional[City]:
+        """
+        Closest name or alias for a misspelt city ("Berln" -> Berlin).
+        """
+        key = normalize_place(name)
+        if not key:
+            return None
+        keys = [candidate for length in range(len(key) - FUZZY_LENGTH_WINDOW, len(key) + FUZZY_LENGTH_WINDOW + 1)
+                for candidate in self._keys_by_shape.get((key[:2], length), [])]
+        matches = difflib.get_close_matches(key, keys, n=1, cutoff=cutoff)
+        return self._by_name[matches[0]][0] if matches else None
+
+    def qualifies(self, city: City, qualifier: str) -> bool:
+        """
+        Whether a qualifier ("DE", "Germany", "TX", "Texas", "England") names the city's country or region.
+        """
+        code = qualifier.strip().upper()
+        if code in (city.country, city.admin1) and code.isalpha():
+            return True
+        places = self.regions.get(normalize_place(qualifier), ())
+        return any(country == city.country and admin1 in (None, city.admin1) for country, admin1 in places)
+
+    def _candidates(self, name: str) -> List[City]:
+        """
+        Cities named `name`, else the longest leading part of a district name ("Berlin-Mitte"), else a fuzzy match.
+        """
+        words = normalize_place(name).split()
+        for end in range(len(words), 0, -1):
+            candidates = self._by_name.get(" ".join(words[:end]))
+            if candidates:
+                return candidates
+        city = self.fuzzy(name)
+        return [city] if city else []
+
+    def resolve(self, location: str) -> Optional[City]:
+        """
+        Map a free-text location to a canonical city, or None when it is unknown.
+
+        Tries the full text, then the name before the first comma: exactly,
+        by the longest leading part of a district name ("Berlin-Mitte") and
+        fuzzily. Qualifiers after commas ("Paris, TX", "Berlin, Germany") pick
+        the city in that country or region; when none matches, the location is
+        unknown rather than resolved to a namesake elsewhere.
+        """
+        if not location:
+            return None
+        city = self.lookup(location)
+        if city:
+            return city
+
+        name, *qualifiers = location.split(",")
+        qualifiers = [qualifier for qualifier in qualifiers if qualifier.strip()]
+        for city in self._candidates(name):
+            if all(self.qualifies(city, qualifier) for qualifier in qualifiers):
+                return city
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path: str = GAZETTEER_PATH, regions_path: Optional[str] = REGIONS_PATH) -> Gazetteer:
+    """
+    Load the bundled gazetteer once per process.
+    """
+    return Gazetteer.from_csv(path, regions_path)
+
+
+def _alias_names(name: str, alternate_names: Iterable[str]) -> List[str]:
+    """
+    Latin-script alternate names of a city, one per normalized form. Lower-case
+    transliterations and all-caps airport codes ("MUC") are left out.
+    """
+    seen = {normalize_place(name)}
+    aliases = []
+    for alias in alternate_names:
+        key = normalize_place(alias)
+        if (not key or key in seen or not alias[0].isupper() or (alias.isupper() and len(alias) <= 4)
+                or any(ord(char) >= 0x250 for char in alias) or "|" in alias):
+            continue
+        seen.add(key)
+        aliases.append(alias)
+    return aliases
+
+
+def build_cities(geonames_path: str, path: str = GAZETTEER_PATH) -> int:
+    """
+    Write the cities CSV from a GeoNames cities dump (tab-separated, e.g. cities15000.txt).
+    Returns:
+        int: The number of cities written.
+    """
+    rows = []
+    with open(geonames_path, newline="", encoding="utf-8") as handle:
+        for fields in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+            geoname_id, name, _, alternate_names, lat, lon = fields[:6]
+            country, admin1, population = fields[8], fields[10], fields[14]
+            rows.append([geoname_id, name, country, admin1, lat, lon, population or "0",
+                         "|".join(_alias_names(name, alternate_names.split(",") if alternate_names else []))])
+    rows.sort(key=lambda row: (row[2], row[1], int(row[0])))
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(["id", "name", "country", "admin1", "lat", "lon", "population", "aliases"])
+        writer.writerows(rows)
+    return len(rows)
+
+
+def build_regions(countries_path: str, admin1_path: Optional[str] = None, path: str = REGIONS_PATH) -> int:
+    """
+    Write the regions CSV from GeoNames countryInfo.txt (names and ISO3 codes of the countries) and,
+    optionally, admin1CodesASCII.txt (first-level regions).
+    Returns:
+        int: The number of names written.
+    """
+    rows = []
+    with open(countries_path, newline="", encoding="utf-8") as handle:
+        for fields in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if not fields or fields[0].startswith("#"):
+                continue
+            iso, iso3, name = fields[0], fields[1], fields[4]
+            rows += [[iso, "", name], [iso, "", iso3]] + [[iso, "", alias] for alias in COUNTRY_ALIASES.get(iso, [])]
+    if admin1_path is not None:
+        with open(admin1_path, newline="", encoding="utf-8") as handle:
+            for fields in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+                country, _, admin1 = fields[0].partition(".")
+                rows += [[country, admin1, name] for name in dict.fromkeys(fields[1:3])]
+    rows.sort()
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(["country", "admin1", "name"])
+        writer.writerows(rows)
+    return len(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the gazetteer CSVs from GeoNames dumps.")
+    parser.add_argument("cities", help="GeoNames cities dump, e.g. cities15000.txt")
+    parser.add_argument("--countries", required=True, help="GeoNames countryInfo.txt")
+    parser.add_argument("--admin1", help="GeoNames admin1CodesASCII.txt")
+    args = parser.parse_args(argv)
+    print(f"{build_cities(args.cities)} cities, {build_regions(args.countries, args.admin1)} region names")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Transactional email outbox on the `notifications` table.
+
+Requests only insert a "Pending" notification with the rendered email in
+their own transaction (`models.notification.enqueue_email`), or with the
+template and values the worker renders it from when the email needs slow
+inputs such as the weather (services/outbox_rendering.py). Workers claim
+due rows in batches, marking them "Sending" with a claim time, send each
+batch with the bulk dispatcher and write the outcomes back with one bulk
+UPDATE. Claiming uses `SELECT ... FOR UPDATE SKIP LOCKED` on PostgreSQL so
+concurrent workers never block on or double-claim a row; other databases
+claim with a conditional UPDATE that only succeeds for rows still due.
+Rows whose claim is older than the lease (a worker died mid-send) become
+due again. Every claim counts as an attempt, so a row whose lease keeps
+expiring (a message that crashes its worker) is failed after
+OUTBOX_MAX_ATTEMPTS claims instead of being retried forever. Request
+failures are retried with exponential backoff and jitter. Emails the
+provider was still validating when the dispatcher stopped polling are left
+"Queued" with their bulk request; every run first resolves them with one
+status request per bulk request (`poll_queued`).
+
+Run once from the project root (the API also runs it on a schedule):
+    python -m services.notification_outbox --concurrency 4
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from models.notification import Notification, STATUS_PENDING, STATUS_SENDING
+from services.email_dispatcher import BulkEmailDispatcher, DispatchResult, EmailMessage, STATUS_FAILED, STATUS_QUEUED
+from services.email_templates import RenderedEmail
+from services.outbox_rendering import render_outbox_emails
+from services.rate_limiter import email_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "600"))
+OUTBOX_POLL_INTERVAL_SECONDS = int(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "10"))
+OUTBOX_QUEUED_POLL_LIMIT = int(os.getenv("OUTBOX_QUEUED_POLL_LIMIT", "20"))
+EMAIL_SENDER_NAME = os.getenv("EMAIL_SENDER_NAME", "Efficient Energy Advisory")
+EMAIL_SENDER_ADDRESS = os.getenv("EMAIL_SENDER_ADDRESS", "MS_vDTC8L@trial-pq3enl6wpk842vwr.mlsender.net")
+
+
+def _lease_expired(now: datetime, lease_seconds: int):
+    return and_(Notification.status == STATUS_SENDING, Notification.claimed_at < now - timedelta(seconds=lease_seconds))
+
+
+def _due(now: datetime, lease_seconds: int, max_attempts: int):
+    """
+    Rows a worker may claim: pending and due, or stuck in "Sending" past the lease with attempts left.
+    """
+    return or_(
+        and_(
+            Notification.status == STATUS_PENDING,
+            or_(Notification.subject.isnot(None), Notification.template.isnot(None)),
+            or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= now),
+        ),
+        and_(_lease_expired(now, lease_seconds), func.coalesce(Notification.attempts, 0) < max_attempts),
+    )
+
+
+def fail_expired_leases(db: Session, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                        lease_seconds: int = OUTBOX_LEASE_SECONDS, now: Optional[datetime] = None) -> int:
+    """
+    Fail the rows whose last allowed claim expired: each worker holding them died before recording an outcome.
+    Returns:
+        int: Number of notifications failed.
+    """
+    now = now or datetime.utcnow()
+    failed = db.execute(
+        update(Notification)
+        .where(_lease_expired(now, lease_seconds), func.coalesce(Notification.attempts, 0) >= max_attempts)
+        .values(status=STATUS_FAILED, claimed_at=None,
+                last_error=f"Lease expired on each of {max_attempts} attempts without an outcome")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if failed:
+        logger.warning(f"Failed {failed} notifications whose worker never recorded an outcome")
+    return failed
+
+
+def claim_batch(db: Session, batch_size: int = OUTBOX_BATCH_SIZE, lease_seconds: int = OUTBOX_LEASE_SECONDS,
+                max_attempts: int = OUTBOX_MAX_ATTEMPTS, now: Optional[datetime] = None) -> List[Notification]:
+    """
+    Claim up to `batch_size` due notifications for this worker, counting the claim as an attempt.
+    Returns:
+        list: The claimed notifications (status "Sending"), oldest first; empty when nothing is due.
+    """
+    now = now or datetime.utcnow()
+    claim = {"status": STATUS_SENDING, "claimed_at": now, "attempts": func.coalesce(Notification.attempts, 0) + 1}
+    candidates = (select(Notification.id).where(_due(now, lease_seconds, max_attempts))
+                  .order_by(Notification.id).limit(batch_size))
+    if db.get_bind().dialect.name == "postgresql":
+        # Locked rows belong to another worker's open claim: skip them instead of waiting
+        ids = db.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+        if ids:
+            db.execute(update(Notification).where(Notification.id.in_(ids))
+                       .values(**claim).execution_options(synchronize_session=False))
+    else:
+        # No row locks: re-check the due condition in the UPDATE so a row another worker claimed in between is
+        # not claimed twice, and keep only the ids this statement actually changed
+        ids = db.execute(candidates).scalars().all()
+        if ids:
+            ids = db.execute(
+                update(Notification)
+                .where(Notification.id.in_(ids), _due(now, lease_seconds, max_attempts))
+                .values(**claim)
+                .returning(Notification.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+    db.commit()
+    if not ids:
+        return []
+    # populate_existing: rows this session loaded before must show the attempts the claim just counted
+    return db.execute(select(Notification).where(Notification.id.in_(ids)).order_by(Notification.id)
+                      .execution_options(populate_existing=True)).scalars().all()
+
+
+def backoff_seconds(attempt: int, base: float = OUTBOX_BACKOFF_BASE_SECONDS,
+                    maximum: float = OUTBOX_BACKOFF_MAX_SECONDS) -> float:
+    """
+    Delay before retry `attempt` (1-based): exponential, capped, with jitter so failed batches do not retry in step.
+    """
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def record_results(db: Session, claimed: Sequence[Notification], results: Sequence[DispatchResult],
+                   max_attempts: int = OUTBOX_MAX_ATTEMPTS, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Write the outcome of a sent batch with one bulk UPDATE. `claimed` holds the attempts counted by the claim.
+
+    Rejected addresses (validation errors of an accepted bulk request) fail for good; a failed request
+    (network error, HTTP error) puts the row back to "Pending" with a backoff until `max_attempts`.
+    Returns:
+        dict: Count per outcome.
+    """
+    now = now or datetime.utcnow()
+    attempts = {notification.id: notification.attempts for notification in claimed}
+    counts = {"sent": 0, "queued": 0, "failed": 0, "retried": 0}
+    changes = []
+    for result in results:
+        attempt = attempts[result.notification_id]
+        change = {"id": result.notification_id, "claimed_at": None, "next_attempt_at": None,
+                  "last_error": result.error[:500] if result.error else None,
+                  "bulk_email_id": result.bulk_email_id, "bulk_index": result.bulk_index}
+        if result.status == STATUS_FAILED and result.bulk_email_id is None and attempt < max_attempts:
+            change["status"] = STATUS_PENDING
+            change["next_attempt_at"] = now + timedelta(seconds=backoff_seconds(attempt))
+            counts["retried"] += 1
+        else:
+            change["status"] = result.status
+            counts[result.status.lower()] += 1
+        changes.append(change)
+    if changes:
+        db.execute(update(Notification), changes)  # bulk UPDATE by primary key
+    db.commit()
+    return counts
+
+
+def poll_queued(db: Session, dispatcher: BulkEmailDispatcher, limit: int = OUTBOX_QUEUED_POLL_LIMIT) -> Dict[str, int]:
+    """
+    Resolve "Queued" notifications with one status request per bulk request, for the `limit` oldest ones.
+    Bulk requests the provider is still validating stay queued for the next run.
+    Returns:
+        dict: Notifications now sent or failed, and those still queued.
+    """
+    counts = {"sent": 0, "failed": 0, "queued": 0}
+    bulk_email_ids = db.execute(
+        select(Notification.bulk_email_id)
+        .where(Notification.status == STATUS_QUEUED, Notification.bulk_email_id.isnot(None))
+        .group_by(Notification.bulk_email_id)
+        .order_by(func.min(Notification.id))
+        .limit(limit)
+    ).scalars().all()
+    for bulk_email_id in bulk_email_ids:
+        messages = db.execute(
+            select(Notification.id, Notification.bulk_index)
+            .where(Notification.bulk_email_id == bulk_email_id, Notification.status == STATUS_QUEUED)
+        ).all()
+        results = dispatcher.check_bulk(bulk_email_id, [tuple(message) for message in messages])
+        if results is None:
+            counts["queued"] += len(messages)
+            continue
+        db.execute(update(Notification), [
+            {"id": result.notification_id, "status": result.status,
+             "last_error": result.error[:500] if result.error else None}
+            for result in results
+        ])  # bulk UPDATE by primary key; a concurrent poll of the same request writes the same outcome
+        db.commit()
+        for result in results:
+            counts[result.status.lower()] += 1
+    db.commit()  # end the read transaction when nothing was resolved
+    return counts
+
+
+def render_claimed(db: Session, claimed: Sequence[Notification],
+                   renderer: Callable[[Sequence[Notification]], Dict[int, Optional[RenderedEmail]]]
+                   ) -> Dict[int, str]:
+    """
+    Render the claimed notifications enqueued as a template and store the emails with their rows.
+    Returns:
+        dict: The error of each notification that could not be rendered, by id.
+    """
+    unrendered = [notification for notification in claimed
+                  if notification.subject is None and notification.template is not None]
+    if not unrendered:
+        return {}
+    try:
+        rendered = renderer(unrendered)
+    except Exception as e:
+        logger.exception("Rendering outbox emails failed")
+        return {notification.id: f"Rendering failed: {e}" for notification in unrendered}
+    errors = {}
+    for notification in unrendered:
+        email = rendered.get(notification.id)
+        if email is None:
+            errors[notification.id] = f"Inputs of {notification.template} unavailable (no weather data)"
+            continue
+        notification.subject, notification.html_content, notification.text_content = email
+    db.commit()
+    return errors
+
+
+def _to_message(notification: Notification, sender: Dict) -> EmailMessage:
+    return EmailMessage(
+        sender,
+        {"name": notification.recipient_name or notification.email, "email": notification.email},
+        notification.subject,
+        notification.html_content or "",
+        notification.text_content or "",
+        notification_id=notification.id,
+    )
+
+
+def _quota_spent(dispatcher: BulkEmailDispatcher) -> bool:
+    limiter = dispatcher.rate_limiter
+    return limiter is not None and limiter.remaining()["daily_remaining"] == 0
+
+
+def drain_outbox(
+        session_factory: Callable[[], Session],
+        dispatcher: BulkEmailDispatcher,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        lease_seconds: int = OUTBOX_LEASE_SECONDS,
+        sender: Optional[Dict] = None,
+        renderer: Callable[[Sequence[Notification]], Dict[int, Optional[RenderedEmail]]] = render_outbox_emails,
+) -> Dict:
+    """
+    Resolve the queued notifications (`poll_queued`), then send every due notification with `concurrency`
+    workers, each claiming and sending a batch at a time.
+    Args:
+        session_factory: Creates one database session per worker.
+        dispatcher: Shared bulk dispatcher (its HTTP client is pooled and thread-safe).
+        batch_size: Notifications claimed per batch.
+        concurrency: Worker threads, i.e. the most batches in flight at once.
+        renderer: Renders the templated notifications of a batch (see `render_claimed`).
+    Returns:
+        dict: Counts per outcome, batches, rows failed after their last lease expired, the outcomes of the
+            queued notifications polled and wall time.
+    """
+    sender = sender or {"name": EMAIL_SENDER_NAME, "email": EMAIL_SENDER_ADDRESS}
+    totals = {"sent": 0, "queued": 0, "failed": 0, "retried": 0, "batches": 0}
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    with session_factory() as db:
+        totals["lease_expired"] = fail_expired_leases(db, max_attempts, lease_seconds)
+        totals["polled"] = poll_queued(db, dispatcher) if not _quota_spent(dispatcher) else {}
+
+    def worker() -> None:
+        with session_factory() as db:
+            while True:
+                if _quota_spent(dispatcher):
+                    return  # leave the rows pending instead of burning their attempts until the quota resets
+                claimed = claim_batch(db, batch_size, lease_seconds, max_attempts)
+                if not claimed:
+                    return
+                errors = render_claimed(db, claimed, renderer)
+                messages = [_to_message(notification, sender) for notification in claimed
+                            if notification.id not in errors]
+                results = dispatcher.send(messages) if messages else []
+                results += [DispatchResult(notification_id, STATUS_FAILED, error)
+                            for notification_id, error in errors.items()]
+                counts = record_results(db, claimed, results, max_attempts)
+                with lock:
+                    totals["batches"] += 1
+                    for outcome, count in counts.items():
+                        totals[outcome] += count
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for future in [executor.submit(worker) for _ in range(max(concurrency, 1))]:
+            future.result()
+
+    totals["wall_time_seconds"] = round(time.perf_counter() - started, 3)
+    if totals["batches"] or totals["lease_expired"] or totals["polled"].get("sent") or totals["polled"].get("failed"):
+        logger.info(f"Notification outbox: {totals}")
+    return totals
+
+
+_dispatcher: Optional[BulkEmailDispatcher] = None
+
+
+def get_dispatcher() -> BulkEmailDispatcher:
+    """
+    Process-wide dispatcher of the scheduled outbox job, so its HTTP connections are reused between runs.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = BulkEmailDispatcher(rate_limiter=email_rate_limiter)
+    return _dispatcher
+
+
+def close_dispatcher() -> None:
+    if _dispatcher is not None:
+        _dispatcher.close()
+
+
+def run_notification_outbox() -> Dict:
+    """
+    Scheduler entry point: send the notifications that are due.
+    """
+    from config.database import SessionLocal
+
+    return drain_outbox(SessionLocal, get_dispatcher())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Send the due notifications of the email outbox.")
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=OUTBOX_CONCURRENCY, help="batches in flight at once")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    from config.database import SessionLocal  # imported late so `--help` works without a database
+
+    dispatcher = BulkEmailDispatcher(rate_limiter=email_rate_limiter)
+    try:
+        print(drain_outbox(SessionLocal, dispatcher, args.batch_size, args.concurrency))
+    finally:
+        dispatcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Rendering of outbox emails enqueued with their inputs instead of their content.
+
+The optimization report needs the current weather at the property. Rather
+than waiting on the weather API inside the HTTP request, the route only
+inserts a "Pending" notification carrying the template name and its values
+(`models.notification.enqueue_templated_email`). The outbox worker renders
+such rows after claiming them: the weather lookups of a batch run
+concurrently (one upstream request per city, through the shared cache) and
+the rendered email is stored with the row, so a retried send does not render
+again. A row whose weather is unavailable is not sent; it is retried with the
+outbox backoff and marked "Failed" with its error after the last attempt.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Mapping, Optional, Sequence
+
+from models.notification import Notification
+from models.recomendation_tips import get_weather_tips
+from services.deadline import Deadline
+from services.email_templates import RenderedEmail, load_email_templates
+from services.gazetteer import load_gazetteer
+from services.rate_limiter import weather_rate_limiter
+from services.weather_api import AsyncWeatherService, WEATHER_BACKGROUND_RESERVED_TOKENS
+from services.weather_cache import weather_cache
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZATION_REPORT = "optimization_report"
+WEATHER_EMAIL_DEADLINE_SECONDS = float(os.getenv("WEATHER_EMAIL_DEADLINE_SECONDS", "10"))
+OUTBOX_RENDER_CONCURRENCY = int(os.getenv("OUTBOX_RENDER_CONCURRENCY", "10"))
+
+
+async def render_optimization_email(weather_service: AsyncWeatherService, values: Mapping,
+                                    deadline: Optional[Deadline] = None) -> Optional[RenderedEmail]:
+    """
+    Render the optimization email with the current weather and tips; None when no weather data is available.
+    Args:
+        values (dict): name, location, square_area, insulation_quality, year_built, energy_source,
+            energy_usage, estimated_cost and optionally locale.
+    """
+    city = values["location"] or "Unknown"
+    weather_data = await weather_service.get_weather(city, deadline)
+    if not weather_data:
+        logger.warning(f"No weather data for {city!r}; optimization email not rendered yet")
+        return None
+
+    return load_email_templates().render(
+        OPTIMIZATION_REPORT,
+        {
+            "name": values["name"],
+            "square_area": values["square_area"],
+            "insulation_quality": values["insulation_quality"],
+            "year_built": values["year_built"],
+            "energy_usage": values["energy_usage"],
+            "estimated_cost": values["estimated_cost"],
+            "temperature": weather_data["main"]["temp"],
+        },
+        get_weather_tips(weather_data, values),
+        locale=values.get("locale"),
+    )
+
+
+RENDERERS = {OPTIMIZATION_REPORT: render_optimization_email}
+
+
+async def render_notifications(weather_service: AsyncWeatherService, notifications: Sequence[Notification],
+                               concurrency: int = OUTBOX_RENDER_CONCURRENCY,
+                               deadline_seconds: float = WEATHER_EMAIL_DEADLINE_SECONDS
+                               ) -> Dict[int, Optional[RenderedEmail]]:
+    """
+    Render templated notifications, at most `concurrency` at a time.
+    Returns:
+        dict: The rendered email per notification id; None when its inputs are unavailable.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(notification: Notification) -> Optional[RenderedEmail]:
+        async with semaphore:
+            renderer = RENDERERS[notification.template]
+            return await renderer(weather_service, notification.template_values or {}, Deadline(deadline_seconds))
+
+    rendered = await asyncio.gather(*(render(notification) for notification in notifications))
+    return {notification.id: email for notification, email in zip(notifications, rendered)}
+
+
+async def _render_with_own_client(notifications: Sequence[Notification]) -> Dict[int, Optional[RenderedEmail]]:
+    # Outbox workers are threads with an event loop per batch, so each batch uses its own client pool
+    weather_service = AsyncWeatherService(
+        api_key=os.getenv("WEATHER_API_KEY"), cache=weather_cache, max_connections=OUTBOX_RENDER_CONCURRENCY,
+        gazetteer=load_gazetteer(), rate_limiter=weather_rate_limiter,
+        rate_limit_budget=WEATHER_EMAIL_DEADLINE_SECONDS, rate_limit_keep=WEATHER_BACKGROUND_RESERVED_TOKENS,
+    )
+    try:
+        return await render_notifications(weather_service, notifications)
+    finally:
+        await weather_service.aclose()
+
+
+def render_outbox_emails(notifications: Sequence[Notification]) -> Dict[int, Optional[RenderedEmail]]:
+    """
+    Renderer of the outbox workers: render a claimed batch's templated notifications.
+    """
+    return asyncio.run(_render_with_own_client(notifications))
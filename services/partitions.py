@@ -0,0 +1,231 @@
+"""
+Monthly range partitions of the append-only tables on PostgreSQL.
+
+Migration 6c3e9a1f4b27 turns `notifications` and
+`weather_based_recommendations` into tables partitioned by month on
+`timestamp` (the rows already stored become one `<table>_legacy`
+partition). This module keeps them usable:
+
+- `ensure_partitions` creates the partitions of the current month and the
+  next PARTITION_MONTHS_AHEAD months ahead of time, so inserts never hit a
+  missing partition; the API runs it daily and at startup.
+- Retention (services/retention.py) detaches and drops the partitions whose
+  whole month is past the retention window instead of deleting their rows.
+
+On SQLite, and on a PostgreSQL database that was not migrated, the tables
+are plain tables: every function here sees no partitions and does nothing.
+
+Run once from the project root:
+    python -m services.partitions
+"""
+import argparse
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("notifications", "weather_based_recommendations")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# DETACH ... CONCURRENTLY (PostgreSQL 14+) does not block queries on the parent table
+PARTITION_DETACH_CONCURRENTLY = os.getenv("PARTITION_DETACH_CONCURRENTLY", "true").lower() in ("1", "true", "yes")
+PARTITION_LOCK_TIMEOUT = os.getenv("PARTITION_LOCK_TIMEOUT", "5s")
+
+_BOUND = re.compile(r"FROM \((?:MINVALUE|'([^']+)')\) TO \((?:MAXVALUE|'([^']+)')\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    """
+    One partition and its range [lower, upper); None stands for MINVALUE / MAXVALUE.
+    """
+    name: str
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+    def covers(self, moment: datetime) -> bool:
+        return (self.lower is None or self.lower <= moment) and (self.upper is None or moment < self.upper)
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def parse_bound(name: str, expression: str) -> Partition:
+    """
+    A partition from `pg_get_expr(relpartbound)`, e.g. "FOR VALUES FROM ('2026-01-01 00:00:00') TO (...)".
+    """
+    match = _BOUND.search(expression)
+    if match is None:
+        raise ValueError(f"Partition {name} has an unsupported bound: {expression}")
+    lower, upper = (datetime.fromisoformat(value) if value else None for value in match.groups())
+    return Partition(name, lower, upper)
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+    ), {"table": table}).scalar())
+
+
+def list_partitions(connection: Connection, table: str) -> List[Partition]:
+    """
+    The partitions of a partitioned table ordered by range; empty for plain tables.
+    """
+    if not is_partitioned(connection, table):
+        return []
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table AND pg_table_is_visible(p.oid)"
+    ), {"table": table}).all()
+    partitions = [parse_bound(name, expression) for name, expression in rows]
+    return sorted(partitions, key=lambda partition: partition.lower or datetime.min)
+
+
+def missing_months(partitions: Sequence[Partition], now: datetime,
+                   months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[datetime]:
+    """
+    The months from the current one to `months_ahead` ahead that no partition covers yet.
+    """
+    current = month_start(now)
+    months = (add_months(current, offset) for offset in range(months_ahead + 1))
+    return [month for month in months if not any(partition.covers(month) for partition in partitions)]
+
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+
+def ensure_partitions(engine: Engine, table: str, now: Optional[datetime] = None,
+                      months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """
+    Create the partitions of the current month and the `months_ahead` next ones that are missing.
+    Returns:
+        List[str]: Names of the partitions created.
+    """
+    now = now or datetime.utcnow()
+    with engine.begin() as connection:
+        partitions = list_partitions(connection, table)
+        if not partitions:
+            return []
+        months = missing_months(partitions, now, months_ahead)
+        for month in months:
+            connection.execute(text(create_partition_sql(table, month)))
+    created = [partition_name(table, month) for month in months]
+    if created:
+        logger.info(f"Created partitions {', '.join(created)}")
+    return created
+
+
+def expired_partitions(engine: Engine, table: str, cutoff: datetime) -> List[Partition]:
+    """
+    Partitions whose whole range lies before `cutoff`.
+    """
+    with engine.connect() as connection:
+        partitions = list_partitions(connection, table)
+    return [partition for partition in partitions if partition.upper is not None and partition.upper <= cutoff]
+
+
+def partition_holds(engine: Engine, partition: Partition, condition: str) -> bool:
+    with engine.connect() as connection:
+        return bool(connection.execute(
+            text(f'SELECT EXISTS (SELECT 1 FROM "{partition.name}" WHERE {condition})')
+        ).scalar())
+
+
+def estimated_rows(engine: Engine, partition: Partition) -> int:
+    """
+    Row count from the planner statistics; counting a month of rows would cost a full scan.
+    """
+    with engine.connect() as connection:
+        estimate = connection.execute(
+            text("SELECT reltuples FROM pg_class WHERE relname = :name"), {"name": partition.name}
+        ).scalar()
+    return max(int(estimate or 0), 0)
+
+
+def detach_partition(engine: Engine, table: str, partition: Partition,
+                     concurrently: bool = PARTITION_DETACH_CONCURRENTLY) -> None:
+    """
+    Detach a partition; the table keeps its rows (to archive) until it is dropped.
+    """
+    statement = f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}"'
+    if concurrently:
+        # Runs in two transactions of its own, so it cannot be inside one
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(f"SET lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+            try:
+                connection.execute(text(statement + " CONCURRENTLY"))
+            finally:  # session setting: do not hand it back to the pool
+                connection.execute(text("RESET lock_timeout"))
+        return
+    with engine.begin() as connection:
+        connection.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+        connection.execute(text(statement))
+
+
+def iter_table_rows(engine: Engine, name: str, chunk_size: int = 5000) -> Iterable[List[Dict]]:
+    """
+    Rows of a (detached) table in chunks, streamed with a server-side cursor.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+            text(f'SELECT * FROM "{name}" ORDER BY id')
+        )
+        for chunk in result.mappings().partitions():
+            yield [dict(row) for row in chunk]
+
+
+def drop_table(engine: Engine, name: str) -> None:
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+
+
+def run_partition_maintenance(tables: Sequence[str] = PARTITIONED_TABLES) -> Dict[str, List[str]]:
+    """
+    Scheduler entry point: create the partitions needed for the coming months.
+    """
+    from config.database import engine
+
+    created = {}
+    for table in tables:
+        try:
+            created[table] = ensure_partitions(engine, table)
+        except Exception:  # e.g. a lock timeout: the next run retries, PARTITION_MONTHS_AHEAD leaves slack
+            logger.exception(f"Could not create the partitions of {table}")
+            created[table] = []
+    return created
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Create the monthly partitions needed for the coming months.")
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    print(run_partition_maintenance())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Client-side rate limiting of outbound provider calls.
+
+Each provider gets a token bucket (sustained rate plus burst) and an optional
+daily quota. Callers reserve a token and sleep until it is due, so a burst
+is spread over time in arrival order instead of being answered with 429s;
+a caller whose wait would exceed `max_wait` is refused immediately. Limiters
+are shared by every client of a provider in the process (request handlers,
+scheduler jobs, sync and async code alike).
+
+Background jobs do not queue: `acquire_spare_async` only takes a token when
+`keep` tokens stay in the bucket afterwards and otherwise sleeps until one
+refills, for as long as the job's own budget allows. User requests arriving
+meanwhile reserve ahead of it, so a job warming hundreds of cities paces
+itself at the provider's rate without spending the burst user traffic needs.
+
+Configured per provider from the environment, e.g. for "WEATHER":
+WEATHER_RATE_LIMIT_PER_SECOND, WEATHER_RATE_LIMIT_BURST,
+WEATHER_RATE_LIMIT_MAX_WAIT_SECONDS and WEATHER_DAILY_QUOTA (0: none).
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket with a bounded wait and a daily quota. Thread-safe; `acquire_async` never blocks the event loop.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            rate_per_second: float,
+            burst: int,
+            max_wait: float = 5.0,
+            daily_quota: int = 0,
+            clock: Callable[[], float] = time.monotonic,
+            today: Callable[[], date] = lambda: datetime.utcnow().date(),
+    ):
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError(f"Rate limiter {name!r} needs a positive rate and a burst of at least 1.")
+        self.name = name
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_wait = max_wait
+        self.daily_quota = daily_quota
+        self._clock = clock
+        self._today = today
+        self._lock = threading.Lock()
+        self._tokens = float(burst)  # negative while callers are queued for future tokens
+        self._updated = clock()
+        self._day = today()
+        self._used_today = 0
+        self._counters = {"granted": 0, "waited": 0, "rejected_wait": 0, "rejected_quota": 0, "backoffs": 0}
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, rate_per_second: float, burst: int, max_wait: float,
+                 daily_quota: int = 0) -> "RateLimiter":
+        return cls(
+            name,
+            float(os.getenv(f"{prefix}_RATE_LIMIT_PER_SECOND", rate_per_second)),
+            int(os.getenv(f"{prefix}_RATE_LIMIT_BURST", burst)),
+            float(os.getenv(f"{prefix}_RATE_LIMIT_MAX_WAIT_SECONDS", max_wait)),
+            int(os.getenv(f"{prefix}_DAILY_QUOTA", daily_quota)),
+        )
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        today = self._today()
+        if today != self._day:
+            self._day, self._used_today = today, 0
+
+    def reserve(self, tokens: int = 1, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve tokens without waiting.
+        Returns:
+            float: Seconds the caller must wait before using them, or None when refused
+            (daily quota spent, or the wait would exceed `max_wait`).
+        """
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        with self._lock:
+            self._refill()
+            if self.daily_quota and self._used_today + tokens > self.daily_quota:
+                self._counters["rejected_quota"] += 1
+                return None
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if wait > max_wait:
+                self._counters["rejected_wait"] += 1
+                return None
+            self._tokens -= tokens
+            self._used_today += tokens
+            self._counters["granted"] += 1
+            if wait > 0:
+                self._counters["waited"] += 1
+            return wait
+
+    def take_spare(self, tokens: int = 1, keep: int = 0) -> Optional[float]:
+        """
+        Take tokens now only if `keep` tokens stay in the bucket for other callers; never queues.
+        Returns:
+            float: 0.0 when taken, otherwise the seconds until enough tokens may have refilled;
+            None when the daily quota is spent.
+        """
+        keep = min(keep, self.burst - tokens)
+        with self._lock:
+            self._refill()
+            if self.daily_quota and self._used_today + tokens > self.daily_quota:
+                self._counters["rejected_quota"] += 1
+                return None
+            missing = tokens + keep - self._tokens
+            if missing > 0:
+                return missing / self.rate
+            self._tokens -= tokens
+            self._used_today += tokens
+            self._counters["granted"] += 1
+            return 0.0
+
+    def release(self, tokens: int = 1) -> None:
+        """
+        Give back a reservation that was not used (e.g. the caller was cancelled while waiting).
+        """
+        with self._lock:
+            self._tokens = min(float(self.burst), self._tokens + tokens)
+            self._used_today = max(0, self._used_today - tokens)
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Blocking acquire for threads: waits at most `timeout` (capped by `max_wait`).
+        """
+        wait = self.reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Non-blocking acquire for coroutines: sleeps on the event loop at most `timeout` (capped by `max_wait`).
+        """
+        wait = self.reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.release(tokens)
+                raise
+        return True
+
+    async def acquire_spare_async(self, budget: float, tokens: int = 1, keep: int = 0) -> bool:
+        """
+        Acquire for background jobs: wait up to `budget` seconds (not capped by `max_wait`) for tokens
+        that leave `keep` in the bucket. Callers of `acquire_async` arriving meanwhile are served first.
+        """
+        deadline = self._clock() + budget
+        waited = False
+        while True:
+            wait = self.take_spare(tokens, keep)
+            if wait is None:
+                return False
+            if wait == 0:
+                if waited:
+                    with self._lock:
+                        self._counters["waited"] += 1
+                return True
+            if self._clock() + wait > deadline:
+                with self._lock:
+                    self._counters["rejected_wait"] += 1
+                return False
+            waited = True
+            await asyncio.sleep(wait)
+
+    def back_off(self, seconds: float) -> None:
+        """
+        The provider answered 429: stop granting tokens for `seconds` (its Retry-After).
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._counters["backoffs"] += 1
+
+    def remaining(self) -> Dict:
+        """
+        Budget left now: tokens in the bucket and calls left in today's quota (None without a quota).
+        """
+        with self._lock:
+            self._refill()
+            return {
+                "tokens": round(max(self._tokens, 0.0), 3),
+                "queued_seconds": round(max(-self._tokens, 0.0) / self.rate, 3),
+                "daily_remaining": self.daily_quota - self._used_today if self.daily_quota else None,
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            used_today = self._used_today
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "max_wait_seconds": self.max_wait,
+            "daily_quota": self.daily_quota or None,
+            "used_today": used_today,
+            **self.remaining(),
+            **counters,
+        }
+
+
+def retry_after_seconds(headers, default: float = 1.0) -> float:
+    """
+    Seconds from a Retry-After header (delta-seconds form), `default` when missing or unparsable.
+    """
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+# One limiter per provider, shared by every client in the process
+weather_rate_limiter = RateLimiter.from_env("openweathermap", "WEATHER", rate_per_second=1, burst=10, max_wait=2)
+email_rate_limiter = RateLimiter.from_env("mailersend", "MAILERSEND", rate_per_second=1, burst=10, max_wait=30)
+rate_limiters: Dict[str, RateLimiter] = {limiter.name: limiter for limiter in (weather_rate_limiter,
+                                                                                email_rate_limiter)}
@@ -0,0 +1,257 @@
+"""
+Retention of notifications and recommendations, deleted in small batches.
+
+Each table has its own retention window (RETENTION_<TABLE>_DAYS). Expired
+rows are walked in primary-key order: every batch selects the next
+`batch_size` expired ids after the last one deleted and removes that id
+range in its own short transaction, so row locks are held for milliseconds
+rather than for the whole run and the outbox workers and API writes to the
+same tables are never blocked for long. A pause between batches
+(RETENTION_THROTTLE_SECONDS) leaves room for that traffic and for
+replication. Notifications still waiting in the outbox (Pending, Sending)
+or on the provider's validation (Queued) are never deleted.
+
+With an archive directory (RETENTION_ARCHIVE_DIR or --archive-dir) every
+batch is appended to `<table>-<run time>.ndjson.gz` before it is deleted.
+A batch whose delete fails is archived again by the next run, so the archive
+may hold duplicates but never misses a deleted row.
+
+Tables partitioned by month on PostgreSQL (services/partitions.py) first
+lose the partitions whose whole month is past the window: they are detached,
+archived and dropped, which costs no row deletes, no table bloat and no
+vacuum. The batched deletes then only trim the rows of the partially
+expired month. Notification partitions still holding outbox rows are kept.
+
+Run once from the project root (the API also runs it weekly):
+    python -m services.retention --archive-dir archive/
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Type
+
+from sqlalchemy import and_, delete, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models.base import Base
+from models.notification import Notification, STATUS_PENDING, STATUS_SENDING
+from models.recomendation import Recommendation
+from models.weather_recommendation import WeatherBasedRecommendation
+from services import partitions
+from services.email_dispatcher import STATUS_QUEUED
+
+logger = logging.getLogger(__name__)
+
+RETENTION_NOTIFICATIONS_DAYS = int(os.getenv("RETENTION_NOTIFICATIONS_DAYS", "30"))
+RETENTION_RECOMMENDATIONS_DAYS = int(os.getenv("RETENTION_RECOMMENDATIONS_DAYS", "30"))
+RETENTION_WEATHER_RECOMMENDATIONS_DAYS = int(os.getenv("RETENTION_WEATHER_RECOMMENDATIONS_DAYS", "30"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_THROTTLE_SECONDS = float(os.getenv("RETENTION_THROTTLE_SECONDS", "0.1"))
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR") or None
+
+OUTBOX_STATUSES = (STATUS_PENDING, STATUS_SENDING, STATUS_QUEUED)  # notifications not sent yet
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Rows of `model` older than `days` (by their `timestamp`) expire; `days <= 0` keeps them forever.
+    """
+    model: Type[Base]
+    days: int
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    def expired(self, cutoff: datetime):
+        condition = self.model.timestamp < cutoff
+        if self.model is Notification:
+            # Outbox rows still to be sent are kept whatever their age
+            condition = and_(condition, Notification.status.notin_(OUTBOX_STATUSES))
+        return condition
+
+
+def default_policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy(Notification, RETENTION_NOTIFICATIONS_DAYS),
+        RetentionPolicy(Recommendation, RETENTION_RECOMMENDATIONS_DAYS),
+        RetentionPolicy(WeatherBasedRecommendation, RETENTION_WEATHER_RECOMMENDATIONS_DAYS),
+    ]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "value"):  # enums
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def archive_rows(path: Path, rows: Sequence[Dict]) -> None:
+    """
+    Append rows as NDJSON to a gzip file; each call adds a gzip member, which readers see as one stream.
+    """
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps(row, default=_json_default, separators=(",", ":")) + "\n")
+
+
+def purge_table(session_factory: Callable[[], Session], policy: RetentionPolicy, now: datetime,
+                batch_size: int = RETENTION_BATCH_SIZE, throttle_seconds: float = RETENTION_THROTTLE_SECONDS,
+                archive_path: Optional[Path] = None, sleep: Callable[[float], None] = time.sleep) -> Dict:
+    """
+    Delete a table's expired rows in id-range batches, one short transaction per batch.
+    Returns:
+        Dict: rows deleted, batches, wall time and rows removed per second.
+    """
+    started = time.perf_counter()
+    table = policy.model.__table__
+    cutoff = now - timedelta(days=policy.days)
+    expired = policy.expired(cutoff)
+    deleted = batches = 0
+    last_id = 0
+    while True:
+        with session_factory() as session:
+            after_last = and_(expired, table.c.id > last_id)
+            if archive_path is not None:
+                rows = [dict(row) for row in session.execute(
+                    select(table).where(after_last).order_by(table.c.id).limit(batch_size)
+                ).mappings()]
+                ids = [row["id"] for row in rows]
+            else:
+                ids = session.execute(
+                    select(table.c.id).where(after_last).order_by(table.c.id).limit(batch_size)
+                ).scalars().all()
+            if not ids:
+                break
+            if archive_path is not None:
+                archive_rows(archive_path, rows)
+                # Only the archived rows, even if more rows in the range expired meanwhile
+                statement = delete(table).where(table.c.id.in_(ids), expired)
+            else:
+                statement = delete(table).where(table.c.id >= ids[0], table.c.id <= ids[-1], expired)
+            deleted += session.execute(statement, execution_options={"synchronize_session": False}).rowcount
+            session.commit()
+        batches += 1
+        last_id = ids[-1]
+        if len(ids) < batch_size:
+            break
+        if throttle_seconds > 0:
+            sleep(throttle_seconds)
+    seconds = time.perf_counter() - started
+    return {
+        "deleted": deleted,
+        "batches": batches,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(deleted / seconds, 1) if seconds > 0 else 0.0,
+        "archive": str(archive_path) if archive_path is not None and deleted else None,
+    }
+
+
+def drop_expired_partitions(engine: Engine, policy: RetentionPolicy, now: datetime,
+                            archive_dir: Optional[str] = None) -> Optional[Dict]:
+    """
+    Detach, archive and drop the partitions whose whole month is past the retention window.
+    Returns:
+        Optional[Dict]: Partitions dropped and their estimated rows, or None for a plain table.
+    """
+    with engine.connect() as connection:
+        if not partitions.is_partitioned(connection, policy.table):
+            return None
+    dropped, rows = [], 0
+    for partition in partitions.expired_partitions(engine, policy.table, now - timedelta(days=policy.days)):
+        if policy.model is Notification and partitions.partition_holds(
+                engine, partition, f"status IN ({', '.join(repr(status) for status in OUTBOX_STATUSES)})"):
+            logger.warning(f"Keeping partition {partition.name}: it still holds notifications to send")
+            continue
+        estimate = partitions.estimated_rows(engine, partition)
+        partitions.detach_partition(engine, policy.table, partition)
+        if archive_dir is not None:
+            archive_path = Path(archive_dir) / f"{partition.name}.ndjson.gz"
+            for chunk in partitions.iter_table_rows(engine, partition.name):
+                archive_rows(archive_path, chunk)
+        partitions.drop_table(engine, partition.name)
+        dropped.append(partition.name)
+        rows += estimate
+    return {"dropped": dropped, "rows_estimate": rows}
+
+
+def purge_expired(session_factory: Callable[[], Session], policies: Optional[Sequence[RetentionPolicy]] = None,
+                  now: Optional[datetime] = None, batch_size: int = RETENTION_BATCH_SIZE,
+                  throttle_seconds: float = RETENTION_THROTTLE_SECONDS, archive_dir: Optional[str] = None,
+                  sleep: Callable[[float], None] = time.sleep) -> Dict:
+    """
+    Apply every retention policy and report the rows removed per table and in total.
+    """
+    now = now or datetime.utcnow()
+    policies = default_policies() if policies is None else policies
+    if archive_dir is not None:
+        Path(archive_dir).mkdir(parents=True, exist_ok=True)
+    with session_factory() as session:
+        engine = session.get_bind()
+    started = time.perf_counter()
+    tables = {}
+    for policy in policies:
+        if policy.days <= 0:
+            continue
+        dropped = drop_expired_partitions(engine, policy, now, archive_dir)
+        archive_path = (Path(archive_dir) / f"{policy.table}-{now:%Y%m%dT%H%M%S}.ndjson.gz"
+                        if archive_dir is not None else None)
+        tables[policy.table] = purge_table(session_factory, policy, now, batch_size, throttle_seconds,
+                                           archive_path, sleep)
+        if dropped is not None:
+            tables[policy.table]["partitions"] = dropped
+        logger.info(
+            f"Retention {policy.table}: {tables[policy.table]['deleted']} rows older than {policy.days} days "
+            f"removed in {tables[policy.table]['batches']} batches "
+            f"({tables[policy.table]['rows_per_second']} rows/s)"
+            + (f", {len(dropped['dropped'])} partitions dropped (~{dropped['rows_estimate']} rows)" if dropped else "")
+        )
+    seconds = time.perf_counter() - started
+    deleted = sum(summary["deleted"] for summary in tables.values())
+    return {
+        "tables": tables,
+        "deleted": deleted,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(deleted / seconds, 1) if seconds > 0 else 0.0,
+    }
+
+
+def run_retention() -> Dict:
+    """
+    Scheduler entry point: delete the rows past their retention window.
+    """
+    from config.database import SessionLocal
+
+    return purge_expired(SessionLocal, archive_dir=RETENTION_ARCHIVE_DIR)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Delete notifications and recommendations past their retention.")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--throttle", type=float, default=RETENTION_THROTTLE_SECONDS,
+                        help="seconds to pause between batches")
+    parser.add_argument("--archive-dir", default=RETENTION_ARCHIVE_DIR,
+                        help="write expired rows to gzip NDJSON files here before deleting them")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    from config.database import SessionLocal  # imported late so `--help` works without a database
+
+    print(purge_expired(SessionLocal, batch_size=args.batch_size, throttle_seconds=args.throttle,
+                        archive_dir=args.archive_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same task and receive its result or its exception.
+    The work runs as its own task, so a cancelled caller does not cancel the
+    upstream call for everybody else. Only in-flight keys are held; the
+    counters are totals, so memory does not grow with the number of keys seen.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._calls = 0
+        self._deduplicated = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn()` once per key at a time and share its outcome with concurrent callers.
+        """
+        self._calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self._deduplicated += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, k=key: self._forget(k, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; callers already received it
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Call and deduplication totals across keys.
+        """
+        return {"in_flight": len(self._inflight), "calls": self._calls, "deduplicated": self._deduplicated}
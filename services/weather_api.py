@@ -1,23 +1,209 @@
-import requests
-from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import httpx
+from typing import Dict, Optional, Tuple
 
-class WeatherService:
-    def __init__(self, api_key: str):
+from services.circuit_breaker import CircuitBreaker
+from services.deadline import Deadline, remaining_seconds
+from services.gazetteer import City, Gazetteer
+from services.rate_limiter import RateLimiter, retry_after_seconds
+from services.single_flight import SingleFlight
+from services.weather_cache import WeatherCache, normalize_city
+
+logger = logging.getLogger(__name__)
+
+OPENWEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+WEATHER_CONNECT_TIMEOUT_SECONDS = float(os.getenv("WEATHER_CONNECT_TIMEOUT_SECONDS", "2"))
+WEATHER_READ_TIMEOUT_SECONDS = float(os.getenv("WEATHER_READ_TIMEOUT_SECONDS", "5"))
+WEATHER_MAX_CONNECTIONS = int(os.getenv("WEATHER_MAX_CONNECTIONS", "200"))
+WEATHER_BREAKER_FAILURE_THRESHOLD = int(os.getenv("WEATHER_BREAKER_FAILURE_THRESHOLD", "5"))
+WEATHER_BREAKER_RESET_SECONDS = float(os.getenv("WEATHER_BREAKER_RESET_SECONDS", "30"))
+WEATHER_LAST_KNOWN_GOOD_MAX_ENTRIES = int(os.getenv("WEATHER_LAST_KNOWN_GOOD_MAX_ENTRIES", "10000"))
+# Scheduler jobs (prefetch, digest): how long one lookup may wait for a token, and the tokens left to user requests
+WEATHER_BACKGROUND_WAIT_SECONDS = float(os.getenv("WEATHER_BACKGROUND_WAIT_SECONDS", "120"))
+WEATHER_BACKGROUND_RESERVED_TOKENS = int(os.getenv("WEATHER_BACKGROUND_RESERVED_TOKENS", "5"))
+
+
+class AsyncWeatherService:
+    """
+    Non-blocking weather client for use inside `async def` handlers.
+
+    One `httpx.AsyncClient` (and therefore one keep-alive connection pool) is
+    created lazily and reused until `aclose()` is called on app shutdown.
+    Concurrent lookups of the same city share a single upstream request.
+    With a gazetteer, free-text names are resolved to a canonical city first:
+    cache entries are keyed on its id and the API is queried by coordinates.
+    Locations the gazetteer does not know are queried by name, keyed on the
+    normalized name, and left to the provider's own geocoding.
+
+    Upstream calls go through a circuit breaker and, when one is given, the
+    provider's rate limiter. With `rate_limit_budget` (scheduler jobs) a lookup
+    waits up to that long for a spare token, leaving `rate_limit_keep` tokens
+    to user requests, instead of queuing for at most the limiter's max_wait.
+    When the provider fails, is open-circuited, rate-limited or misses the
+    caller's deadline, the last-known-good observation for the city is
+    returned with `"stale": True`.
+    """
+
+    def __init__(
+            self,
+            api_key: str,
+            cache: Optional[WeatherCache] = None,
+            connect_timeout: float = WEATHER_CONNECT_TIMEOUT_SECONDS,
+            read_timeout: float = WEATHER_READ_TIMEOUT_SECONDS,
+            max_connections: int = WEATHER_MAX_CONNECTIONS,
+            client: Optional[httpx.AsyncClient] = None,
+            gazetteer: Optional[Gazetteer] = None,
+            breaker: Optional[CircuitBreaker] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            rate_limit_budget: Optional[float] = None,
+            rate_limit_keep: int = 0,
+    ):
         self.api_key = api_key
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client = client
+        self._refresh_tasks = set()
+        self.single_flight = SingleFlight()
+        self.breaker = breaker or CircuitBreaker(WEATHER_BREAKER_FAILURE_THRESHOLD, WEATHER_BREAKER_RESET_SECONDS)
+        self.rate_limiter = rate_limiter
+        self.rate_limit_budget = rate_limit_budget
+        self.rate_limit_keep = rate_limit_keep
+        self.last_known_good = WeatherCache(ttl_seconds=float("inf"), max_entries=WEATHER_LAST_KNOWN_GOOD_MAX_ENTRIES)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled HTTP client.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def resolve_city(self, city: str) -> Optional[City]:
+        """
+        Canonical city for a free-text name, or None when the gazetteer does not know it.
+        """
+        return self.gazetteer.resolve(city) if self.gazetteer else None
+
+    def _target(self, city: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Cache key and upstream query parameters for a city name; None for a blank one.
+        """
+        place = self.gazetteer.resolve(city) if self.gazetteer else None
+        if place is not None:
+            return place.id, {"lat": place.lat, "lon": place.lon}
+        key = normalize_city(city or "")
+        return (key, {"q": city.strip()}) if key else None
+
+    async def get_weather(self, city: str, deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Return weather data for a city, served from the cache when one is configured.
+
+        Expired entries are returned immediately while a single background
+        task fetches a fresh observation. Upstream lookups are bounded by
+        `deadline`; past it the last-known-good observation is returned.
+        """
+        target = self._target(city)
+        if target is None:
+            logger.info(f"Blank city rejected without lookup: {city!r}")
+            return None
+        key, params = target
+
+        if self.cache is not None:
+            data, state = self.cache.get(key)
+            if state == WeatherCache.HIT:
+                return data
+            if state == WeatherCache.STALE:
+                if self.cache.begin_refresh(key):
+                    task = asyncio.create_task(self._refresh(key, params))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return data
+
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return self._stale_fallback(key)
+        try:
+            # shield: a caller giving up must not cancel the lookup shared with other callers
+            data = await asyncio.wait_for(
+                asyncio.shield(self.single_flight.do(key, lambda: self._fetch_and_store(key, params))),
+                timeout=remaining_seconds(deadline),
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Weather lookup for {city!r} exceeded its deadline")
+            return self._stale_fallback(key)
+        return data if data is not None else self._stale_fallback(key)
+
+    def _stale_fallback(self, key: str) -> Optional[Dict]:
+        """
+        Last-known-good observation for a city, flagged as stale.
+        """
+        data = self.last_known_good.peek(key)
+        return {**data, "stale": True} if data is not None else None
 
-    def get_weather(self, city: str) -> Optional[Dict]:
+    async def refresh(self, city: str) -> Optional[Dict]:
+        """
+        Fetch a fresh observation regardless of the cached state (used to warm the cache).
+        """
+        target = self._target(city)
+        if target is None:
+            return None
+        key, params = target
+        return await self.single_flight.do(key, lambda: self._fetch_and_store(key, params))
+
+    async def _fetch_and_store(self, key: str, params: Dict) -> Optional[Dict]:
+        data = await self._fetch_weather(params)
+        if data is not None:
+            self.last_known_good.set(key, data)
+            if self.cache is not None:
+                self.cache.set(key, data)
+        return data
+
+    async def _refresh(self, key: str, params: Dict) -> None:
+        data = await self.single_flight.do(key, lambda: self._fetch_and_store(key, params))
+        if data is None:
+            self.cache.end_refresh(key)
+
+    async def _acquire_token(self) -> bool:
+        if self.rate_limit_budget is None:
+            return await self.rate_limiter.acquire_async()
+        return await self.rate_limiter.acquire_spare_async(self.rate_limit_budget, keep=self.rate_limit_keep)
+
+    async def _fetch_weather(self, params: Dict) -> Optional[Dict]:
         """
         Fetch weather data from the API and return the current temperature in Celsius.
         """
+        # Limiter first: a refused call must not take the breaker's half-open probe slot
+        if self.rate_limiter is not None and not await self._acquire_token():
+            logger.warning("Weather lookup refused by the rate limiter")
+            return None
+        if not self.breaker.allow_request():
+            return None
         try:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.api_key}&units=metric"  # units=metric for Celsius
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return data
-            else:
-                print(f"Error: Unable to fetch weather data. Status code {response.status_code}")
-                return None
+            response = await self.client.get(
+                OPENWEATHER_URL,
+                params={**params, "appid": self.api_key, "units": "metric"},  # units=metric for Celsius
+            )
         except Exception as e:
-            print(f"Error fetching weather data: {str(e)}")
+            self.breaker.record_failure()
+            logger.error(f"Error fetching weather data: {str(e)}")
             return None
+        if response.status_code == 200:
+            self.breaker.record_success()
+            return response.json()
+        if response.status_code == 429 and self.rate_limiter is not None:
+            self.rate_limiter.back_off(retry_after_seconds(response.headers))
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()  # the provider answered; the query itself was bad
+        logger.warning(f"Unable to fetch weather data. Status code {response.status_code}")
+        return None
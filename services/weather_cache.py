@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+
+
+def normalize_city(city: str) -> str:
+    """
+    Normalize a free-text city name into a cache key ("  Berlin " -> "berlin").
+    """
+    return " ".join(city.split()).casefold()
+
+
+class WeatherCache:
+    """
+    Bounded in-process cache for weather observations.
+
+    Entries are kept in LRU order and evicted once `max_entries` is exceeded.
+    Entries older than `ttl_seconds` are not dropped: they are served as stale
+    while a single caller refreshes them (stale-while-revalidate).
+    The cache is thread-safe, so it can be shared by request handlers and
+    scheduler jobs.
+    """
+
+    HIT = "hit"
+    STALE = "stale"
+    MISS = "miss"
+
+    def __init__(
+            self,
+            ttl_seconds: float = WEATHER_CACHE_TTL_SECONDS,
+            max_entries: int = WEATHER_CACHE_MAX_ENTRIES,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """
+        Look up a key.
+        Returns:
+            tuple: (value, state) where state is HIT, STALE or MISS.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, self.MISS
+            self._entries.move_to_end(key)
+            value, stored_at = entry
+            if self._clock() - stored_at < self.ttl_seconds:
+                self.hits += 1
+                return value, self.HIT
+            self.stale_hits += 1
+            return value, self.STALE
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the stored value regardless of its age, without touching counters or LRU order.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a fresh value and evict the least recently used entries beyond `max_entries`.
+        """
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            self._refreshing.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """
+        Claim the background refresh of a stale key.
+        Returns:
+            bool: True for exactly one caller until `set` or `end_refresh` is called for the key.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        """
+        Release a refresh claim without storing a value (e.g. the refresh failed).
+        """
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the cache counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshing": len(self._refreshing),
+            }
+
+
+# Process-wide cache shared by every AsyncWeatherService instance of the app
+weather_cache = WeatherCache()
@@ -0,0 +1,111 @@
+"""
+Periodic job that warms the weather cache for every property location,
+so user-facing requests and email runs rarely wait on the upstream API.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models.real_estates import RealEstate
+from services.gazetteer import Gazetteer, load_gazetteer
+from services.rate_limiter import weather_rate_limiter
+from services.weather_api import (
+    AsyncWeatherService, WEATHER_BACKGROUND_RESERVED_TOKENS, WEATHER_BACKGROUND_WAIT_SECONDS,
+)
+from services.weather_cache import normalize_city, weather_cache
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PREFETCH_INTERVAL_MINUTES = int(os.getenv("WEATHER_PREFETCH_INTERVAL_MINUTES", "8"))
+WEATHER_PREFETCH_CONCURRENCY = int(os.getenv("WEATHER_PREFETCH_CONCURRENCY", "20"))
+WEATHER_PREFETCH_MAX_CITIES = int(os.getenv("WEATHER_PREFETCH_MAX_CITIES", "1000"))
+
+
+def load_property_locations(
+        db: Session,
+        limit: int = WEATHER_PREFETCH_MAX_CITIES,
+        gazetteer: Optional[Gazetteer] = None,
+) -> List[str]:
+    """
+    Distinct property locations, de-duplicated again on the canonical city
+    (or on the normalized name for locations the gazetteer does not know).
+    Args:
+        db (Session): Active SQLAlchemy database session.
+        limit (int): Maximum number of cities returned (the per-run budget).
+        gazetteer (Gazetteer): Optional index used to canonicalize the locations.
+    """
+    rows = db.query(RealEstate.location).distinct().order_by(RealEstate.location)
+    cities: Dict[str, str] = {}
+    for (location,) in rows.yield_per(1000):
+        if not location or not location.strip():
+            continue
+        place = gazetteer.resolve(location) if gazetteer else None
+        key = place.id if place else normalize_city(location)
+        cities.setdefault(key, location)
+        if len(cities) >= limit:
+            break
+    return list(cities.values())
+
+
+async def prefetch_weather(
+        weather_service: AsyncWeatherService,
+        cities: Iterable[str],
+        concurrency: int = WEATHER_PREFETCH_CONCURRENCY,
+) -> Dict:
+    """
+    Refresh the cached weather of every city with at most `concurrency` requests in flight.
+    Returns:
+        dict: Run summary with the number of cities fetched, failures and wall time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    cities = list(cities)
+    started = time.perf_counter()
+
+    async def fetch(city: str) -> bool:
+        async with semaphore:
+            return await weather_service.refresh(city) is not None
+
+    results = await asyncio.gather(*(fetch(city) for city in cities))
+    fetched = sum(results)
+    return {
+        "cities": len(cities),
+        "fetched": fetched,
+        "failures": len(cities) - fetched,
+        "wall_time_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def _prefetch_with_own_client(cities: List[str], concurrency: int) -> Dict:
+    # The app's client is bound to the server's event loop, so the job uses its own pool
+    weather_service = AsyncWeatherService(
+        api_key=os.getenv("WEATHER_API_KEY"), cache=weather_cache, max_connections=concurrency,
+        gazetteer=load_gazetteer(), rate_limiter=weather_rate_limiter,
+        rate_limit_budget=WEATHER_BACKGROUND_WAIT_SECONDS, rate_limit_keep=WEATHER_BACKGROUND_RESERVED_TOKENS,
+    )
+    try:
+        return await prefetch_weather(weather_service, cities, concurrency)
+    finally:
+        await weather_service.aclose()
+
+
+def run_weather_prefetch(
+        concurrency: int = WEATHER_PREFETCH_CONCURRENCY,
+        max_cities: int = WEATHER_PREFETCH_MAX_CITIES,
+) -> Dict:
+    """
+    Scheduler entry point: warm the shared weather cache for all property locations.
+    """
+    from config.database import SessionLocal
+
+    with SessionLocal() as session:
+        cities = load_property_locations(session, max_cities, load_gazetteer())
+    summary = asyncio.run(_prefetch_with_own_client(cities, concurrency))
+    logger.info(
+        f"Weather prefetch: {summary['fetched']}/{summary['cities']} cities fetched, "
+        f"{summary['failures']} failures in {summary['wall_time_seconds']}s"
+    )
+    return summary
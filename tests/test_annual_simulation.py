@@ -0,0 +1,68 @@
+import pytest
+from models.annual_simulation import load_climate, monthly_rollup, project_annual, simulate_portfolio, \
+    simulate_profiles, synthetic_temperatures
+from models.energy_batch_engine import encode_insulation
+from models.tariff import Tariff
+from models.tariff_engine import HOURS_PER_YEAR, CompiledTariff, TariffSnapshot
+from services.gazetteer import City
+
+BERLIN = City("de-berlin", "Berlin", "DE", 52.52, 13.405)
+SYDNEY = City("au-sydney", "Sydney", "AU", -33.8688, 151.2093)
+
+
+def test_climate_is_seasonal_and_cached():
+    """
+    Test that the synthetic climate has the right seasons per hemisphere and is shared per city.
+    """
+    berlin = load_climate(BERLIN)
+    assert berlin is load_climate(BERLIN)
+    assert berlin.temperature.shape == (HOURS_PER_YEAR,)
+    assert berlin.temperature[:744].mean() < berlin.temperature[4344:5088].mean()  # January colder than July
+    sydney = synthetic_temperatures(SYDNEY.lat)
+    assert sydney[:744].mean() > sydney[4344:5088].mean()
+    assert not berlin.heating_degree_hours.flags.writeable
+
+
+def test_profile_scales_with_property_attributes():
+    """
+    Test that larger, older and poorly insulated properties use more energy, mostly in winter.
+    """
+    climate = load_climate(BERLIN)
+    profiles = simulate_profiles([100, 200, 100, 100], encode_insulation(["good", "good", "poor", "good"]),
+                                 [2000, 2000, 2000, 1900], climate)
+    assert profiles.shape == (4, HOURS_PER_YEAR)
+    annual = profiles.sum(axis=1)
+    assert annual[1] == pytest.approx(2 * annual[0])
+    assert annual[2] > annual[0] and annual[3] > annual[0]
+    monthly = monthly_rollup(profiles)
+    assert monthly.shape == (4, 12)
+    assert monthly.sum(axis=1) == pytest.approx(annual)
+    assert monthly[0, 0] > monthly[0, 6]
+
+
+def test_portfolio_totals_match_hourly_profiles():
+    """
+    Test that the profile-free portfolio totals equal the sums of the simulated profiles.
+    """
+    climate = load_climate(SYDNEY)
+    profiles = simulate_profiles([80, 150], encode_insulation(["average", "poor"]), [1980, 2015], climate)
+    totals = simulate_portfolio([80, 150], ["average", "poor"], [1980, 2015], [SYDNEY, SYDNEY])
+    assert totals == pytest.approx(profiles.sum(axis=1))
+
+
+def test_projection_costs_with_country_tariff():
+    """
+    Test that the projection bills the hourly profile with the property's country tariff.
+    """
+    flat = TariffSnapshot([])
+    peak = CompiledTariff.from_row(Tariff(region="DE", energy_source="electricity", version=3, kind="time_of_use",
+                                          hourly_rates=[0.20] * 12 + [0.40] * 12))
+    projection = project_annual(120, "average", 1990, None, BERLIN, flat)
+    assert projection["tariff version"] == "builtin-2024"
+    assert len(projection["months"]) == 12
+    assert projection["annual cost (€)"] == pytest.approx(projection["annual energy usage (kWh)"] * 0.28, rel=1e-6)
+
+    projection = project_annual(120, "average", 1990, "electricity", BERLIN, TariffSnapshot([peak]), True)
+    assert projection["tariff version"] == "electricity:v3"
+    assert 0.20 * projection["annual energy usage (kWh)"] < projection["annual cost (€)"]
+    assert len(projection["hourly energy usage (kWh)"]) == HOURS_PER_YEAR
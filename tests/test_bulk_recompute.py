@@ -0,0 +1,71 @@
+import json
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from models import Base, PropertyEstimate, RealEstate, User
+from models.energy_batch_engine import encode_energy_source, encode_insulation, estimate_energy_batch
+from services.bulk_recompute import bulk_recompute
+
+
+@pytest.fixture
+def session_factory():
+    """
+    Fixture providing a session factory on an in-memory SQLite database with 50 bulk-inserted properties.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(User(id=1, name="Owner", email="owner@example.com", hash_password="x",
+                         phone_number="+12345678901"))
+        session.execute(insert(RealEstate), [
+            dict(id=index, square_area=50 + index, real_estate_type="Apartment", year_built=1950 + index,
+                 insulation_quality=("poor", "average", "good")[index % 3],
+                 energy_source=("electricity", "natural_gas", "solar", None)[index % 4], location="Berlin", user_id=1)
+            for index in range(1, 51)
+        ])
+        session.commit()
+    return factory
+
+
+def assert_all_computed(session_factory):
+    with session_factory() as session:
+        estimates = session.query(PropertyEstimate).order_by(PropertyEstimate.real_estate_id).all()
+        assert len(estimates) == 50 and not any(estimate.is_dirty for estimate in estimates)
+        for estimate in estimates:
+            real_estate = estimate.real_estate
+            usage, cost = estimate_energy_batch(
+                [real_estate.square_area], encode_insulation([real_estate.insulation_quality]),
+                [real_estate.year_built], encode_energy_source([real_estate.energy_source]))
+            assert (estimate.energy_usage, estimate.estimated_cost) == (float(usage[0]), float(cost[0]))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_recomputes_every_property(session_factory, tmp_path, workers):
+    """
+    Test that every property gets a clean estimate, inline and with a process pool.
+    """
+    checkpoint = tmp_path / "checkpoint.json"
+    summary = bulk_recompute(session_factory, chunk_size=7, workers=workers, checkpoint_path=str(checkpoint))
+    assert summary["rows"] == 50
+    assert not checkpoint.exists()  # removed once the run completes
+    assert_all_computed(session_factory)
+
+
+def test_resumes_after_checkpoint(session_factory, tmp_path):
+    """
+    Test that an interrupted run continues after the checkpointed id.
+    """
+    checkpoint = tmp_path / "checkpoint.json"
+    bulk_recompute(session_factory, chunk_size=10, workers=0, checkpoint_path=None)
+    with session_factory() as session:
+        session.query(PropertyEstimate).update({"is_dirty": True, "energy_usage": None})
+        session.commit()
+
+    checkpoint.write_text(json.dumps({"last_id": 30, "rows": 30}))
+    summary = bulk_recompute(session_factory, chunk_size=10, workers=0, checkpoint_path=str(checkpoint))
+    assert (summary["rows"], summary["resumed_after_id"]) == (20, 30)
+    with session_factory() as session:
+        pending = session.query(PropertyEstimate).filter(PropertyEstimate.energy_usage.is_(None)).count()
+    assert pending == 30
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from config.db_session import async_database_url, run_db
+from models import Base, RealEstate, User
+from models.real_estates import register_property
+from schemas.create_real_estate_request import CreateRealEstateRequest
+
+REQUEST = CreateRealEstateRequest(square_area=90, real_estate_type="Apartment", year_built=1995,
+                                  insulation_quality="average", energy_source="electricity", location="Berlin")
+
+
+def add_owner(db: Session) -> None:
+    db.add(User(id=1, name="Owner", email="owner@example.com", hash_password="x", phone_number="+12345678901"))
+    db.commit()
+
+
+def count_properties(db: Session) -> int:
+    return len(db.execute(select(RealEstate.id)).all())
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("postgresql://user:secret@db:5432/energy", "postgresql+asyncpg://user:secret@db:5432/energy"),
+    ("postgresql+psycopg2://user@db/energy", "postgresql+asyncpg://user@db/energy"),
+    ("postgres://user@db/energy?sslmode=require", "postgresql+asyncpg://user@db/energy?ssl=require"),
+    ("sqlite:///energy.db", "sqlite+aiosqlite:///energy.db"),
+])
+def test_async_database_url(url, expected):
+    """
+    Test that database URLs are mapped to their async drivers.
+    """
+    assert async_database_url(url) == expected
+
+
+def test_async_database_url_rejects_unknown_backends():
+    """
+    Test that a backend without an async driver is refused.
+    """
+    with pytest.raises(ValueError):
+        async_database_url("mssql+pyodbc://user@db/energy")
+
+
+def test_run_db_on_a_sync_session():
+    """
+    Test that the sync path runs the function with the session itself, off the event loop.
+    """
+    # One shared in-memory connection, as in the app's test pool profile: the threadpool runs the queries
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        add_owner(db)
+        real_estate = asyncio.run(register_property(REQUEST, db, 1))
+        assert real_estate.id == 1
+        assert asyncio.run(run_db(db, count_properties)) == 1
+        main_thread = threading.get_ident()
+        assert asyncio.run(run_db(db, lambda session: threading.get_ident())) != main_thread
+
+
+def test_run_db_and_helpers_on_an_async_session(tmp_path):
+    """
+    Test that the same helpers run on an AsyncSession and leave objects readable after commit.
+    """
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            await run_db(db, add_owner)
+            real_estate = await register_property(REQUEST, db, 1)
+            assert (real_estate.id, real_estate.location) == (1, "Berlin")
+            assert await run_db(db, count_properties) == 1
+        await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Notification, RealEstate, User
+from models.user import NotificationFrequency
+from services.digest import run_digest_pipeline
+from services.gazetteer import load_gazetteer
+from services.weather_api import AsyncWeatherService
+
+NOW = datetime(2026, 1, 15, 8, 0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Fixture with a session factory over a file database, so several sessions see the same rows.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'digest.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(session_factory):
+    """
+    Fixture with users of every frequency owning properties in Berlin (two spellings), Hamburg and a place the
+    gazetteer does not list.
+    """
+    session = session_factory()
+    frequencies = [NotificationFrequency.DAILY, NotificationFrequency.WEEKLY, NotificationFrequency.MONTHLY]
+    for user_id in range(1, 8):
+        session.add(User(id=user_id, name=f"User <{user_id}>", email=f"user{user_id}@example.com", hash_password="x",
+                         phone_number=f"+1234567890{user_id}", notification_frequency=frequencies[user_id % 3]))
+        for location in (["Berlin", "berlin, DE"] if user_id % 2 else ["Hamburg", "Nowhereville"]):
+            session.add(RealEstate(square_area=100, real_estate_type="House", year_built=1990,
+                                   insulation_quality="poor", energy_source="gas", location=location,
+                                   user_id=user_id))
+    session.add(User(id=8, name="No property", email="user8@example.com", hash_password="x", phone_number="+1"))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def weather_service():
+    """
+    Fixture with a weather client answering from a mock transport and counting upstream requests.
+    """
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"main": {"temp": -3.0, "humidity": 80}, "wind": {"speed": 3.0}})
+
+    service = AsyncWeatherService("key", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                                  gazetteer=load_gazetteer())
+    service.requests = requests
+    return service
+
+
+def test_digest_fetches_weather_once_per_city_and_enqueues_due_users(db_session, weather_service):
+    """
+    Test that every due user gets one digest, each city is fetched once and chunks stamp their users.
+    """
+    summary = asyncio.run(run_digest_pipeline(db_session, weather_service, now=NOW, page_size=3, chunk_size=2))
+
+    assert summary["pages"] == 3 and summary["users"] == 7 and summary["emails"] == 7
+    assert summary["cities"] == 3 and len(weather_service.requests) == 3  # Nowhereville is queried by name
+    assert set(summary["stage_seconds"]) == {"users", "properties", "weather", "estimate", "tips", "render", "enqueue"}
+
+    notifications = db_session.query(Notification).order_by(Notification.user_id).all()
+    assert [notification.user_id for notification in notifications] == list(range(1, 8))
+    assert all(notification.status == "Pending" for notification in notifications)
+    first = notifications[0]
+    assert first.subject == "Your weekly energy digest"
+    assert "User &lt;1&gt;" in first.html_content and first.html_content.count("<tr><td>") == 2
+    assert "<li>" in first.html_content and "- Berlin:" in first.text_content
+    assert all(user.last_digest_sent_at == NOW for user in db_session.query(User).filter(User.id < 8))
+
+
+def test_digest_respects_each_users_frequency(db_session, weather_service):
+    """
+    Test that a second run only picks up the users whose period has elapsed.
+    """
+    asyncio.run(run_digest_pipeline(db_session, weather_service, now=NOW))
+    assert asyncio.run(run_digest_pipeline(db_session, weather_service, now=NOW + timedelta(hours=2)))["users"] == 0
+
+    summary = asyncio.run(run_digest_pipeline(db_session, weather_service, now=NOW + timedelta(days=1)))
+    assert summary["users"] == 2  # users 3 and 6 are daily
+    summary = asyncio.run(run_digest_pipeline(db_session, weather_service, now=NOW + timedelta(days=7)))
+    assert summary["users"] == 2 + 3  # daily and weekly users, not the monthly ones
+
+
+def test_concurrent_digest_runs_enqueue_each_user_once(db_session, session_factory, weather_service):
+    """
+    Test that two runs selecting the same due users (one scheduler per API worker) enqueue each digest once.
+    """
+    async def both():
+        with session_factory() as first, session_factory() as second:
+            return await asyncio.gather(run_digest_pipeline(first, weather_service, now=NOW, chunk_size=2),
+                                        run_digest_pipeline(second, weather_service, now=NOW, chunk_size=2))
+
+    summaries = asyncio.run(both())
+
+    assert [summary["users"] for summary in summaries] == [7, 7]  # both selected every due user
+    assert sum(summary["emails"] for summary in summaries) == 7
+    assert sum(summary["claimed_elsewhere"] for summary in summaries) == 7
+    user_ids = [notification.user_id for notification in db_session.query(Notification)]
+    assert sorted(user_ids) == list(range(1, 8))
@@ -0,0 +1,48 @@
+import pytest
+from benchmarks.mailersend_standin import MailerSendStandIn
+from services.email_dispatcher import BulkEmailDispatcher, EmailMessage
+
+SENDER = {"name": "Efficient Energy Advisory", "email": "advisor@example.com"}
+
+
+@pytest.fixture
+def provider():
+    """
+    Fixture running the local MailerSend stand-in.
+    """
+    server = MailerSendStandIn(max_batch=5).start()
+    yield server
+    server.stop()
+
+
+def make_message(index, email=None):
+    return EmailMessage(SENDER, {"name": f"User {index}", "email": email or f"user{index}@example.com"},
+                        "Subject", "<p>Hi</p>", "Hi", notification_id=index)
+
+
+def test_batches_messages_and_maps_validation_errors(provider):
+    """
+    Test that 12 messages take 3 batch requests and per-message errors reach the right message.
+    """
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01)
+    messages = [make_message(index, "invalid-address" if index in (3, 7) else None) for index in range(12)]
+    results = dispatcher.send(messages)
+    dispatcher.close()
+
+    assert provider.posts == 3
+    assert [result.notification_id for result in results] == list(range(12))
+    assert [index for index, result in enumerate(results) if result.status == "Failed"] == [3, 7]
+    assert "valid email" in results[7].error
+    assert dispatcher.stats()["sent"] == 10
+
+
+def test_rejected_batch_fails_its_messages_only(provider):
+    """
+    Test that a batch rejected by the provider fails its own messages and the next batch still goes out.
+    """
+    provider.fail_next = 1
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01)
+    results = dispatcher.send([make_message(index) for index in range(8)])
+    dispatcher.close()
+    assert [result.status for result in results] == ["Failed"] * 5 + ["Sent"] * 3
+    assert results[0].error.startswith("HTTP 503")
@@ -0,0 +1,43 @@
+import pytest
+from services.email_templates import CompiledTemplate, EmailTemplates, html_tip_list
+
+VALUES = {"name": "Ada <Admin>", "square_area": 120, "insulation_quality": "good", "year_built": 1990,
+          "energy_usage": 480.12345, "estimated_cost": 4.48, "temperature": 21.5}
+TIPS = ("Open windows at night.", "Use LED bulbs & timers.")
+
+
+def test_compiled_template_formats_and_escapes():
+    """
+    Test that fields are formatted, HTML-escaped unless marked safe, and literals are kept.
+    """
+    template = CompiledTemplate("<p>{{ name }}: {{ value:.2f }} {{ raw|safe }}</p>", escape=True)
+    assert template.fields == ("name", "value", "raw")
+    assert template.render({"name": "<b>", "value": 1.005, "raw": "<i>x</i>"}) == "<p>&lt;b&gt;: 1.00 <i>x</i></p>"
+    assert CompiledTemplate("{{ name }}").render({"name": "<b>"}) == "<b>"
+
+
+def test_renders_report_per_locale():
+    """
+    Test that the report renders in English and German and falls back to the default locale.
+    """
+    templates = EmailTemplates()
+    assert {"de", "en"} <= set(templates.locales)
+
+    english = templates.render("optimization_report", VALUES, TIPS)
+    assert english.subject == "Your Personalized Energy Optimization Update"
+    assert "<h1>Hello Ada &lt;Admin&gt;,</h1>" in english.html
+    assert "480.123 kWh" in english.html and "4.480 €" in english.text
+    assert "<li>Use LED bulbs &amp; timers.</li>" in english.html
+    assert "- Open windows at night." in english.text
+
+    assert templates.render("optimization_report", VALUES, TIPS, locale="de-AT").subject.startswith("Ihr ")
+    assert templates.render("optimization_report", VALUES, TIPS, locale="fr").subject == english.subject
+    with pytest.raises(ValueError):
+        templates.render("missing", VALUES)
+
+
+def test_tip_fragment_is_cached_per_tuple():
+    """
+    Test that the tip list of a tip tuple is rendered once and reused.
+    """
+    assert html_tip_list(TIPS) is html_tip_list(TIPS)
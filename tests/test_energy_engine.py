@@ -0,0 +1,70 @@
+import asyncio
+import numpy as np
+import pytest
+from models.energy_batch_engine import (
+    encode_energy_source,
+    encode_insulation,
+    estimate_energy_batch,
+)
+from models.energy_cost_estimation_engine import calculate_energy_cost, calculate_energy_usage
+
+
+def reference_usage(square_area, insulation_quality, year_built):
+    # The original scalar formula, kept here to pin the batch engine to it
+    insulation_factor = {"poor": 1.2, "average": 1.0, "good": 0.8}.get(insulation_quality.lower(), 1.0)
+    age_factor = 1 + (2024 - year_built) / 100
+    return square_area * 4 * insulation_factor * age_factor
+
+
+def reference_cost(energy_consumption, energy_source):
+    rate = {"electricity": 0.28, "natural_gas": 0.09, "solar": 0.02}.get(energy_source.lower(), 0.28)
+    return energy_consumption * rate / 30
+
+
+@pytest.fixture
+def portfolio():
+    rng = np.random.default_rng(7)
+    size = 2000
+    return {
+        "square_area": rng.integers(20, 600, size),
+        "insulation": rng.choice(["poor", "Average", "GOOD", "unknown"], size),
+        "year_built": rng.integers(1850, 2024, size),
+        "source": rng.choice(["electricity", "Natural_Gas", "solar", "wood"], size),
+    }
+
+
+def test_encoders_default_unknown_values():
+    """
+    Test that unknown and missing categories fall back like the scalar engine did.
+    """
+    assert encode_insulation(["poor", "AVERAGE", "good", "bad", None]).tolist() == [0, 1, 2, 1, 1]
+    assert encode_energy_source(["electricity", "natural_gas", "Solar", "wood", None]).tolist() == [0, 1, 2, 0, 0]
+
+
+def test_batch_matches_original_scalar_formulas(portfolio):
+    """
+    Test that the vectorized pass reproduces the original per-property results bit for bit.
+    """
+    usage, cost = estimate_energy_batch(
+        portfolio["square_area"],
+        encode_insulation(portfolio["insulation"]),
+        portfolio["year_built"],
+        encode_energy_source(portfolio["source"]),
+    )
+    for index in range(len(usage)):
+        expected_usage = reference_usage(
+            int(portfolio["square_area"][index]), portfolio["insulation"][index], int(portfolio["year_built"][index])
+        )
+        assert usage[index] == expected_usage
+        assert cost[index] == reference_cost(expected_usage, portfolio["source"][index])
+
+
+def test_scalar_wrappers_match_batch():
+    """
+    Test the async scalar wrappers used by the single-property endpoint.
+    """
+    usage = asyncio.run(calculate_energy_usage(120, "Poor", 1990))
+    cost = asyncio.run(calculate_energy_cost(usage, "natural_gas"))
+    assert isinstance(usage, float)
+    assert usage == reference_usage(120, "Poor", 1990)
+    assert cost == reference_cost(usage, "natural_gas")
@@ -0,0 +1,78 @@
+import pytest
+from services.gazetteer import load_gazetteer, normalize_place
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return load_gazetteer()
+
+
+def test_normalize_place():
+    """
+    Test case, accent and punctuation folding.
+    """
+    assert normalize_place("  Düsseldorf ") == "dusseldorf"
+    assert normalize_place("Frankfurt a.M.") == "frankfurt a m"
+
+
+@pytest.mark.parametrize("location", ["Berlin", "berlin ", "Berlin, DE", "Berlin, Germany", "Berlin-Spandau",
+                                      "BERLIN  Spandau", "Berln"])
+def test_resolve_variants_to_one_city(gazetteer, location):
+    """
+    Test that free-text variants of the same city share one canonical id.
+    """
+    city = gazetteer.resolve(location)
+    assert city is not None
+    assert (city.name, city.country) == ("Berlin", "DE")
+
+
+def test_resolve_aliases(gazetteer):
+    """
+    Test that exonyms and transliterations map to the canonical city.
+    """
+    assert gazetteer.resolve("München").id == gazetteer.resolve("Munich").id
+    assert gazetteer.resolve("Koeln").name == "Köln"
+
+
+@pytest.mark.parametrize("location, name, country", [
+    ("Bad Homburg", "Bad Homburg vor der Höhe", "DE"),
+    ("Newcastle upon Tyne", "Newcastle upon Tyne", "GB"),
+    ("Newcastle upon Tyne, UK", "Newcastle upon Tyne", "GB"),
+    ("St. Louis", "St. Louis", "US"),
+    ("Neustadt", "Neustadt an der Weinstraße", "DE"),
+])
+def test_resolve_beyond_major_cities(gazetteer, location, name, country):
+    """
+    Test that towns and spellings outside a hand-picked list of major cities resolve.
+    """
+    city = gazetteer.resolve(location)
+    assert (city.name, city.country) == (name, country)
+
+
+def test_resolve_qualifiers_pick_the_namesake(gazetteer):
+    """
+    Test that country and region qualifiers select among namesakes and that a mismatch is unknown.
+    """
+    assert gazetteer.resolve("Paris").country == "FR"
+    assert (gazetteer.resolve("Paris, TX").country, gazetteer.resolve("Paris, TX").admin1) == ("US", "TX")
+    assert gazetteer.resolve("Paris, Texas") == gazetteer.resolve("Paris, TX, US")
+    assert gazetteer.resolve("Paris, DE") is None
+    assert gazetteer.resolve("Berlin, Narnia") is None
+
+
+def test_resolve_unknown_city(gazetteer):
+    """
+    Test that unknown locations are rejected.
+    """
+    assert gazetteer.resolve("Nowhereville") is None
+    assert gazetteer.resolve("") is None
+
+
+def test_prefix_search(gazetteer):
+    """
+    Test autocomplete over names and aliases, most populous first.
+    """
+    names = [city.name for city in gazetteer.search("ham")]
+    assert names[0] == "Hamburg"
+    assert "Hamilton" in names
+    assert gazetteer.search("") == []
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from models import Base, Notification, User
+from models.history import NOTIFICATIONS, RECOMMENDATIONS, WEATHER_TIPS, decode_cursor, encode_cursor, read_history
+from models.recomendation import Recommendation
+
+START = datetime(2026, 10, 1)
+
+
+@pytest.fixture
+def db_session():
+    """
+    Fixture with 25 recommendations for user 1 (timestamps tied in pairs) and 5 for user 2.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for user_id in (1, 2):
+        session.add(User(id=user_id, name=f"User {user_id}", email=f"user{user_id}@example.com", hash_password="x",
+                         phone_number=f"+1555000000{user_id}"))
+    session.execute(insert(Recommendation), [
+        {"id": index + 1, "user_id": 1, "real_estate_id": 1 + index % 2, "message": f"tip {index}",
+         "category": "Weather" if index % 5 == 0 else "Energy Optimization",
+         "timestamp": START + timedelta(hours=index // 2)}
+        for index in range(25)
+    ] + [
+        {"id": 100 + index, "user_id": 2, "real_estate_id": 3, "message": "other", "timestamp": START}
+        for index in range(5)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def read_all(db_session, source, **kwargs):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = read_history(db_session, source, 1, decode_cursor(cursor) if cursor else None, **kwargs)
+        ids += [item["id"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    """
+    Test that a cursor decodes to the timestamp and id it was made from.
+    """
+    cursor = encode_cursor(datetime(2026, 10, 18, 9, 30, 15, 123456), 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (datetime(2026, 10, 18, 9, 30, 15, 123456), 42)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm90aGluZw", encode_cursor(START, 1)[:-3]])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    """
+    Test that malformed cursors raise ValueError.
+    """
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_walk_all_rows_newest_first_across_timestamp_ties(db_session):
+    """
+    Test that keyset pages return every row of the user exactly once, newest first, even with tied timestamps.
+    """
+    ids, pages = read_all(db_session, RECOMMENDATIONS, limit=4)
+    assert ids == list(range(25, 0, -1))
+    assert pages == 7
+
+
+def test_last_full_page_has_no_next_cursor(db_session):
+    """
+    Test that a page ending exactly on the last row reports no further page.
+    """
+    page = read_history(db_session, RECOMMENDATIONS, 1, limit=25)
+    assert len(page["items"]) == 25
+    assert page["next_cursor"] is None
+
+
+def test_filters_and_date_range(db_session):
+    """
+    Test the category, property and date range filters.
+    """
+    ids, _ = read_all(db_session, RECOMMENDATIONS, limit=2, category="Weather")
+    assert ids == [21, 16, 11, 6, 1]
+    ids, _ = read_all(db_session, RECOMMENDATIONS, limit=3, real_estate_id=2,
+                      since=START + timedelta(hours=5), until=START + timedelta(hours=10))
+    assert ids == [20, 18, 16, 14, 12]
+
+
+def test_aware_date_range_is_compared_in_utc(db_session):
+    """
+    Test that since/until with a UTC offset select the same rows as their naive UTC equivalents.
+    """
+    berlin = timezone(timedelta(hours=2))
+    ids, _ = read_all(db_session, RECOMMENDATIONS, since=START.replace(hour=7, tzinfo=berlin),
+                      until=START + timedelta(hours=10))
+    assert ids == list(range(20, 10, -1))
+
+
+def test_rejects_filters_on_other_columns(db_session):
+    """
+    Test that only the columns declared for a source can be filtered on.
+    """
+    with pytest.raises(ValueError):
+        read_history(db_session, RECOMMENDATIONS, 1, message="tip 1")
+    with pytest.raises(ValueError):
+        read_history(db_session, WEATHER_TIPS, 1, temperature_condition="cold")
+
+
+def test_notifications_are_projected_without_email_bodies(db_session):
+    """
+    Test that notification history returns the declared columns only, not the stored email.
+    """
+    db_session.add(Notification(email="user1@example.com", status="Sent", subject="Tips", html_content="<p>big</p>",
+                                text_content="big", timestamp=START, user_id=1))
+    db_session.add(Notification(email="user1@example.com", status="Failed", timestamp=START, user_id=1))
+    db_session.commit()
+
+    page = read_history(db_session, NOTIFICATIONS, 1, status="Sent")
+    assert [item["subject"] for item in page["items"]] == ["Tips"]
+    assert set(page["items"][0]) == {"id", "timestamp", "status", "subject", "message", "attempts"}
@@ -0,0 +1,236 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from benchmarks.mailersend_standin import MailerSendStandIn
+from models import Base, Notification, User
+from models.notification import enqueue_email, enqueue_templated_email
+from services.email_dispatcher import BulkEmailDispatcher
+from services.email_templates import RenderedEmail
+from services.notification_outbox import backoff_seconds, claim_batch, drain_outbox, fail_expired_leases
+from services.outbox_rendering import OPTIMIZATION_REPORT, render_notifications
+from services.weather_api import AsyncWeatherService
+
+SENDER = {"name": "Efficient Energy Advisory", "email": "advisor@example.com"}
+REPORT_VALUES = {"name": "Owner", "location": "Berlin", "square_area": 120, "insulation_quality": "poor",
+                 "year_built": 1970, "energy_source": "gas", "energy_usage": 48.5, "estimated_cost": 4.25}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Fixture creating a file-backed SQLite database, so worker threads use separate connections.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(User(id=1, name="Owner", email="owner@example.com", hash_password="x", phone_number="+123456"))
+        session.commit()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def provider():
+    """
+    Fixture running the local MailerSend stand-in.
+    """
+    server = MailerSendStandIn(max_batch=5).start()
+    yield server
+    server.stop()
+
+
+def enqueue(factory, count, email=None):
+    with factory() as session:
+        for index in range(count):
+            enqueue_email(session, 1, email or f"user{index}@example.com", f"User {index}", "Subject",
+                          "<p>Hi</p>", "Hi")
+        session.commit()
+
+
+def statuses(factory):
+    with factory() as session:
+        return [notification.status for notification in session.query(Notification).order_by(Notification.id)]
+
+
+def test_enqueue_joins_the_callers_transaction(session_factory):
+    """
+    Test that an enqueued email is discarded when the caller's transaction rolls back.
+    """
+    with session_factory() as session:
+        enqueue_email(session, 1, "owner@example.com", "Owner", "Subject", "<p>Hi</p>", "Hi")
+        session.rollback()
+    assert statuses(session_factory) == []
+
+
+def test_claims_are_exclusive_and_respect_the_lease(session_factory):
+    """
+    Test that a claimed row is not claimed again until its lease expires.
+    """
+    enqueue(session_factory, 3)
+    now = datetime.utcnow()
+    with session_factory() as first, session_factory() as second:
+        assert [notification.id for notification in claim_batch(first, 2, now=now)] == [1, 2]
+        assert [notification.id for notification in claim_batch(second, 10, now=now)] == [3]
+        assert claim_batch(second, 10, now=now) == []
+        later = now + timedelta(seconds=601)
+        assert len(claim_batch(second, 10, lease_seconds=600, now=later)) == 3
+
+
+def test_expired_leases_count_as_attempts(session_factory):
+    """
+    Test that a row whose worker keeps dying is claimed at most max_attempts times and then failed.
+    """
+    enqueue(session_factory, 1)
+    now = datetime.utcnow()
+    with session_factory() as session:
+        for attempt in (1, 2, 3):
+            now += timedelta(seconds=601)
+            assert fail_expired_leases(session, max_attempts=3, lease_seconds=600, now=now) == 0
+            assert [notification.attempts
+                    for notification in claim_batch(session, lease_seconds=600, max_attempts=3, now=now)] == [attempt]
+        now += timedelta(seconds=601)
+        assert claim_batch(session, lease_seconds=600, max_attempts=3, now=now) == []
+        assert fail_expired_leases(session, max_attempts=3, lease_seconds=600, now=now) == 1
+        notification = session.get(Notification, 1)
+        assert notification.status == "Failed" and notification.last_error.startswith("Lease expired")
+
+
+def test_drains_outbox_with_bounded_workers(session_factory, provider):
+    """
+    Test that concurrent workers send every pending email exactly once and record the outcomes.
+    """
+    enqueue(session_factory, 23)
+    enqueue(session_factory, 1, "invalid-address")
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01)
+    summary = drain_outbox(session_factory, dispatcher, batch_size=5, concurrency=3, sender=SENDER)
+    dispatcher.close()
+
+    assert summary["sent"] == 23 and summary["failed"] == 1 and summary["batches"] == 5
+    assert provider.posts == 5
+    assert sum(len(messages) for messages in provider.batches.values()) == 24
+    assert statuses(session_factory) == ["Sent"] * 23 + ["Failed"]
+
+
+def test_failed_requests_are_retried_with_backoff(session_factory, provider):
+    """
+    Test that a rejected request puts its rows back with a backoff and gives up after the last attempt.
+    """
+    enqueue(session_factory, 2)
+    provider.fail_next = 10
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01)
+    summary = drain_outbox(session_factory, dispatcher, concurrency=1, max_attempts=2, sender=SENDER)
+    assert summary["retried"] == 2 and statuses(session_factory) == ["Pending"] * 2
+    with session_factory() as session:
+        notification = session.get(Notification, 1)
+        assert notification.attempts == 1 and notification.next_attempt_at > datetime.utcnow()
+        assert notification.last_error.startswith("HTTP 503")
+        session.query(Notification).update({Notification.next_attempt_at: None})  # make them due again
+        session.commit()
+
+    drain_outbox(session_factory, dispatcher, concurrency=1, max_attempts=2, sender=SENDER)
+    dispatcher.close()
+    assert statuses(session_factory) == ["Failed"] * 2
+
+
+def test_malformed_bulk_responses_are_retried_with_backoff(session_factory, provider):
+    """
+    Test that an accepted bulk request without a bulk_email_id releases its rows for a retry instead of crashing.
+    """
+    enqueue(session_factory, 3)
+    provider.malformed_next = 1
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01)
+    summary = drain_outbox(session_factory, dispatcher, concurrency=1, sender=SENDER)
+    assert summary["retried"] == 3 and statuses(session_factory) == ["Pending"] * 3
+    with session_factory() as session:
+        notification = session.get(Notification, 1)
+        assert notification.last_error.startswith("malformed response (KeyError)")
+        assert notification.next_attempt_at > datetime.utcnow() and notification.claimed_at is None
+        session.query(Notification).update({Notification.next_attempt_at: None})
+        session.commit()
+
+    assert drain_outbox(session_factory, dispatcher, concurrency=1, sender=SENDER)["sent"] == 3
+    dispatcher.close()
+
+
+def test_queued_emails_are_resolved_by_polling_the_bulk_status(session_factory, provider):
+    """
+    Test that emails still validating when the dispatcher stops polling are resolved by later runs.
+    """
+    enqueue(session_factory, 2)
+    enqueue(session_factory, 1, "invalid-address")
+    provider.validating = 2  # the send's single poll and the next run's poll
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01, poll_timeout=0)
+    assert drain_outbox(session_factory, dispatcher, concurrency=1, sender=SENDER)["queued"] == 3
+    with session_factory() as session:
+        queued = session.query(Notification).order_by(Notification.id).all()
+        assert [notification.bulk_index for notification in queued] == [0, 1, 2]
+        assert len({notification.bulk_email_id for notification in queued}) == 1
+
+    assert drain_outbox(session_factory, dispatcher, sender=SENDER)["polled"] == {"sent": 0, "failed": 0, "queued": 3}
+    summary = drain_outbox(session_factory, dispatcher, sender=SENDER)
+    dispatcher.close()
+    assert summary["polled"] == {"sent": 2, "failed": 1, "queued": 0} and summary["batches"] == 0
+    assert statuses(session_factory) == ["Sent", "Sent", "Failed"]
+    assert provider.posts == 1
+
+
+def test_backoff_grows_and_is_capped():
+    """
+    Test that the retry delay doubles per attempt within its jitter and never exceeds the cap.
+    """
+    assert 15 <= backoff_seconds(1, base=30, maximum=3600) <= 30
+    assert 60 <= backoff_seconds(3, base=30, maximum=3600) <= 120
+    assert backoff_seconds(20, base=30, maximum=3600) <= 3600
+
+
+def test_templated_emails_are_rendered_by_the_worker(session_factory, provider):
+    """
+    Test that an email enqueued with its inputs is rendered, stored and sent by the worker, and that one whose
+    inputs are unavailable is retried with its error instead of being dropped.
+    """
+    with session_factory() as session:
+        enqueue_templated_email(session, 1, "owner@example.com", "Owner", OPTIMIZATION_REPORT, REPORT_VALUES)
+        enqueue_templated_email(session, 1, "owner@example.com", "Owner", OPTIMIZATION_REPORT,
+                                dict(REPORT_VALUES, location="Nowhere"))
+        session.commit()
+
+    def renderer(notifications):
+        return {notification.id: RenderedEmail(f"Report {notification.id}", "<p>Report</p>", "Report")
+                if notification.template_values["location"] == "Berlin" else None for notification in notifications}
+
+    dispatcher = BulkEmailDispatcher("key", base_url=provider.url, max_batch=5, poll_interval=0.01)
+    summary = drain_outbox(session_factory, dispatcher, concurrency=1, sender=SENDER, renderer=renderer)
+    dispatcher.close()
+
+    assert summary["sent"] == 1 and summary["retried"] == 1
+    assert statuses(session_factory) == ["Sent", "Pending"]
+    with session_factory() as session:
+        sent, waiting = session.get(Notification, 1), session.get(Notification, 2)
+        assert sent.subject == "Report 1" and sent.text_content == "Report"
+        assert waiting.subject is None and waiting.next_attempt_at > datetime.utcnow()
+        assert waiting.last_error.startswith("Inputs of optimization_report unavailable")
+
+
+def test_optimization_report_renders_with_the_weather():
+    """
+    Test that the optimization report is rendered from its stored values and one weather lookup per city.
+    """
+    lookups = []
+
+    def handler(request):
+        lookups.append(request)
+        return httpx.Response(200, json={"main": {"temp": -4.0, "humidity": 70}, "wind": {"speed": 2.0}})
+
+    weather_service = AsyncWeatherService("key", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    notifications = [Notification(id=index, template=OPTIMIZATION_REPORT, template_values=REPORT_VALUES)
+                     for index in (1, 2)]
+
+    rendered = asyncio.run(render_notifications(weather_service, notifications))
+    assert rendered[1] == rendered[2] and len(lookups) == 1
+    assert rendered[1].subject == "Your Personalized Energy Optimization Update"
+    assert "-4.0 °C" in rendered[1].text and "48.500 kWh" in rendered[1].text
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from models import Base
+from services.partitions import (Partition, add_months, create_partition_sql, ensure_partitions, expired_partitions,
+                                 missing_months, parse_bound)
+
+
+def test_add_months_wraps_years():
+    """
+    Test month arithmetic across year boundaries in both directions.
+    """
+    assert add_months(datetime(2026, 11, 1), 3) == datetime(2027, 2, 1)
+    assert add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+
+
+@pytest.mark.parametrize("expression, lower, upper", [
+    ("FOR VALUES FROM ('2026-01-01 00:00:00') TO ('2026-02-01 00:00:00')",
+     datetime(2026, 1, 1), datetime(2026, 2, 1)),
+    ("FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00')", None, datetime(2026, 11, 1)),
+])
+def test_parse_bound(expression, lower, upper):
+    """
+    Test that partition bounds, including the legacy partition's MINVALUE, are parsed.
+    """
+    assert parse_bound("p", expression) == Partition("p", lower, upper)
+
+
+def test_parse_bound_rejects_other_partitioning():
+    """
+    Test that a bound this module did not create is refused rather than misread.
+    """
+    with pytest.raises(ValueError):
+        parse_bound("notifications_default", "DEFAULT")
+
+
+def test_missing_months_skips_months_already_covered():
+    """
+    Test that only the months not covered by the legacy or monthly partitions are planned.
+    """
+    partitions = [Partition("notifications_legacy", None, datetime(2026, 11, 1)),
+                  Partition("notifications_p2026_11", datetime(2026, 11, 1), datetime(2026, 12, 1))]
+    assert missing_months(partitions, datetime(2026, 10, 18, 9, 30), months_ahead=3) == [datetime(2026, 12, 1),
+                                                                                           datetime(2027, 1, 1)]
+
+
+def test_create_partition_sql():
+    """
+    Test the DDL of a monthly partition.
+    """
+    assert create_partition_sql("notifications", datetime(2026, 12, 1)) == (
+        'CREATE TABLE IF NOT EXISTS "notifications_p2026_12" PARTITION OF "notifications" '
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+def test_plain_tables_on_sqlite_are_left_alone():
+    """
+    Test that SQLite's plain tables have no partitions to create or drop.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    assert ensure_partitions(engine, "notifications", datetime(2026, 10, 18)) == []
+    assert expired_partitions(engine, "notifications", datetime(2026, 10, 18)) == []
@@ -0,0 +1,139 @@
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from models import Notification
+from services.partitions import ensure_partitions, list_partitions, month_start, add_months
+from services.retention import RetentionPolicy, purge_expired
+from models.weather_recommendation import WeatherBasedRecommendation
+
+ROOT = Path(__file__).resolve().parent.parent
+BEFORE_PARTITIONING = "4e8b1d6a9c53"
+
+
+def _server_url():
+    """
+    TEST_POSTGRES_URL, else a throwaway local server from the `pgserver` package; None when neither is available.
+    """
+    if os.getenv("TEST_POSTGRES_URL"):
+        return make_url(os.environ["TEST_POSTGRES_URL"])
+    try:
+        import pgserver
+    except ImportError:
+        return None
+    server = pgserver.get_server(os.path.join("/tmp", "energy-test-pg"), cleanup_mode=None)
+    return make_url(server.get_uri())
+
+
+@pytest.fixture(scope="module")
+def database_url():
+    """
+    Fixture with an empty PostgreSQL database, dropped afterwards.
+    """
+    server_url = _server_url()
+    if server_url is None:
+        pytest.skip("needs PostgreSQL: set TEST_POSTGRES_URL or install pgserver")
+    server_url = server_url.set(drivername="postgresql+psycopg2")
+    name = f"partitions_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(server_url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'CREATE DATABASE "{name}"'))
+    yield server_url.set(database=name).render_as_string(hide_password=False)
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE "{name}" WITH (FORCE)'))
+    admin.dispose()
+
+
+def alembic(url: str, *args: str) -> None:
+    # A process of its own: alembic/env.py reads the URL through config.database at import time
+    result = subprocess.run([sys.executable, "-m", "alembic", *args], cwd=ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, SQLALCHEMY_DATABASE_URL=url, DATABASE_ASYNC="false"))
+    assert result.returncode == 0, result.stderr
+
+
+def counts(engine):
+    with engine.connect() as connection:
+        return tuple(connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+                     for table in ("notifications", "weather_based_recommendations"))
+
+
+def test_migration_partitions_and_retention_on_postgres(database_url):
+    """
+    Test upgrade, inserts, partition creation, partition retention and downgrade on a real PostgreSQL.
+    """
+    now = datetime.utcnow()
+    alembic(database_url, "upgrade", BEFORE_PARTITIONING)
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, name, email, hash_password, phone_number) "
+                                "VALUES (1, 'Owner', 'owner@example.com', 'x', '+1')"))
+        connection.execute(text(
+            "INSERT INTO notifications (message, email, status, attempts, user_id, timestamp) "
+            "SELECT 'old', 'owner@example.com', 'Sent', 0, 1, :now - n * interval '1 day' "
+            "FROM generate_series(1, 60) AS n"
+        ), {"now": now})
+        connection.execute(text(
+            "INSERT INTO weather_based_recommendations (message, temperature_condition, weather_tips, user_id, "
+            "timestamp) SELECT 'old', 'cold', 'tips', 1, :now - n * interval '1 day' FROM generate_series(1, 60) AS n"
+        ), {"now": now})
+
+    alembic(database_url, "upgrade", "head")
+    next_month = add_months(month_start(now), 1)
+    with engine.connect() as connection:
+        partitions = list_partitions(connection, "notifications")
+    assert [partition.name for partition in partitions] == ["notifications_legacy"] + [
+        f"notifications_p{add_months(next_month, offset):%Y_%m}" for offset in range(4)
+    ]
+    assert counts(engine) == (60, 60)
+    with engine.connect() as connection:
+        # Built partition by partition and attached: the parent indexes are valid
+        assert connection.execute(text(
+            "SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname LIKE 'ix\\_%\\_user\\_id\\_timestamp' AND c.relkind = 'I' ORDER BY 1"
+        )).all() == [("ix_notifications_user_id_timestamp", True),
+                     ("ix_weather_based_recommendations_user_id_timestamp", True)]
+
+    # The ORM inserts into the partitioned tables and ids continue from the old sequence
+    with sessionmaker(bind=engine)() as session:
+        session.add(Notification(email="owner@example.com", status="Pending", user_id=1,
+                                 timestamp=now - timedelta(days=400)))
+        session.add(Notification(email="owner@example.com", status="Sent", user_id=1,
+                                 timestamp=add_months(next_month, 1)))
+        session.commit()
+        assert session.execute(text("SELECT max(id) FROM notifications")).scalar() == 62
+
+    assert ensure_partitions(engine, "notifications", add_months(next_month, 4), months_ahead=1) == [
+        f"notifications_p{add_months(next_month, 4):%Y_%m}", f"notifications_p{add_months(next_month, 5):%Y_%m}"
+    ]
+
+    # Once the legacy month is past the window it is dropped whole, unless it still holds outbox rows
+    later = next_month + timedelta(days=31)
+    summary = purge_expired(sessionmaker(bind=engine), [RetentionPolicy(WeatherBasedRecommendation, 30),
+                                                        RetentionPolicy(Notification, 30)],
+                            now=later, throttle_seconds=0)
+    assert summary["tables"]["weather_based_recommendations"]["partitions"]["dropped"] == [
+        "weather_based_recommendations_legacy"
+    ]
+    assert summary["tables"]["notifications"]["partitions"]["dropped"] == []
+    assert summary["tables"]["notifications"]["deleted"] == 60  # the batched deletes trim it instead
+    assert counts(engine) == (2, 0)
+    engine.dispose()
+
+    alembic(database_url, "downgrade", BEFORE_PARTITIONING)
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        assert list_partitions(connection, "notifications") == []
+        new_id = connection.execute(text(
+            "INSERT INTO notifications (message, email, status, attempts, user_id) "
+            "VALUES ('after', 'owner@example.com', 'Sent', 0, 1) RETURNING id"
+        )).scalar()
+    assert new_id == 63
+    assert counts(engine) == (3, 0)
+    engine.dispose()
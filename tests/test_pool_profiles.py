@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+from config.pool_profiles import (SERVER, SERVERLESS, TEST, PoolMetrics, create_pooled_engine, engine_options,
+                                  pool_metrics, select_profile)
+
+
+@pytest.fixture(autouse=True)
+def no_profile_env(monkeypatch):
+    monkeypatch.delenv("DB_POOL_PROFILE", raising=False)
+    monkeypatch.delenv("VERCEL", raising=False)
+    yield
+    pool_metrics.pop("test-engine", None)
+
+
+def test_select_profile_defaults(monkeypatch):
+    """
+    Test that the profile follows the deployment unless DB_POOL_PROFILE names one.
+    """
+    assert select_profile("sqlite://") == TEST
+    assert select_profile("postgresql://user@db/energy") == SERVER
+    monkeypatch.setenv("VERCEL", "1")
+    assert select_profile("postgresql://user@db/energy") == SERVERLESS
+    monkeypatch.setenv("DB_POOL_PROFILE", "server")
+    assert select_profile("postgresql://user@db/energy") == SERVER
+
+
+@pytest.mark.parametrize("url, profile", [
+    ("postgresql://user@db/energy", "pooled"),
+    ("postgresql://user@db/energy", TEST),
+    ("sqlite://", SERVER),
+])
+def test_select_profile_rejects_invalid_combinations(url, profile):
+    """
+    Test that unknown profiles and profiles unfit for the database are refused.
+    """
+    with pytest.raises(ValueError):
+        select_profile(url, profile)
+
+
+def test_engine_options_per_profile():
+    """
+    Test the pool class and sizing of each profile.
+    """
+    metrics = PoolMetrics("test", SERVER)
+    assert issubclass(engine_options("postgresql://db/energy", SERVERLESS, metrics)["poolclass"], NullPool)
+    assert issubclass(engine_options("sqlite://", TEST, metrics)["poolclass"], StaticPool)
+    server = engine_options("postgresql://db/energy", SERVER, metrics)
+    assert issubclass(server["poolclass"], QueuePool)
+    assert server["pool_pre_ping"] is True
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= server.keys()
+
+
+def test_test_profile_shares_one_in_memory_database():
+    """
+    Test that every checkout of the test profile sees the same in-memory database.
+    """
+    engine = create_pooled_engine(create_engine, "sqlite://", "test-engine")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER)"))
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM t")).scalar() == 0
+    assert pool_metrics["test-engine"].stats()["pool"] == "StaticPool"
+
+
+def test_metrics_count_checkouts_overflow_and_timeouts(tmp_path):
+    """
+    Test that checked-out connections, overflow checkouts, waits and timeouts are reported.
+    """
+    metrics = PoolMetrics("test", SERVER)
+    options = engine_options("sqlite:///file", SERVER, metrics)
+    options.update(pool_size=1, max_overflow=1, pool_timeout=0.05)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **options)
+    metrics.attach(engine)
+
+    first, second = engine.connect(), engine.connect()
+    stats = metrics.stats()
+    assert (stats["checked_out"], stats["overflow_checkouts"], stats["pool_size"]) == (2, 1, 1)
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = metrics.stats()
+    assert stats["checked_out"] == 0
+    assert stats["peak_checked_out"] == 2
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_ms_max"] >= 50
+    engine.dispose()
+
+
+def test_metrics_record_waits_for_a_released_connection(tmp_path):
+    """
+    Test that a checkout blocked on a full pool reports the time it waited.
+    """
+    metrics = PoolMetrics("test", SERVER)
+    options = engine_options("sqlite:///file", SERVER, metrics)
+    options.update(pool_size=1, max_overflow=0, pool_timeout=5)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **options)
+    metrics.attach(engine)
+
+    held = engine.connect()
+    timer = threading.Timer(0.1, held.close)
+    timer.start()
+    with engine.connect():
+        pass
+    timer.join()
+
+    stats = metrics.stats()
+    assert stats["timeouts"] == 0
+    assert stats["wait_ms_max"] >= 90
+    engine.dispose()
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, RealEstate, Recommendation, User
+from models.portfolio_estimation import estimate_portfolio
+
+
+@pytest.fixture
+def db_session():
+    """
+    Fixture providing a session on a fresh in-memory SQLite database.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        User(id=1, name="Owner", email="owner@example.com", hash_password="x", phone_number="+12345678901"),
+        User(id=2, name="Other", email="other@example.com", hash_password="x", phone_number="+12345678902"),
+    ])
+    for index in range(5):
+        session.add(RealEstate(square_area=100 + index, real_estate_type="Apartment", year_built=2000,
+                               insulation_quality="good", energy_source=None, location="Berlin", user_id=1))
+    session.add(RealEstate(square_area=80, real_estate_type="House", year_built=1990,
+                           insulation_quality="poor", energy_source="solar", location="Paris", user_id=2))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_estimate_portfolio_pages_and_bulk_inserts(db_session):
+    """
+    Test keyset paging, portfolio-wide and per-page totals and one Recommendation per estimated property.
+    """
+    first = estimate_portfolio(db_session, user_id=1, limit=3)
+    assert len(first["properties"]) == 3
+    assert first["next_after_id"] == first["properties"][-1]["property_id"]
+    assert first["page_totals"]["properties"] == 3
+    assert first["totals"]["properties"] == 5
+
+    second = estimate_portfolio(db_session, user_id=1, after_id=first["next_after_id"], limit=3)
+    assert len(second["properties"]) == 2
+    assert second["next_after_id"] is None
+
+    property_ids = [item["property_id"] for item in first["properties"] + second["properties"]]
+    assert len(set(property_ids)) == 5
+    assert db_session.query(Recommendation).filter(Recommendation.user_id == 1).count() == 5
+    assert db_session.query(Recommendation).filter(Recommendation.user_id == 2).count() == 0
+
+    expected_total = round(sum(item["estimated daily cost (€)"] for item in first["properties"]), 3)
+    assert first["page_totals"]["total daily cost (€)"] == pytest.approx(expected_total, abs=1e-3)
+    portfolio_total = expected_total + sum(item["estimated daily cost (€)"] for item in second["properties"])
+    assert first["totals"] == second["totals"]
+    assert first["totals"]["total daily cost (€)"] == pytest.approx(portfolio_total, abs=1e-2)
+
+
+def test_estimate_portfolio_without_properties(db_session):
+    """
+    Test the empty page returned to users without properties.
+    """
+    result = estimate_portfolio(db_session, user_id=99)
+    assert result["properties"] == []
+    assert result["totals"]["properties"] == result["page_totals"]["properties"] == 0
+    assert result["next_after_id"] is None
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from models import Base, PropertyEstimate, RealEstate, User
+from models.energy_batch_engine import encode_energy_source, encode_insulation, estimate_energy_batch
+from models.property_estimate import ensure_estimate_rows, get_property_estimate, mark_tariff_change, \
+    recompute_dirty_estimates
+
+
+@pytest.fixture
+def db_session():
+    """
+    Fixture providing a session on a fresh in-memory SQLite database with one user.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="Owner", email="owner@example.com", hash_password="x", phone_number="+12345678901"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_property(session, **overrides):
+    values = dict(square_area=100, real_estate_type="Apartment", year_built=2000, insulation_quality="good",
+                  energy_source="electricity", location="Berlin", user_id=1)
+    values.update(overrides)
+    real_estate = RealEstate(**values)
+    session.add(real_estate)
+    session.commit()
+    return real_estate
+
+
+def expected(real_estate):
+    usage, cost = estimate_energy_batch([real_estate.square_area], encode_insulation([real_estate.insulation_quality]),
+                                        [real_estate.year_built], encode_energy_source([real_estate.energy_source]))
+    return float(usage[0]), float(cost[0])
+
+
+def test_new_property_is_dirty_until_recomputed(db_session):
+    """
+    Test that inserting a property queues its estimate and the job fills it in.
+    """
+    real_estate = add_property(db_session)
+    assert db_session.get(PropertyEstimate, real_estate.id).is_dirty
+
+    assert recompute_dirty_estimates(db_session) == {"recomputed": 1, "unchanged": 0}
+    estimate = db_session.get(PropertyEstimate, real_estate.id)
+    assert not estimate.is_dirty
+    assert (estimate.energy_usage, estimate.estimated_cost) == expected(real_estate)
+
+
+def test_only_input_changes_mark_dirty(db_session):
+    """
+    Test that editing an estimate input flags the row while other edits do not.
+    """
+    real_estate = add_property(db_session)
+    recompute_dirty_estimates(db_session)
+
+    real_estate.location = "Paris"
+    db_session.commit()
+    db_session.expire_all()
+    assert not db_session.get(PropertyEstimate, real_estate.id).is_dirty
+
+    real_estate.insulation_quality = "poor"
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(PropertyEstimate, real_estate.id).is_dirty
+    assert recompute_dirty_estimates(db_session)["recomputed"] == 1
+
+
+def test_tariff_change_only_touches_affected_sources(db_session):
+    """
+    Test that a tariff change dirties matching properties only and unchanged fingerprints are skipped.
+    """
+    add_property(db_session, energy_source="electricity")
+    add_property(db_session, energy_source="solar")
+    recompute_dirty_estimates(db_session)
+
+    assert mark_tariff_change(db_session, ["solar"]) == 1
+    # The tariff version did not actually change, so the fingerprint matches and nothing is recomputed
+    assert recompute_dirty_estimates(db_session) == {"recomputed": 0, "unchanged": 1}
+
+
+def test_get_property_estimate_recomputes_inline_when_stale(db_session):
+    """
+    Test the read path: clean rows are returned as is, dirty or missing rows are computed on demand.
+    """
+    real_estate = add_property(db_session)
+    estimate = get_property_estimate(db_session, real_estate)
+    assert not estimate.is_dirty
+    assert (estimate.energy_usage, estimate.estimated_cost) == expected(real_estate)
+
+    db_session.execute(insert(RealEstate).values(square_area=50, real_estate_type="House", year_built=1950,
+                                                 insulation_quality="poor", location="Rome", user_id=1))
+    db_session.commit()
+    assert ensure_estimate_rows(db_session) == 1
@@ -0,0 +1,153 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, event, insert, or_, select
+from sqlalchemy.orm import sessionmaker
+from models import Base, Notification, RealEstate, User
+from models.history import NOTIFICATIONS, RECOMMENDATIONS, WEATHER_TIPS, read_history
+from models.portfolio_estimation import estimate_portfolio
+from models.recomendation import Recommendation
+from models.weather_recommendation import WeatherBasedRecommendation
+from services.digest import load_properties
+from services.retention import RetentionPolicy, purge_table
+
+USERS = 2_000
+PROPERTIES_PER_USER = 3
+HISTORY_PER_USER = 10
+NOW = datetime(2026, 10, 18)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """
+    Fixture with a seeded and analyzed database, so the planner chooses plans from realistic statistics.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": user_id, "name": f"User {user_id}", "email": f"user{user_id}@example.com", "hash_password": "x",
+             "phone_number": f"+1555{user_id:07d}"}
+            for user_id in range(1, USERS + 1)
+        ])
+        connection.execute(insert(RealEstate), [
+            {"square_area": 80, "real_estate_type": "Apartment", "year_built": 1990, "insulation_quality": "average",
+             "energy_source": "electricity", "location": "Berlin", "user_id": user_id}
+            for user_id in range(1, USERS + 1) for _ in range(PROPERTIES_PER_USER)
+        ])
+        history = [(user_id, NOW - timedelta(days=index)) for user_id in range(1, USERS + 1)
+                   for index in range(HISTORY_PER_USER)]
+        connection.execute(insert(Recommendation), [
+            {"message": "tip", "user_id": user_id, "real_estate_id": 1, "timestamp": timestamp}
+            for user_id, timestamp in history
+        ])
+        connection.execute(insert(Notification), [
+            {"email": "user@example.com", "status": "Sent", "user_id": user_id, "timestamp": timestamp}
+            for user_id, timestamp in history
+        ])
+        connection.execute(insert(WeatherBasedRecommendation), [
+            {"message": "cold", "temperature_condition": "cold", "weather_tips": "tips", "user_id": user_id,
+             "timestamp": timestamp}
+            for user_id, timestamp in history
+        ])
+        connection.exec_driver_sql("ANALYZE")
+    yield engine
+    engine.dispose()
+
+
+@contextmanager
+def captured_selects(engine):
+    """
+    SELECT statements (with their parameters) sent to the database inside the block.
+    """
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def query_plan(engine, statement, parameters=()) -> List[str]:
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def compiled(engine, statement):
+    sql = statement.compile(engine)
+    return str(sql), tuple(sql.params[name] for name in sql.positiontup)
+
+
+def assert_indexed(plan: List[str], sorted_by_index: bool = False) -> None:
+    """
+    Every table is reached by an index search: no full table or index scan, and no sort when asked.
+    """
+    scans = [step for step in plan if step.startswith("SCAN ")]
+    assert not scans, f"sequential scan in plan: {plan}"
+    if sorted_by_index:
+        assert not any("TEMP B-TREE" in step for step in plan), f"sort in plan: {plan}"
+
+
+def test_optimize_looks_up_properties_by_owner(engine):
+    """
+    Test that a user's first property (optimize endpoint) is found through ix_real_estates_user_id.
+    """
+    plan = query_plan(engine, *compiled(engine, select(RealEstate).where(RealEstate.user_id == 42).limit(1)))
+    assert_indexed(plan)
+    assert any("ix_real_estates_user_id" in step for step in plan)
+
+
+def test_registration_looks_up_email_or_phone(engine):
+    """
+    Test that the email-or-phone lookup of registration uses an index for both branches of the OR.
+    """
+    statement = select(User).where(or_(User.email == "user7@example.com", User.phone_number == "+15550000007"))
+    plan = query_plan(engine, *compiled(engine, statement.limit(1)))
+    assert_indexed(plan)
+    assert any("ix_users_phone_number" in step for step in plan)
+
+
+def test_portfolio_and_digest_read_properties_by_owner(engine):
+    """
+    Test the property reads (page and totals) of the portfolio estimate and of the digest pipeline.
+    """
+    with captured_selects(engine) as statements, sessionmaker(bind=engine)() as session:
+        estimate_portfolio(session, 42)
+        load_properties(session, list(range(100, 150)))
+    assert len(statements) == 3  # the page, the portfolio totals and the digest read
+    for statement, parameters in statements:
+        assert_indexed(query_plan(engine, statement, parameters))
+
+
+@pytest.mark.parametrize("source", [RECOMMENDATIONS, NOTIFICATIONS, WEATHER_TIPS])
+def test_history_pages_are_read_newest_first_from_the_index(engine, source):
+    """
+    Test that first and later history pages are index range reads without a sort.
+    """
+    with captured_selects(engine) as statements, sessionmaker(bind=engine)() as session:
+        read_history(session, source, 42, limit=3)
+        read_history(session, source, 42, (NOW - timedelta(days=4), 10**9), limit=3, since=NOW - timedelta(days=8))
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        plan = query_plan(engine, statement, parameters)
+        assert_indexed(plan, sorted_by_index=True)
+        assert any(f"ix_{source.model.__tablename__}_user_id_timestamp" in step for step in plan)
+
+
+@pytest.mark.parametrize("model", [Recommendation, Notification, WeatherBasedRecommendation])
+def test_retention_batches_walk_the_primary_key(engine, model):
+    """
+    Test that the retention engine's batch selects are primary-key range reads.
+    """
+    with captured_selects(engine) as statements:
+        purge_table(sessionmaker(bind=engine), RetentionPolicy(model, 3650), NOW, throttle_seconds=0)
+    assert statements
+    for statement, parameters in statements:
+        assert_indexed(query_plan(engine, statement, parameters), sorted_by_index=True)
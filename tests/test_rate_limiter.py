@@ -0,0 +1,146 @@
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+from services.rate_limiter import RateLimiter, retry_after_seconds
+from services.weather_api import AsyncWeatherService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.day = date(2026, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_limiter(clock, **kwargs):
+    options = dict(rate_per_second=2, burst=3, max_wait=1.0)
+    options.update(kwargs)
+    return RateLimiter("test", clock=clock, today=lambda: clock.day, **options)
+
+
+def test_burst_then_queued_waits_then_refusal(clock):
+    """
+    Test that the burst is granted at once, later callers get increasing waits and a wait over max_wait is refused.
+    """
+    limiter = make_limiter(clock)
+    assert [limiter.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.reserve() == pytest.approx(0.5)
+    assert limiter.reserve() == pytest.approx(1.0)
+    assert limiter.reserve() is None  # would wait 1.5s
+    assert limiter.remaining()["queued_seconds"] == pytest.approx(1.0)
+
+    clock.now += 10  # refills up to the burst, not beyond
+    assert limiter.remaining()["tokens"] == 3
+    assert limiter.stats()["rejected_wait"] == 1 and limiter.stats()["waited"] == 2
+
+
+def test_daily_quota_and_reset(clock):
+    """
+    Test that the daily quota refuses calls regardless of tokens and resets on the next day.
+    """
+    limiter = make_limiter(clock, daily_quota=4, max_wait=100)
+    assert all(limiter.reserve() is not None for _ in range(4))
+    assert limiter.reserve() is None
+    assert limiter.remaining()["daily_remaining"] == 0
+    clock.day = date(2026, 1, 2)
+    assert limiter.remaining()["daily_remaining"] == 4
+    assert limiter.reserve() is not None
+
+
+def test_back_off_pauses_grants(clock):
+    """
+    Test that a 429 with Retry-After stops grants for that long.
+    """
+    limiter = make_limiter(clock, max_wait=10)
+    limiter.back_off(retry_after_seconds({"Retry-After": "4"}))
+    assert limiter.reserve() == pytest.approx(4.5)
+    assert retry_after_seconds({}, default=2.0) == 2.0
+
+
+def test_async_acquire_releases_when_cancelled():
+    """
+    Test that a coroutine cancelled while queued gives its token back.
+    """
+    limiter = RateLimiter("test", rate_per_second=1, burst=1, max_wait=5)
+
+    async def scenario():
+        assert await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        assert limiter.remaining()["queued_seconds"] > 0
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.remaining()["queued_seconds"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_weather_service_goes_through_the_limiter():
+    """
+    Test that refused weather lookups never reach the provider and do not trip the breaker.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"main": {"temp": 20}})
+
+    limiter = RateLimiter("weather", rate_per_second=0.001, burst=2, max_wait=0.1)
+    service = AsyncWeatherService("key", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                                  rate_limiter=limiter)
+
+    async def scenario():
+        return [await service.get_weather(city) for city in ("Berlin", "Paris", "Rome")]
+
+    assert [result is not None for result in asyncio.run(scenario())] == [True, True, False]
+    assert len(calls) == 2
+    assert service.breaker.state == "closed"
+
+
+def test_spare_tokens_leave_the_reserve_and_never_queue(clock):
+    """
+    Test that background takes stop at the reserved tokens and do not delay callers that queue.
+    """
+    limiter = make_limiter(clock, burst=4)
+    assert [limiter.take_spare(keep=2) for _ in range(3)] == [0.0, 0.0, pytest.approx(0.5)]
+    assert limiter.remaining()["tokens"] == 2
+    assert limiter.reserve() == 0.0 and limiter.reserve() == 0.0  # the reserve goes to user requests
+    assert limiter.take_spare(keep=2) == pytest.approx(1.5)
+    assert limiter.remaining()["queued_seconds"] == 0
+    assert limiter.take_spare(keep=10) == pytest.approx(2.0)  # keep is capped at burst - 1
+
+
+def test_background_prefetch_paces_itself_within_its_budget():
+    """
+    Test that a 100-city prefetch waits for tokens instead of failing, leaving the reserve to user requests.
+    """
+    from services.weather_prefetch import prefetch_weather
+
+    def handler(request):
+        return httpx.Response(200, json={"main": {"temp": 20}})
+
+    limiter = RateLimiter("weather", rate_per_second=400, burst=10, max_wait=0.001)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    job = AsyncWeatherService("key", client=client, rate_limiter=limiter, rate_limit_budget=5, rate_limit_keep=5)
+    user = AsyncWeatherService("key", client=client, rate_limiter=limiter)
+
+    async def scenario():
+        prefetch = asyncio.create_task(prefetch_weather(job, [f"City {n}" for n in range(100)], concurrency=20))
+        await asyncio.sleep(0)
+        looked_up = [await user.get_weather(f"Town {n}") for n in range(5)]
+        return await prefetch, looked_up
+
+    summary, looked_up = asyncio.run(scenario())
+    assert summary["fetched"] == 100 and summary["failures"] == 0
+    assert all(data is not None for data in looked_up)
+    assert limiter.stats()["rejected_wait"] == 0
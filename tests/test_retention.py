@@ -0,0 +1,94 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from models import Base, Notification, User
+from models.notification import STATUS_PENDING, STATUS_SENDING
+from services.email_dispatcher import STATUS_QUEUED
+from models.recomendation import Recommendation
+from models.weather_recommendation import WeatherBasedRecommendation
+from models.real_estates import RealEstate
+from services.retention import RetentionPolicy, purge_expired
+
+NOW = datetime(2026, 3, 1, 0, 0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Fixture with 25 old and 5 recent rows in every retention table, plus old notifications still in the outbox.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(User(id=1, name="Owner", email="owner@example.com", hash_password="x", phone_number="+1"))
+        session.add(RealEstate(id=1, square_area=90, real_estate_type="Apartment", year_built=1995,
+                               insulation_quality="average", energy_source="electricity", location="Berlin",
+                               user_id=1))
+        for index in range(30):
+            timestamp = NOW - timedelta(days=60 if index < 25 else 1, minutes=index)
+            session.add(Notification(email="owner@example.com", message=f"n{index}", status="Sent",
+                                     timestamp=timestamp, user_id=1))
+            session.add(Recommendation(message=f"r{index}", timestamp=timestamp, user_id=1, real_estate_id=1))
+            session.add(WeatherBasedRecommendation(message=f"w{index}", temperature_condition="cold",
+                                                   weather_tips="tips", timestamp=timestamp, user_id=1))
+        for status in (STATUS_PENDING, STATUS_SENDING, STATUS_QUEUED):
+            session.add(Notification(email="owner@example.com", status=status, timestamp=NOW - timedelta(days=90),
+                                     user_id=1))
+        session.commit()
+    yield factory
+    engine.dispose()
+
+
+def test_purge_deletes_expired_rows_in_batches(session_factory):
+    """
+    Test that only expired rows are deleted, in id-range batches with a pause between batches.
+    """
+    pauses = []
+    summary = purge_expired(session_factory, now=NOW, batch_size=10, throttle_seconds=0.5, sleep=pauses.append)
+
+    assert summary["deleted"] == 75
+    for table in ("notifications", "recommendations", "weather_based_recommendations"):
+        assert summary["tables"][table]["deleted"] == 25
+        assert summary["tables"][table]["batches"] == 3
+        assert summary["tables"][table]["rows_per_second"] > 0
+    assert pauses == [0.5] * 6  # after the full batches only
+    with session_factory() as session:
+        assert len(session.execute(select(Recommendation.id)).all()) == 5
+        assert len(session.execute(select(WeatherBasedRecommendation.id)).all()) == 5
+        statuses = session.execute(select(Notification.status)).scalars().all()
+        assert sorted(statuses) == sorted(["Sent"] * 5 + [STATUS_PENDING, STATUS_SENDING, STATUS_QUEUED])
+
+
+def test_purge_honours_per_table_windows(session_factory):
+    """
+    Test that every table has its own window and a window of zero keeps a table untouched.
+    """
+    policies = [RetentionPolicy(Recommendation, 90), RetentionPolicy(WeatherBasedRecommendation, 0),
+                RetentionPolicy(Notification, 30)]
+    summary = purge_expired(session_factory, policies, now=NOW, throttle_seconds=0)
+
+    assert summary["tables"]["recommendations"]["deleted"] == 0
+    assert "weather_based_recommendations" not in summary["tables"]
+    assert summary["tables"]["notifications"]["deleted"] == 25
+
+
+def test_purge_archives_rows_before_deleting(session_factory, tmp_path):
+    """
+    Test that expired rows are written to a gzip NDJSON archive per table.
+    """
+    archive_dir = tmp_path / "archive"
+    summary = purge_expired(session_factory, [RetentionPolicy(Recommendation, 30)], now=NOW, batch_size=7,
+                            throttle_seconds=0, archive_dir=str(archive_dir))
+
+    archive = summary["tables"]["recommendations"]["archive"]
+    assert archive == str(archive_dir / "recommendations-20260301T000000.ndjson.gz")
+    with gzip.open(archive, "rt", encoding="utf-8") as lines:
+        rows = [json.loads(line) for line in lines]
+    assert sorted(row["message"] for row in rows) == sorted(f"r{index}" for index in range(25))
+    assert rows[0]["timestamp"].startswith("2025-12-31")
+    assert summary["deleted"] == 25
@@ -0,0 +1,70 @@
+import pytest
+from pydantic import ValidationError
+from models.energy_batch_engine import encode_energy_source, encode_insulation, estimate_energy_batch
+from models.retrofit_scenarios import rank_scenarios
+from schemas.retrofit_scenario_request import RetrofitScenarioRequest
+
+CURRENT = {"insulation_quality": "poor", "energy_source": "electricity", "square_area": 120, "year_built": 1970}
+
+
+def test_ranks_every_combination_by_savings():
+    """
+    Test that the best scenario is the cheapest combination and its figures match the engine.
+    """
+    result = rank_scenarios(CURRENT, {"insulation_quality": ["poor", "average", "good"],
+                                      "energy_source": ["electricity", "natural_gas", "solar"]}, top_k=3)
+    assert result["combinations evaluated"] == 9
+    best = result["scenarios"][0]
+    assert (best["insulation_quality"], best["energy_source"]) == ("good", "solar")
+    assert best["changes"] == ["insulation_quality", "energy_source"]
+
+    usage, cost = estimate_energy_batch([120], encode_insulation(["good"]), [1970], encode_energy_source(["solar"]))
+    assert best["estimated daily cost (€)"] == round(float(cost[0]), 3)
+    savings = [scenario["daily savings (€)"] for scenario in result["scenarios"]]
+    assert savings == sorted(savings, reverse=True)
+    assert result["baseline"]["estimated daily cost (€)"] - best["estimated daily cost (€)"] == \
+        pytest.approx(best["daily savings (€)"], abs=1e-3)
+
+
+def test_missing_attributes_keep_current_values():
+    """
+    Test that attributes without candidates, and the property's area and age, stay at the property's values.
+    """
+    result = rank_scenarios(CURRENT, {"insulation_quality": ["good"], "energy_source": None}, top_k=5)
+    assert result["combinations evaluated"] == 1
+    scenario = result["scenarios"][0]
+    assert scenario["energy_source"] == "electricity" and "square_area" not in scenario
+    assert scenario["changes"] == ["insulation_quality"]
+    assert (result["baseline"]["square_area"], result["baseline"]["year_built"]) == (120, 1970)
+
+
+def test_area_and_age_are_not_candidates():
+    """
+    Test that a smaller or newer building is never offered as a saving and the request schema refuses them.
+    """
+    result = rank_scenarios(CURRENT, {"insulation_quality": ["poor", "average", "good"],
+                                      "energy_source": ["electricity", "natural_gas", "solar"],
+                                      "square_area": [50], "year_built": [2024]}, top_k=10)
+    assert result["combinations evaluated"] == 9
+    assert all(set(scenario["changes"]) <= {"insulation_quality", "energy_source"}
+               for scenario in result["scenarios"])
+    assert {scenario["changes"] == [] for scenario in result["scenarios"]} == {True, False}  # baseline included
+
+    with pytest.raises(ValidationError):
+        RetrofitScenarioRequest(insulation_quality=["good"], square_area=[100])
+
+
+def test_spellings_are_folded_and_unknown_values_rejected():
+    """
+    Test that candidates differing only in case or spacing are one scenario and unknown values are rejected.
+    """
+    result = rank_scenarios(CURRENT, {"insulation_quality": ["good", "Good", " GOOD "],
+                                      "energy_source": ["Solar", "solar"]})
+    assert result["combinations evaluated"] == 1
+    assert [(scenario["insulation_quality"], scenario["energy_source"]) for scenario in result["scenarios"]] == [
+        ("good", "solar")]
+
+    current = dict(CURRENT, insulation_quality="Poor")
+    assert rank_scenarios(current, {"insulation_quality": ["poor"]})["scenarios"][0]["changes"] == []
+    with pytest.raises(ValueError):
+        rank_scenarios(CURRENT, {"energy_source": ["coal"]})
@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, PropertyEstimate, RealEstate, User
+from models.energy_batch_engine import ENERGY_RATES, TARIFF_VERSION, estimate_energy_batch
+from models.property_estimate import recompute_dirty_estimates
+from models.tariff import DEFAULT_REGION, Tariff, deactivate_tariff, publish_tariff, validate_tariff
+from models.tariff_engine import HOURS_PER_YEAR, IS_WEEKEND, CompiledTariff, TariffRegistry, TariffSnapshot, \
+    compile_tariffs
+
+
+@pytest.fixture
+def db_session():
+    """
+    Fixture providing a session on a fresh in-memory SQLite database with one user.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="Owner", email="owner@example.com", hash_password="x", phone_number="+12345678901"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_builtin_snapshot_matches_hard_coded_rates():
+    """
+    Test that without published tariffs the snapshot prices exactly like the built-in table.
+    """
+    snapshot = TariffSnapshot([])
+    assert snapshot.block_rates.rates[:, 0].tolist() == ENERGY_RATES.tolist()
+    assert snapshot.version_for("Solar") == TARIFF_VERSION
+    assert snapshot.get("DE", "coal").energy_source == "electricity"
+
+
+def test_time_of_use_tariff_expands_weekdays_and_weekends():
+    """
+    Test that a time-of-use tariff becomes an 8760-hour vector with weekend prices on weekends.
+    """
+    tariff = CompiledTariff.from_row(Tariff(region=DEFAULT_REGION, energy_source="electricity", version=1,
+                                            kind="time_of_use", hourly_rates=[0.10] * 7 + [0.40] * 17,
+                                            weekend_hourly_rates=[0.05] * 24))
+    assert tariff.hourly.shape == (HOURS_PER_YEAR,)
+    assert tariff.hourly[8] == 0.40  # 08:00 on the first (week)day
+    assert tariff.hourly[IS_WEEKEND].max() == 0.05
+
+    profile = np.zeros(HOURS_PER_YEAR)
+    profile[8] = 2.0
+    profile[np.argmax(IS_WEEKEND)] = 10.0
+    assert TariffSnapshot([tariff]).cost_profiles(profile, [tariff])[0] == pytest.approx(2.0 * 0.40 + 10.0 * 0.05)
+
+
+def test_tiered_tariff_bills_monthly_blocks():
+    """
+    Test that tiered pricing applies the block rates to each month's consumption.
+    """
+    tariff = CompiledTariff.from_row(Tariff(region=DEFAULT_REGION, energy_source="natural_gas", version=1,
+                                            kind="tiered", tiers=[[100, 0.10], [None, 0.20]]))
+    profiles = np.zeros((2, HOURS_PER_YEAR))
+    profiles[0, 0] = 150.0      # January: 100 kWh at 0.10 + 50 kWh at 0.20
+    profiles[1, 0] = 60.0       # January: 60 kWh at 0.10
+    profiles[1, -1] = 60.0      # December: 60 kWh at 0.10
+    costs = TariffSnapshot([tariff]).cost_profiles(profiles, [tariff, tariff])
+    assert costs.tolist() == pytest.approx([20.0, 12.0])
+
+
+@pytest.mark.parametrize("tiers", [
+    [(100, 0.10), (200, 0.20)],  # no open-ended last tier
+    [(100, 0.10), (100, 0.15), (None, 0.20)],  # repeated bound
+    [(200, 0.10), (100, 0.15), (None, 0.20)],  # descending bounds
+    [(None, 0.10), (100, 0.15), (None, 0.20)],  # open-ended tier before the last
+])
+def test_validate_tariff_rejects_malformed_tiers(tiers):
+    """
+    Test that tiers must strictly ascend and end with the open-ended tier.
+    """
+    with pytest.raises(ValueError):
+        validate_tariff("tiered", None, None, None, tiers)
+    validate_tariff("tiered", None, None, None, [(100, 0.10), (200, 0.15), (None, 0.20)])
+
+
+def test_publish_tariff_versions_and_flags_affected_estimates(db_session):
+    """
+    Test that publishing bumps the version and only dirties estimates billed with that source.
+    """
+    for source in ("electricity", "natural_gas", None):
+        db_session.add(RealEstate(square_area=100, real_estate_type="Apartment", year_built=2000,
+                                  insulation_quality="good", energy_source=source, location="Berlin", user_id=1))
+    db_session.commit()
+    recompute_dirty_estimates(db_session)
+
+    first = publish_tariff(db_session, "Electricity", "flat", flat_rate=0.30)
+    second = publish_tariff(db_session, "electricity", "flat", flat_rate=0.32)
+    assert (first.version, second.version) == (1, 2)
+
+    dirty = {estimate.real_estate.energy_source for estimate in db_session.query(PropertyEstimate)
+             if estimate.is_dirty}
+    assert dirty == {"electricity", None}
+
+    with pytest.raises(ValueError):
+        publish_tariff(db_session, "electricity", "time_of_use", hourly_rates=[0.3] * 12)
+
+
+def test_registry_swaps_snapshot_only_on_change(db_session):
+    """
+    Test that reloading installs a new snapshot when tariffs change and keeps it otherwise.
+    """
+    registry = TariffRegistry()
+    assert not registry.reload(db_session)
+
+    publish_tariff(db_session, "electricity", "flat", flat_rate=0.35)
+    assert registry.reload(db_session)
+    snapshot = registry.snapshot
+    assert snapshot.block_rates.rates[0, 0] == 0.35
+    assert snapshot.version_for(None) == "electricity:v1"
+    assert not registry.reload(db_session)
+    assert registry.snapshot is snapshot
+    assert compile_tariffs([]).fingerprint == TARIFF_VERSION
+
+
+def test_estimates_price_tiered_tariffs_on_their_blocks(db_session):
+    """
+    Test that the monthly/daily estimate bills a tiered tariff's monthly usage per block, not at the first rate.
+    """
+    publish_tariff(db_session, "natural_gas", "tiered", tiers=[(100, 0.10), (None, 0.20)])
+    snapshot = compile_tariffs(db_session.query(Tariff))
+    # 100 m², average insulation, built 2024: 400 kWh a month = 100 kWh at 0.10 + 300 kWh at 0.20
+    usage, cost = estimate_energy_batch([100, 100, 10], np.array([1, 1, 1]), [2024] * 3, np.array([1, 0, 1]),
+                                        snapshot.block_rates)
+    assert usage.tolist() == [400.0, 400.0, 40.0]
+    assert cost * 30 == pytest.approx([70.0, 400.0 * 0.28, 4.0])
+
+
+def test_deactivating_a_tariff_restores_the_previous_version_and_flags_estimates(db_session):
+    """
+    Test that withdrawing a tariff flags the affected estimates and the previous version is in force again.
+    """
+    db_session.add(RealEstate(square_area=100, real_estate_type="Apartment", year_built=2000,
+                              insulation_quality="good", energy_source="natural_gas", location="Berlin", user_id=1))
+    db_session.commit()
+    first = publish_tariff(db_session, "natural_gas", "flat", flat_rate=0.10)
+    second = publish_tariff(db_session, "natural_gas", "flat", flat_rate=0.12)
+    recompute_dirty_estimates(db_session)
+
+    assert deactivate_tariff(db_session, second.id) is second and not second.is_active
+    assert db_session.query(PropertyEstimate).one().is_dirty
+    registry = TariffRegistry()
+    registry.reload(db_session)
+    assert registry.snapshot.version_for("natural_gas") == f"natural_gas:v{first.version}"
+    assert deactivate_tariff(db_session, 999) is None
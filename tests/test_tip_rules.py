@@ -0,0 +1,98 @@
+from datetime import datetime
+import time
+from unittest.mock import patch
+import numpy as np
+import pytest
+from models.recomendation_tips import get_recommendation_tips, get_weather_tips, local_hour
+from models.tip_rules import TipRuleEngine, load_tip_rules
+
+RULES = [
+    {"id": "hot", "when": {"temperature": {"gt": 30}}, "tips": ["hot"]},
+    {"id": "mild", "when": {"temperature": {"gte": 10, "lte": 30}}, "tips": ["mild"]},
+    {"id": "poor-cold", "when": {"temperature": {"lt": 10}, "insulation_quality": {"in": ["Poor"]}},
+     "tips": ["insulate", "seal"]},
+    {"id": "night", "when": {"hour": {"lt": 6}}, "tips": ["night"]},
+]
+
+
+def test_interval_bounds_are_exact():
+    """
+    Test that strict and inclusive bounds match on both sides of a breakpoint.
+    """
+    engine = TipRuleEngine(RULES)
+    assert engine.tips(temperature=30) == ("mild",)
+    assert engine.tips(temperature=30.01) == ("hot",)
+    assert engine.tips(temperature=10) == ("mild",)
+    assert engine.tips(temperature=9.99, insulation_quality="POOR", hour=3) == ("insulate", "seal", "night")
+    assert engine.tips(temperature=5) == ()  # missing attributes never satisfy a condition
+    assert engine.tips(temperature=5, insulation_quality="good") == ()
+
+
+def test_batch_matches_scalar_and_shares_tuples():
+    """
+    Test that batch evaluation returns the same (identical) tuples as the scalar path.
+    """
+    engine = TipRuleEngine(RULES)
+    rng = np.random.default_rng(0)
+    temperatures = rng.choice([-5.0, 9.99, 10.0, 20.0, 30.0, 30.5, np.nan], 500)
+    insulation = rng.choice(["poor", "good", None], 500).tolist()
+    hours = rng.uniform(0, 24, 500)
+    batch = engine.tips_batch(500, temperature=temperatures, insulation_quality=insulation, hour=hours)
+    for index in range(500):
+        temperature = None if np.isnan(temperatures[index]) else float(temperatures[index])
+        expected = engine.tips(temperature=temperature, insulation_quality=insulation[index], hour=hours[index])
+        assert batch[index] is expected
+
+
+def test_invalid_rules_are_rejected():
+    """
+    Test that unknown attributes and operators fail at compile time.
+    """
+    with pytest.raises(ValueError):
+        TipRuleEngine([{"id": "x", "when": {"pressure": {"gt": 1}}, "tips": ["x"]}])
+    with pytest.raises(ValueError):
+        TipRuleEngine([{"id": "x", "when": {"temperature": {"between": 1}}, "tips": ["x"]}])
+    with pytest.raises(ValueError):
+        TipRuleEngine(RULES).tips(pressure=1)
+
+
+def test_shipped_rules_keep_legacy_tips():
+    """
+    Test that the temperature-only wrapper still returns the legacy tips at a fixed time of day.
+    """
+    with patch("models.recomendation_tips.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(2024, 7, 1, 12, 0)
+        tips = get_recommendation_tips(35.0).split("\n")
+    assert len(tips) == 11
+    assert tips[0].startswith("Consider setting your AC to 24°C")
+    assert tips[-1].startswith("Take advantage of natural light")
+    with pytest.raises(ValueError):
+        get_recommendation_tips("hot")
+
+
+def test_weather_tips_use_observation_and_property():
+    """
+    Test that humidity, wind and property attributes add their rules.
+    """
+    weather = {"main": {"temp": 5.0, "humidity": 85}, "wind": {"speed": 12.0}}
+    tips = get_weather_tips(weather, {"insulation_quality": "poor", "year_built": 1950}, datetime(2024, 1, 8, 20, 0))
+    assert any("insulation is rated poor" in tip for tip in tips)
+    assert any("Older buildings" in tip for tip in tips)
+    assert any("Humidity is high" in tip for tip in tips)
+    assert any("Strong wind" in tip for tip in tips)
+    assert tips[-1] == "Turn off lamps and lights since natural light is available."
+    assert len(load_tip_rules()) >= 12
+
+
+def test_local_hour_converts_utc_timestamps(monkeypatch):
+    """
+    Test that scheduled jobs passing a UTC timestamp get the same local clock as request-time tips.
+    """
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    try:
+        assert local_hour(datetime(2026, 1, 15, 8, 30)) == 9.5
+        assert local_hour(datetime(2026, 7, 15, 8, 30)) == 10.5  # summer time
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,321 @@
+import asyncio
+import httpx
+import pytest
+from services.circuit_breaker import CircuitBreaker
+from services.deadline import Deadline
+from services.gazetteer import load_gazetteer
+from services.single_flight import SingleFlight
+from services.weather_api import AsyncWeatherService
+from services.weather_cache import WeatherCache, normalize_city
+
+BERLIN = {"name": "Berlin", "main": {"temp": 21.5}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return WeatherCache(ttl_seconds=60, max_entries=2, clock=clock)
+
+
+def test_normalize_city():
+    """
+    Test that case and whitespace variants share one cache key.
+    """
+    assert normalize_city("  Berlin ") == normalize_city("berlin") == "berlin"
+    assert normalize_city("New   York") == "new york"
+
+
+def test_cache_hit_miss_and_lru_eviction(cache):
+    """
+    Test counters and least-recently-used eviction.
+    """
+    assert cache.get("berlin") == (None, WeatherCache.MISS)
+    cache.set("berlin", BERLIN)
+    cache.set("paris", {"main": {"temp": 18}})
+    assert cache.get("berlin") == (BERLIN, WeatherCache.HIT)  # berlin is now most recent
+    cache.set("rome", {"main": {"temp": 25}})
+
+    assert cache.get("paris")[1] == WeatherCache.MISS
+    assert cache.get("berlin")[1] == WeatherCache.HIT
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+
+def test_cache_stale_entry_single_refresh_claim(cache, clock):
+    """
+    Test that an expired entry is still served and only one caller may refresh it.
+    """
+    cache.set("berlin", BERLIN)
+    clock.now = 61
+    assert cache.get("berlin") == (BERLIN, WeatherCache.STALE)
+    assert cache.begin_refresh("berlin") is True
+    assert cache.begin_refresh("berlin") is False
+    cache.set("berlin", BERLIN)
+    assert cache.get("berlin")[1] == WeatherCache.HIT
+    assert cache.begin_refresh("berlin") is True
+
+
+def make_async_service(handler, cache=None):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncWeatherService(api_key="key", cache=cache, client=client)
+
+
+def test_async_get_weather_success():
+    """
+    Test the async client sends the metric query and returns the JSON body.
+    """
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json=BERLIN)
+
+    async def run():
+        service = make_async_service(handler)
+        try:
+            return await service.get_weather("Berlin")
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(run()) == BERLIN
+    assert requests_seen[0].url.params["q"] == "Berlin"
+    assert requests_seen[0].url.params["units"] == "metric"
+
+
+def test_async_get_weather_error_returns_none():
+    """
+    Test that upstream errors and timeouts are reported as None.
+    """
+    def handler(request):
+        if request.url.params["q"] == "Nowhere":
+            return httpx.Response(404, json={"message": "city not found"})
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def run():
+        service = make_async_service(handler)
+        try:
+            return await service.get_weather("Nowhere"), await service.get_weather("Berlin")
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_async_get_weather_uses_cache(cache):
+    """
+    Test that repeated lookups of the same city hit the upstream API once.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=BERLIN)
+
+    async def run():
+        service = make_async_service(handler, cache=cache)
+        try:
+            await service.get_weather("Berlin")
+            return await service.get_weather("BERLIN")
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(run()) == BERLIN
+    assert len(calls) == 1
+
+
+def test_async_get_weather_serves_stale_and_refreshes_in_background(cache, clock):
+    """
+    Test stale-while-revalidate: the stale value is returned at once and a single refresh updates the cache.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={**BERLIN, "main": {"temp": len(calls)}})
+
+    async def run():
+        service = make_async_service(handler, cache=cache)
+        try:
+            await service.get_weather("Berlin")
+            clock.now = 120
+            stale = [await service.get_weather("Berlin") for _ in range(3)]
+            await asyncio.gather(*service._refresh_tasks)
+            return stale, await service.get_weather("Berlin")
+        finally:
+            await service.aclose()
+
+    stale, fresh = asyncio.run(run())
+    assert all(result["main"]["temp"] == 1 for result in stale)
+    assert fresh["main"]["temp"] == 2 and len(calls) == 2
+
+
+def test_single_flight_shares_result_and_error():
+    """
+    Test that concurrent callers for one key share a single call, including its exception.
+    """
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == "boom":
+            raise RuntimeError("upstream failed")
+        return value
+
+    async def run():
+        ok = await asyncio.gather(*(flight.do("berlin", lambda: fetch("ok")) for _ in range(5)))
+        failed = await asyncio.gather(
+            *(flight.do("paris", lambda: fetch("boom")) for _ in range(3)), return_exceptions=True
+        )
+        return ok, failed
+
+    ok, failed = asyncio.run(run())
+    assert ok == ["ok"] * 5
+    assert all(isinstance(error, RuntimeError) for error in failed)
+    assert calls == ["ok", "boom"]
+    assert flight.stats() == {"in_flight": 0, "calls": 8, "deduplicated": 6}
+
+
+def test_async_get_weather_coalesces_cold_city(cache):
+    """
+    Test that a burst of lookups for an uncached city issues one upstream request.
+    """
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=BERLIN)
+
+    async def run():
+        service = make_async_service(handler, cache=cache)
+        try:
+            return await asyncio.gather(*(service.get_weather(name) for name in ["Berlin", "berlin", " BERLIN"] * 10))
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(run()) == [BERLIN] * 30
+    assert len(calls) == 1
+
+
+def test_async_get_weather_with_gazetteer(cache):
+    """
+    Test that known cities are keyed and queried canonically and unknown ones are queried by name.
+    """
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json=BERLIN)
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service = AsyncWeatherService(api_key="key", cache=cache, client=client, gazetteer=load_gazetteer())
+        try:
+            results = [await service.get_weather(name) for name in ["Berlin", "Berlin, DE", "Berlin-Spandau"]]
+            return results, await service.get_weather(" Nowhereville "), await service.get_weather("  ")
+        finally:
+            await service.aclose()
+
+    results, unknown, blank = asyncio.run(run())
+    assert results == [BERLIN] * 3 and unknown == BERLIN and blank is None
+    assert len(requests_seen) == 2
+    assert "lat" in requests_seen[0].url.params
+    assert requests_seen[1].url.params["q"] == "Nowhereville"
+    assert cache.peek(load_gazetteer().resolve("Berlin").id) == BERLIN
+    assert cache.peek("nowhereville") == BERLIN
+
+
+def test_circuit_breaker_opens_and_half_opens(clock):
+    """
+    Test closed -> open after N failures -> half-open probe -> closed.
+    """
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    clock.now = 31
+    assert breaker.allow_request()  # the probe
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_async_get_weather_serves_last_known_good_when_breaker_open(clock):
+    """
+    Test that provider failures open the breaker and the stale observation is served without upstream calls.
+    """
+    calls = []
+    healthy = [True]
+
+    def handler(request):
+        calls.append(request)
+        if healthy[0]:
+            return httpx.Response(200, json=BERLIN)
+        return httpx.Response(503)
+
+    async def run():
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+        cache = WeatherCache(ttl_seconds=60, clock=clock)
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service = AsyncWeatherService(api_key="key", cache=cache, client=client, breaker=breaker)
+        try:
+            await service.get_weather("Berlin")
+            healthy[0] = False
+            cache.clear()
+            results = [await service.get_weather("Berlin") for _ in range(4)]
+            return results, breaker.state
+        finally:
+            await service.aclose()
+
+    results, state = asyncio.run(run())
+    assert state == CircuitBreaker.OPEN
+    assert all(result == {**BERLIN, "stale": True} for result in results)
+    assert len(calls) == 3  # one success, then two failures open the breaker
+
+
+def test_async_get_weather_respects_deadline():
+    """
+    Test that a slow provider is cut off at the caller's deadline and the stale observation is served.
+    """
+    slow = [False]
+
+    async def handler(request):
+        if slow[0]:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json=BERLIN)
+
+    async def run():
+        service = make_async_service(handler)
+        try:
+            await service.get_weather("Berlin")
+            slow[0] = True
+            started = asyncio.get_running_loop().time()
+            result = await service.get_weather("Berlin", Deadline(0.05))
+            return result, asyncio.get_running_loop().time() - started
+        finally:
+            await service.aclose()
+
+    result, elapsed = asyncio.run(run())
+    assert result == {**BERLIN, "stale": True}
+    assert elapsed < 0.5